@@ -0,0 +1,114 @@
+# ann_index.py
+# IVF-style approximate nearest-neighbour index for large face galleries.
+# The gallery is split into coarse k-means clusters at training time; a query
+# only scans the rows of the `nprobe` clusters whose centroids are closest.
+import os
+from pathlib import Path
+
+import numpy as np
+
+INDEX_VERSION = 1
+
+
+def index_path_for(model_path):
+    """The index lives next to the encodings file: trained_faces.pkl -> trained_faces.ivf.npz"""
+    model_path = Path(model_path)
+    return model_path.with_name(model_path.stem + ".ivf.npz")
+
+
+def _kmeans(data, k, iters, seed):
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+    data_norms = np.einsum("ij,ij->i", data, data)
+    for _ in range(iters):
+        assign = _nearest_centroids(data, data_norms, centroids, 1)[:, 0]
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=k)
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate([[0], np.cumsum(counts)])[filled]
+        centroids[filled] = np.add.reduceat(data[order], starts, axis=0) / counts[filled, None]
+        # re-seed empty clusters with a random row so every list stays useful
+        empty = np.flatnonzero(counts == 0)
+        centroids[empty] = data[rng.integers(len(data), size=len(empty))]
+    return centroids
+
+
+def _nearest_centroids(data, data_norms, centroids, n):
+    sq = (data_norms[:, None]
+          + np.einsum("ij,ij->i", centroids, centroids)[None, :]
+          - 2.0 * data @ centroids.T)
+    if n >= centroids.shape[0]:
+        return np.argsort(sq, axis=1)
+    part = np.argpartition(sq, n - 1, axis=1)[:, :n]
+    order = np.take_along_axis(sq, part, axis=1).argsort(axis=1)
+    return np.take_along_axis(part, order, axis=1)
+
+
+class IVFIndex:
+    """Inverted-file index: centroids plus gallery row ids grouped per cluster.
+    `gallery` is the generation stamp of the gallery the rows belong to."""
+
+    def __init__(self, centroids, order, offsets, count, gallery=None):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.order = np.asarray(order, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.count = int(count)
+        self.gallery = gallery
+
+    @property
+    def nlist(self):
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, encodings, nlist=None, iters=10, seed=0, gallery=None):
+        data = np.ascontiguousarray(encodings, dtype=np.float32)
+        if nlist is None:
+            # ~sqrt(N) lists keeps both the centroid scan and the list scans small
+            nlist = int(np.sqrt(len(data)))
+        nlist = max(1, min(nlist, len(data)))
+        centroids = _kmeans(data, nlist, iters, seed)
+        assign = _nearest_centroids(data, np.einsum("ij,ij->i", data, data), centroids, 1)[:, 0]
+        order = np.argsort(assign, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=nlist))])
+        return cls(centroids, order, offsets, len(data), gallery)
+
+    def reassign(self, encodings, gallery=None):
+        """Same centroids, rows re-bucketed for an edited gallery (e.g. after an
+        enrollment), without re-running k-means. Returns None for an empty gallery."""
+        data = np.ascontiguousarray(encodings, dtype=np.float32)
+        if not len(data):
+            return None
+        assign = _nearest_centroids(data, np.einsum("ij,ij->i", data, data), self.centroids, 1)[:, 0]
+        order = np.argsort(assign, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=self.nlist))])
+        return IVFIndex(self.centroids, order, offsets, len(data), gallery)
+
+    def candidates(self, query, nprobe):
+        """Gallery rows worth scanning for one query (sorted, unique)."""
+        query = np.asarray(query, dtype=np.float32).reshape(1, -1)
+        lists = _nearest_centroids(query, np.einsum("ij,ij->i", query, query),
+                                   self.centroids, min(nprobe, self.nlist))[0]
+        rows = [self.order[self.offsets[c]:self.offsets[c + 1]] for c in lists]
+        return np.sort(np.concatenate(rows))
+
+    def save(self, path):
+        # written aside and renamed, so a watching recognizer never loads half a file
+        path = Path(path)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, version=INDEX_VERSION, centroids=self.centroids, order=self.order,
+                     offsets=self.offsets, count=self.count, gallery=self.gallery or "")
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """Returns None when there is no usable index, so callers fall back to exact search."""
+        path = Path(path)
+        if not path.exists():
+            return None
+        with np.load(path) as data:
+            if int(data["version"]) != INDEX_VERSION:
+                return None
+            # indexes saved before the stamp existed never match a gallery
+            gallery = str(data["gallery"]) if "gallery" in data.files else ""
+            return cls(data["centroids"], data["order"], data["offsets"], int(data["count"]), gallery or None)
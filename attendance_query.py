@@ -0,0 +1,113 @@
+# attendance_query.py
+# Paged reads of the attendance table for the report views.
+#
+# Pages are fetched with keyset ("seek") queries: instead of OFFSET, each page
+# continues after the sort key of the last row of the previous page, so page
+# 500 costs the same as page 1 and the (date, time) index does the ordering.
+# Missing dates/times sort as '' (oldest): a NULL would make the row-value
+# comparison unknown and silently drop those rows at a page boundary.
+# Filtering and sorting happen in SQL; nothing loads the whole table.
+import csv
+from pathlib import Path
+
+PAGE_SIZE = 200
+COLUMNS = ("name", "date", "time", "status")
+
+# sort key per sortable column; every key ends in id so it is unique
+WHEN = ("COALESCE(date, '')", "COALESCE(time, '')")
+SORT_KEYS = {
+    "date": WHEN + ("id",),
+    "time": WHEN + ("id",),
+    "name": ("COALESCE(name, '')",) + WHEN + ("id",),
+    "status": ("COALESCE(status, '')",) + WHEN + ("id",),
+}
+SORT_INDEX_SQL = "CREATE INDEX IF NOT EXISTS ix_attendance_when ON attendance(COALESCE(date, ''), COALESCE(time, ''))"
+
+
+def build_filters(name=None, date_from=None, date_to=None, status=None):
+    """-> (where_sql, params). date_from/date_to are inclusive 'YYYY-MM-DD' strings."""
+    clauses, params = [], []
+    if name:
+        clauses.append("name LIKE ?")
+        params.append(f"%{name}%")
+    if date_from:
+        clauses.append("date >= ?")
+        params.append(date_from)
+    if date_to:
+        clauses.append("date <= ?")
+        params.append(date_to)
+    if status:
+        clauses.append("status = ?")
+        params.append(status)
+    return " AND ".join(clauses), params
+
+
+def fetch_page(conn, filters=("", []), sort="date", descending=True, after=None, limit=PAGE_SIZE):
+    """One page of (name, date, time, status) rows.
+
+    Returns (rows, next_key); pass next_key as `after` for the following page.
+    next_key is None once the last page has been returned.
+    """
+    where, params = filters
+    keys = SORT_KEYS[sort]
+    clauses = [where] if where else []
+    params = list(params)
+    if after is not None:
+        # row-value comparison: (k1, k2, ...) < (last k1, last k2, ...)
+        clauses.append(f"({', '.join(keys)}) {'<' if descending else '>'} ({', '.join('?' * len(keys))})")
+        params.extend(after)
+    direction = "DESC" if descending else "ASC"
+    query = (f"SELECT {', '.join(COLUMNS)}, {', '.join(keys)} FROM attendance"
+             + (f" WHERE {' AND '.join(clauses)}" if clauses else "")
+             + f" ORDER BY {', '.join(f'{k} {direction}' for k in keys)} LIMIT ?")
+    rows = conn.execute(query, params + [limit]).fetchall()
+    width = len(COLUMNS)
+    next_key = tuple(rows[-1][width:]) if len(rows) == limit else None
+    return [row[:width] for row in rows], next_key
+
+
+def iter_rows(conn, filters=("", []), sort="date", descending=True, page_size=1000):
+    """All matching rows, page by page (for exports)."""
+    after = None
+    while True:
+        rows, after = fetch_page(conn, filters, sort, descending, after, page_size)
+        yield from rows
+        if after is None:
+            return
+
+
+def count_rows(conn, filters=("", [])):
+    where, params = filters
+    return conn.execute("SELECT COUNT(*) FROM attendance" + (f" WHERE {where}" if where else ""),
+                        params).fetchone()[0]
+
+
+def load_csv(conn, csv_path, batch=5000):
+    """Stream attendance.csv into an `attendance` table on conn (usually ':memory:'), so CSV
+    data is paged and filtered by the same queries. Handles both the headered
+    name,date,time,status file and the headerless name,date,time one."""
+    conn.execute("DROP TABLE IF EXISTS attendance")
+    conn.execute("CREATE TABLE attendance (id INTEGER PRIMARY KEY, name TEXT, date TEXT, time TEXT, status TEXT)")
+    count = 0
+    with open(Path(csv_path), newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        first = next(reader, None)
+        pending = []
+        if first is not None and [c.strip().lower() for c in first[:1]] != ["name"]:
+            pending.append(first)
+        for row in reader:
+            pending.append(row)
+            if len(pending) >= batch:
+                count += _insert_csv_rows(conn, pending)
+                pending = []
+        count += _insert_csv_rows(conn, pending)
+    conn.execute("CREATE INDEX ix_attendance_date_time ON attendance(date, time)")
+    conn.execute(SORT_INDEX_SQL)
+    conn.commit()
+    return count
+
+
+def _insert_csv_rows(conn, rows):
+    values = [(tuple(row[:4]) + (None,) * (4 - len(row[:4]))) for row in rows if row]
+    conn.executemany("INSERT INTO attendance (name, date, time, status) VALUES (?, ?, ?, ?)", values)
+    return len(values)
@@ -0,0 +1,108 @@
+# attendance_store.py
+# Helpers shared by the scripts that write attendance.
+import csv
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+DB_PATH = "attendance.sqlite3"
+BUSY_TIMEOUT_MS = 5000
+
+
+def connect(db_path=DB_PATH, **kwargs):
+    """sqlite3.connect with WAL journaling and a busy timeout, so the camera loops,
+    the Streamlit apps and the reports can use the database at the same time."""
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000, **kwargs)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    return conn
+
+
+def mark_present(conn, date, time, student_id=None, subject=None, name=None, status="Present"):
+    """Atomic insert-if-absent: one mark per student (or, without a student id, per
+    name), subject and day. Returns True when a new row was written, False if the
+    mark already existed.
+
+    The NOT EXISTS guard uses the same keys as init_db.UNIQUE_MARKS, so marking
+    stays correct on a database whose unique indexes could not be created yet
+    (duplicates waiting for `python init_db.py dedupe`). BEGIN IMMEDIATE takes the
+    write lock before the check, so two processes cannot both pass it.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        cur = conn.execute("""
+            INSERT OR IGNORE INTO attendance (student_id, subject, name, date, time, status)
+            SELECT ?1, ?2, ?3, ?4, ?5, ?6
+            WHERE NOT EXISTS (
+                SELECT 1 FROM attendance
+                WHERE date = ?4 AND COALESCE(subject, '') = COALESCE(?2, '')
+                  AND CASE WHEN ?1 IS NOT NULL THEN student_id = ?1
+                           ELSE student_id IS NULL AND name = ?3 END)
+        """, (student_id, subject, name, date, time, status))
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return cur.rowcount == 1
+
+
+class PresenceCache:
+    """Answers "already marked?" from memory instead of re-reading storage per face.
+
+    Seed it once from storage at startup; it forgets everything when the date
+    rolls over or the session (e.g. the subject) changes. With a cooldown (seconds)
+    a key may be marked again once that much time has passed since its last mark;
+    without one, a key is marked at most once per day/session.
+    """
+
+    def __init__(self, cooldown=None, session=None, clock=datetime.now):
+        self.cooldown = cooldown
+        self.session = session
+        self.clock = clock
+        self.day = clock().date()
+        self._marked = {}  # key -> datetime of the last mark
+
+    def _roll(self, now):
+        if now.date() != self.day:
+            self.day = now.date()
+            self._marked.clear()
+
+    def set_session(self, session):
+        if session != self.session:
+            self.session = session
+            self._marked.clear()
+
+    def seed(self, keys, marked_at=None):
+        """Keys already present in storage for today (marked_at defaults to now)."""
+        now = self.clock()
+        self._roll(now)
+        for key in keys:
+            self._marked[key] = marked_at or now
+
+    def should_mark(self, key):
+        now = self.clock()
+        self._roll(now)
+        last = self._marked.get(key)
+        if last is None:
+            return True
+        if self.cooldown is None:
+            return False
+        return (now - last).total_seconds() >= self.cooldown
+
+    def mark(self, key):
+        self._marked[key] = self.clock()
+
+    def is_present(self, key):
+        self._roll(self.clock())
+        return key in self._marked
+
+
+def names_marked_on(csv_path, date_str):
+    """Names with a row for date_str in an attendance CSV (name,date,... with or without header)."""
+    path = Path(csv_path)
+    if not path.exists():
+        return set()
+    with open(path, newline="", encoding="utf-8") as f:
+        return {row[0] for row in csv.reader(f) if len(row) > 1 and row[1] == date_str}
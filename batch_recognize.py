@@ -0,0 +1,203 @@
+# batch_recognize.py
+# Headless, offline recognition over recorded footage or a folder of images,
+# using the same detect/encode/match path as the camera loops.
+#
+#   python batch_recognize.py --video lecture.mp4 --every 10 --jsonl events.jsonl
+#   python batch_recognize.py --images snapshots/ --db attendance.sqlite3 --recorded-at "2025-11-03 09:00:00"
+#   python batch_recognize.py --video lecture.mp4 --start 600 --end 1200 --record run.jsonl
+#   python batch_recognize.py --replay run.jsonl --jsonl events.jsonl   # no decode/detect/encode
+#
+# --record writes the boxes and encodings of every processed frame; --replay
+# re-runs only the matching on them, so gallery/matcher changes can be
+# regression-tested deterministically without the footage.
+# With --replay, --start/--end pick recorded frames by their recorded time.
+import argparse
+import json
+import math
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from attendance_store import PresenceCache, connect, mark_present
+from init_db import create_tables, migrate
+from recognition import MODEL_PATH, encode_job, load_matcher
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def video_frames(path, start=0.0, end=None, every=1):
+    """(frame_no, seconds, frame) for every `every`-th frame inside [start, end)."""
+    cap = cv2.VideoCapture(str(path))
+    if not cap.isOpened():
+        sys.exit(f"❌ Unable to open {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    frame_no = 0
+    if start:
+        cap.set(cv2.CAP_PROP_POS_MSEC, start * 1000)
+        frame_no = int(round(start * fps))
+    try:
+        while True:
+            t = frame_no / fps
+            if end is not None and t >= end:
+                break
+            if frame_no % every:
+                # grab() skips the decode for frames we are not going to look at
+                if not cap.grab():
+                    break
+            else:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                yield frame_no, t, frame
+            frame_no += 1
+    finally:
+        cap.release()
+
+
+def image_frames(folder, start=0.0, end=None, every=1, fps=1.0):
+    """Images in name order, treated as a video at `fps` frames per second."""
+    files = sorted(p for p in Path(folder).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    for frame_no, path in enumerate(files):
+        t = frame_no / fps
+        if t < start or frame_no % every:
+            continue
+        if end is not None and t >= end:
+            break
+        frame = cv2.imread(str(path))
+        if frame is None:
+            print(f"⚠️ Unable to read {path}")
+            continue
+        yield frame_no, t, frame
+
+
+def batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def encoded_batches(frames, batch_size, scale, pool):
+    """Batches of (frame_no, seconds, boxes, encodings); encoding fans out over the pool."""
+    for batch in batches(frames, batch_size):
+        jobs = [(frame, scale) for _, _, frame in batch]
+        outputs = pool.map(encode_job, jobs) if pool is not None else map(encode_job, jobs)
+        yield [(frame_no, t, boxes, encs) for (frame_no, t, _), (boxes, encs) in zip(batch, outputs)]
+
+
+def replayed_batches(path, batch_size, start=0.0, end=None):
+    """Recorded frames whose time falls inside [start, end), like the live sources."""
+    def records():
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                rec = json.loads(line)
+                if rec["t"] < start or (end is not None and rec["t"] >= end):
+                    continue
+                boxes = [tuple(b) for b in rec["boxes"]]
+                yield rec["frame"], rec["t"], boxes, [np.array(e) for e in rec["encodings"]]
+    return batches(records(), batch_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline face recognition for video files and image folders")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--video", help="video file to process")
+    source.add_argument("--images", help="folder of images, processed in name order")
+    source.add_argument("--replay", help="JSONL written by --record; only matching is re-run")
+    parser.add_argument("--model", default=MODEL_PATH, help="gallery / encodings file")
+    parser.add_argument("--tolerance", type=float, default=0.6)
+    parser.add_argument("--start", type=float, default=0.0, help="seconds into the source to start at")
+    parser.add_argument("--end", type=float, default=None, help="seconds into the source to stop at")
+    parser.add_argument("--every", type=int, default=1, help="process every Nth frame")
+    parser.add_argument("--fps", type=float, default=1.0, help="frame rate assumed for --images")
+    parser.add_argument("--scale", type=float, default=1.0, help="detection scale (encodings stay full resolution)")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=1, help="encoding processes")
+    parser.add_argument("--jsonl", help="write attendance events to this JSONL file")
+    parser.add_argument("--db", help="mark attendance in this SQLite database")
+    parser.add_argument("--recorded-at", help="'YYYY-MM-DD HH:MM:SS' of the start of the source (default: now)")
+    parser.add_argument("--all", action="store_true", help="emit every recognized face, not just the first per name")
+    parser.add_argument("--record", help="write boxes + encodings of every processed frame to this JSONL")
+    args = parser.parse_args()
+
+    matcher = load_matcher(args.model, tolerance=args.tolerance)
+    recorded_at = datetime.strptime(args.recorded_at, "%Y-%m-%d %H:%M:%S") if args.recorded_at else datetime.now()
+    source_name = args.video or args.images or args.replay
+
+    pool = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 and not args.replay else None
+    if args.replay:
+        stream = replayed_batches(args.replay, args.batch_size, args.start, args.end)
+    else:
+        if args.video:
+            frames = video_frames(args.video, args.start, args.end, args.every)
+        else:
+            frames = image_frames(args.images, args.start, args.end, args.every, args.fps)
+        stream = encoded_batches(frames, args.batch_size, args.scale, pool)
+
+    events = open(args.jsonl, "w", encoding="utf-8") if args.jsonl else None
+    record = open(args.record, "w", encoding="utf-8") if args.record else None
+    conn = None
+    if args.db:
+        conn = connect(args.db)
+        create_tables(conn)
+        migrate(conn)
+    # the clock follows the footage, so a day boundary in the recording rolls the cache over
+    stamp = [recorded_at]
+    presence = PresenceCache(clock=lambda: stamp[0])
+
+    started = time.perf_counter()
+    n_frames = n_faces = n_events = 0
+    try:
+        for batch in stream:
+            # one matcher call for every face in the batch
+            all_encodings = [enc for _, _, _, encs in batch for enc in encs]
+            matches = iter(matcher.match(all_encodings))
+            for frame_no, t, boxes, encs in batch:
+                n_frames += 1
+                n_faces += len(boxes)
+                if record is not None:
+                    record.write(json.dumps({"frame": frame_no, "t": t, "boxes": [list(map(int, b)) for b in boxes],
+                                             "encodings": [np.asarray(e).tolist() for e in encs]}) + "\n")
+                stamp[0] = recorded_at + timedelta(seconds=t)
+                for box, match in zip(boxes, matches):
+                    if match.name == "Unknown":
+                        continue
+                    if not args.all and not presence.should_mark(match.name):
+                        continue
+                    presence.mark(match.name)
+                    n_events += 1
+                    if events is not None:
+                        events.write(json.dumps({
+                            "source": str(source_name), "frame": frame_no, "t": round(t, 3),
+                            "timestamp": stamp[0].isoformat(timespec="seconds"), "name": match.name,
+                            "distance": round(match.distance, 4),
+                            "margin": round(match.margin, 4) if math.isfinite(match.margin) else None,
+                            "box": list(map(int, box))}) + "\n")
+                    if conn is not None:
+                        mark_present(conn, stamp[0].strftime("%Y-%m-%d"), stamp[0].strftime("%H:%M:%S"),
+                                     name=match.name)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        for f in (events, record):
+            if f is not None:
+                f.close()
+        if conn is not None:
+            conn.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ {n_frames} frames, {n_faces} faces, {n_events} events in {elapsed:.1f}s "
+          f"({n_frames / max(elapsed, 1e-9):.1f} frames/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+# benchmark.py
+# Offline, CPU-only benchmarks for every stage of the attendance pipeline, so a
+# change or a dependency upgrade can be checked for speed before it is merged.
+#
+#   python benchmark.py run --out bench.json               # full run
+#   python benchmark.py run --quick --out bench.json       # fewer iterations, small galleries only
+#   python benchmark.py compare base.json bench.json       # exit code 1 on a regression
+#
+# Stages: image decode, HOG detection, face_encodings (dataset/ images),
+# gallery matching on synthetic 128-d galleries (exact and ANN), LBPH predict,
+# and attendance inserts into SQLite and CSV. Stages whose dependency is not
+# installed are reported as skipped rather than failing the run.
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from ann_index import IVFIndex
+from attendance_store import connect, mark_present
+from face_matcher import FaceMatcher
+from init_db import create_tables, migrate
+from lbph_model import normalize_face
+
+DATASET_DIR = "dataset"
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+GALLERY_SIZES = (100, 10_000, 100_000)
+QUICK_GALLERY_SIZES = (100, 10_000)
+SEED = 0
+FORMAT_VERSION = 1
+
+
+def summarize(samples_ms, items_per_call=1):
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    total_s = samples.sum() / 1000
+    return {
+        "n": int(len(samples)),
+        "p50_ms": round(float(np.percentile(samples, 50)), 4),
+        "p99_ms": round(float(np.percentile(samples, 99)), 4),
+        "mean_ms": round(float(samples.mean()), 4),
+        "throughput_per_s": round(len(samples) * items_per_call / total_s, 2) if total_s > 0 else None,
+    }
+
+
+def measure(fn, inputs, repeat=1, warmup=3, items_per_call=1):
+    """Time fn(x) for every x in inputs, `repeat` passes, after a few untimed warm-up calls."""
+    for x in inputs[:warmup]:
+        fn(x)
+    timings = []
+    for _ in range(repeat):
+        for x in inputs:
+            started = time.perf_counter()
+            fn(x)
+            timings.append((time.perf_counter() - started) * 1000)
+    return summarize(timings, items_per_call)
+
+
+def dataset_images(limit):
+    files = sorted(p for p in Path(DATASET_DIR).rglob("*") if p.suffix.lower() in IMAGE_EXTENSIONS)
+    return [str(p) for p in files[:limit]]
+
+
+def synthetic_gallery(size, dim=128, per_identity=1, rng=None):
+    """Unit-scale random encodings, roughly the spread of real dlib descriptors."""
+    rng = rng or np.random.default_rng(SEED)
+    encodings = rng.normal(0, 0.09, (size * per_identity, dim)).astype(np.float32)
+    names = [f"id{i // per_identity}" for i in range(size * per_identity)]
+    return encodings, names
+
+
+def bench_decode(paths, repeat):
+    return measure(cv2.imread, paths, repeat)
+
+
+def bench_face_recognition(paths, repeat):
+    """HOG detection and face_encodings on the dataset images."""
+    try:
+        import face_recognition
+    except ImportError:
+        return {"hog_detect": {"skipped": "face_recognition not installed"},
+                "face_encodings": {"skipped": "face_recognition not installed"}}
+    frames = [cv2.cvtColor(img, cv2.COLOR_BGR2RGB) for img in map(cv2.imread, paths) if img is not None]
+    results = {"hog_detect": measure(lambda f: face_recognition.face_locations(f, model="hog"), frames, repeat)}
+
+    # encode on the detected box, or the whole crop for pre-cropped dataset images
+    jobs = []
+    for frame in frames:
+        boxes = face_recognition.face_locations(frame, model="hog")
+        height, width = frame.shape[:2]
+        jobs.append((frame, boxes[:1] or [(0, width, height, 0)]))
+    results["face_encodings"] = measure(lambda job: face_recognition.face_encodings(*job), jobs, repeat)
+    return results
+
+
+def bench_matching(sizes, queries, faces_per_frame=4):
+    """One matcher.match call per simulated frame of `faces_per_frame` faces."""
+    rng = np.random.default_rng(SEED)
+    results = {}
+    for size in sizes:
+        encodings, names = synthetic_gallery(size, rng=rng)
+        # probes are noisy copies of gallery rows, so most of them should match
+        rows = rng.integers(0, size, (queries, faces_per_frame))
+        probes = encodings[rows] + rng.normal(0, 0.02, (queries, faces_per_frame, encodings.shape[1])).astype(np.float32)
+        frames = [list(p) for p in probes]
+
+        matcher = FaceMatcher(encodings, names)
+        results[f"match_exact_{size}"] = measure(matcher.match, frames, items_per_call=faces_per_frame)
+
+        if size >= 1000:
+            started = time.perf_counter()
+            index = IVFIndex.build(matcher.encodings)
+            build_ms = (time.perf_counter() - started) * 1000
+            ann = FaceMatcher(encodings, names, index=index)
+            stats = measure(ann.match, frames, items_per_call=faces_per_frame)
+            stats["build_ms"] = round(build_ms, 1)
+            # share of probes whose ANN answer equals the exact answer
+            agree = sum(a.index == e.index for f in frames for a, e in zip(ann.match(f), matcher.match(f)))
+            stats["recall"] = round(agree / (len(frames) * faces_per_frame), 4)
+            results[f"match_ann_{size}"] = stats
+    return results
+
+
+def bench_lbph(paths, repeat):
+    if not hasattr(cv2, "face"):
+        return {"lbph_predict": {"skipped": "opencv-contrib (cv2.face) not installed"}}
+    faces = [normalize_face(img) for img in (cv2.imread(p, cv2.IMREAD_GRAYSCALE) for p in paths) if img is not None]
+    if not faces:
+        return {"lbph_predict": {"skipped": "no dataset images"}}
+    labels = np.arange(len(faces), dtype=np.int32) % 10
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.train(faces, labels)
+    return {"lbph_predict": measure(recognizer.predict, faces, repeat)}
+
+
+def bench_inserts(count):
+    """Per-mark cost as the apps do it: one INSERT + commit, or one CSV append."""
+    results = {}
+    start = datetime(2025, 1, 1, 9, 0, 0)
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = connect(os.path.join(tmp, "bench.sqlite3"))
+        create_tables(conn)
+        migrate(conn)
+        # distinct (name, date) keys, so every insert really writes a row
+        marks = [(f"student{i % 500}", start + timedelta(days=i // 500, seconds=i)) for i in range(count)]
+        results["sqlite_insert"] = measure(
+            lambda m: mark_present(conn, m[1].strftime("%Y-%m-%d"), m[1].strftime("%H:%M:%S"), name=m[0]),
+            marks, warmup=0)
+        conn.close()
+
+        csv_path = os.path.join(tmp, "attendance.csv")
+
+        def append(m):
+            with open(csv_path, "a") as f:
+                f.write(f"{m[0]},{m[1]:%Y-%m-%d},{m[1]:%H:%M:%S}\n")
+        results["csv_append"] = measure(append, marks, warmup=0)
+    return results
+
+
+def environment():
+    versions = {"python": platform.python_version(), "numpy": np.__version__, "opencv": cv2.__version__}
+    try:
+        import face_recognition
+        versions["face_recognition"] = getattr(face_recognition, "__version__", "unknown")
+    except ImportError:
+        pass
+    return {
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "opencv_threads": cv2.getNumThreads(),
+        "versions": versions,
+    }
+
+
+def run(args):
+    cv2.setRNGSeed(SEED)
+    if args.threads:
+        cv2.setNumThreads(args.threads)
+    quick = args.quick
+    repeat = 1 if quick else 3
+    paths = dataset_images(20 if quick else 100)
+    sizes = args.sizes or (QUICK_GALLERY_SIZES if quick else GALLERY_SIZES)
+
+    results = {}
+    stages = [
+        ("decode", lambda: {"decode": bench_decode(paths, repeat)}),
+        ("face_recognition", lambda: bench_face_recognition(paths[:20 if quick else 50], 1)),
+        ("matching", lambda: bench_matching(sizes, 50 if quick else 200)),
+        ("lbph", lambda: bench_lbph(paths, repeat)),
+        ("inserts", lambda: bench_inserts(200 if quick else 2000)),
+    ]
+    for label, stage in stages:
+        if args.only and label not in args.only:
+            continue
+        print(f"⏱ {label}...")
+        for name, stats in stage().items():
+            results[name] = stats
+            if "skipped" in stats:
+                print(f"  {name:<22} skipped: {stats['skipped']}")
+            else:
+                print(f"  {name:<22} p50 {stats['p50_ms']:>9.3f} ms  p99 {stats['p99_ms']:>9.3f} ms  "
+                      f"{stats['throughput_per_s']:>10} /s")
+
+    report = {
+        "version": FORMAT_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "quick": quick,
+        "dataset_images": len(paths),
+        "environment": environment(),
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results written to {args.out}")
+
+
+def compare(args):
+    """Flags stages whose p50/p99 grew, or throughput dropped, by more than the threshold."""
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    if base.get("environment", {}).get("machine") != new.get("environment", {}).get("machine"):
+        print("⚠️ The two runs come from different machines; differences may not be meaningful")
+
+    regressions = 0
+    for name in sorted(set(base["results"]) | set(new["results"])):
+        old_stats, new_stats = base["results"].get(name), new["results"].get(name)
+        if old_stats is None or new_stats is None or "skipped" in old_stats or "skipped" in new_stats:
+            print(f"  {name:<22} not comparable (missing or skipped in one run)")
+            continue
+        changes = {
+            "p50": new_stats["p50_ms"] / old_stats["p50_ms"] - 1 if old_stats["p50_ms"] else 0.0,
+            "p99": new_stats["p99_ms"] / old_stats["p99_ms"] - 1 if old_stats["p99_ms"] else 0.0,
+        }
+        if old_stats.get("throughput_per_s") and new_stats.get("throughput_per_s"):
+            # a throughput drop counts as a positive (bad) change
+            changes["throughput"] = old_stats["throughput_per_s"] / new_stats["throughput_per_s"] - 1
+        if "recall" in old_stats and "recall" in new_stats:
+            changes["recall"] = old_stats["recall"] - new_stats["recall"]
+        # p99 of a short run is noisy, so it gets twice the tolerance
+        limits = {"p50": args.threshold, "p99": 2 * args.threshold, "throughput": args.threshold, "recall": 0.01}
+        bad = [key for key, change in changes.items() if change > limits[key]]
+        # sub-millisecond stages jitter by whole percents between identical runs
+        if new_stats["p50_ms"] - old_stats["p50_ms"] < args.min_ms:
+            bad = [key for key in bad if key == "recall"]
+        regressions += bool(bad)
+        mark = "❌" if bad else "✅"
+        detail = "  ".join(f"{key} {change:+.1%}" for key, change in changes.items())
+        print(f"{mark} {name:<22} {detail}")
+
+    if regressions:
+        print(f"❌ {regressions} stage(s) regressed beyond {args.threshold:.0%}")
+        sys.exit(1)
+    print("✅ No regressions")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="run the benchmarks and write a JSON report")
+    run_parser.add_argument("--out", default="bench.json")
+    run_parser.add_argument("--quick", action="store_true", help="fewer iterations and no 100k gallery")
+    run_parser.add_argument("--sizes", type=int, nargs="+", help="synthetic gallery sizes to match against")
+    run_parser.add_argument("--only", nargs="+",
+                            choices=["decode", "face_recognition", "matching", "lbph", "inserts"])
+    run_parser.add_argument("--threads", type=int, default=0, help="pin OpenCV threads (0 = default)")
+
+    compare_parser = sub.add_parser("compare", help="compare two reports, exit 1 on regression")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown, e.g. 0.10 = 10%%")
+    compare_parser.add_argument("--min-ms", type=float, default=0.05,
+                                help="ignore slowdowns smaller than this many ms at p50")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        compare(args)
+
+
+if __name__ == "__main__":
+    main()
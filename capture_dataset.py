@@ -1,14 +1,18 @@
 import streamlit as st
 import cv2
 import os
-import numpy as np
 import pandas as pd
 import sqlite3
 from datetime import datetime
 
+from attendance_store import connect, mark_present
+from excel_exporter import BackgroundExporter
+from dataset_manifest import ensure_manifest, record_image
+from init_db import migrate
+
 # ---------------- DATABASE SETUP ----------------
 def init_db():
-    conn = sqlite3.connect("attendance.sqlite3")
+    conn = connect("attendance.sqlite3")
     c = conn.cursor()
     c.execute("""
         CREATE TABLE IF NOT EXISTS students (
@@ -31,12 +35,19 @@ def init_db():
         )
     """)
     conn.commit()
+    # unique/secondary indexes, WAL (see init_db.py)
+    migrate(conn)
+    ensure_manifest(conn)
     conn.close()
 
 init_db()
 
 # ---------------- HELPER FUNCTIONS ----------------
-def export_attendance_to_excel():
+EXPORT_FILE = "attendance_records.xlsx"
+EXPORT_INTERVAL = 30  # seconds; marks in between are coalesced into one export
+
+# runs on the exporter thread; writes to tmp_path, which then replaces EXPORT_FILE
+def export_attendance_to_excel(tmp_path):
     conn = sqlite3.connect("attendance.sqlite3")
     query = """
         SELECT 
@@ -53,9 +64,17 @@ def export_attendance_to_excel():
     """
     df = pd.read_sql_query(query, conn)
     conn.close()
-    if not df.empty:
-        df.to_excel("attendance_records.xlsx", index=False)
-        st.toast("✅ Attendance exported automatically to 'attendance_records.xlsx'")
+    if df.empty:
+        return False
+    df.to_excel(tmp_path, index=False)
+    return True
+
+# one exporter thread per Streamlit server, shared by all reruns and sessions
+@st.cache_resource
+def get_exporter():
+    exporter = BackgroundExporter(export_attendance_to_excel, EXPORT_FILE, interval=EXPORT_INTERVAL)
+    exporter.start()
+    return exporter
 
 def get_students():
     conn = sqlite3.connect("attendance.sqlite3")
@@ -70,24 +89,13 @@ def mark_attendance(student_id, subject):
     date = now.strftime("%Y-%m-%d")
     time = now.strftime("%H:%M:%S")
 
-    conn = sqlite3.connect("attendance.sqlite3")
-    c = conn.cursor()
-    c.execute("""
-        SELECT * FROM attendance 
-        WHERE student_id = ? AND date = ? AND subject = ?
-    """, (student_id, date, subject))
-    already_marked = c.fetchone()
-
-    if already_marked:
-        st.warning(f"⚠️ Attendance for this student already marked for {subject} today.")
-    else:
-        c.execute("""
-            INSERT INTO attendance (student_id, subject, date, time, status)
-            VALUES (?, ?, ?, ?, ?)
-        """, (student_id, subject, date, time, "Present"))
-        conn.commit()
+    conn = connect("attendance.sqlite3")
+    # one guarded INSERT (see attendance_store.mark_present): no separate check that could race
+    if mark_present(conn, date, time, student_id=student_id, subject=subject):
         st.success(f"✅ Attendance marked for student ID {student_id} ({subject})")
-        export_attendance_to_excel()
+        get_exporter().mark_dirty()
+    else:
+        st.warning(f"⚠️ Attendance for this student already marked for {subject} today.")
     conn.close()
 
 # ---------------- STREAMLIT UI ----------------
@@ -121,6 +129,7 @@ if choice == "Register Student":
                 c.execute("INSERT INTO students (name, roll_no, class, image_path) VALUES (?, ?, ?, ?)",
                           (name, roll_no, class_name, img_path))
                 conn.commit()
+                record_image(conn, img_path, label=roll_no, student_id=c.lastrowid)
                 conn.close()
                 st.success("✅ Student registered successfully!")
             cap.release()
@@ -168,6 +177,12 @@ elif choice == "Attendance Records":
 
     if not df.empty:
         st.dataframe(df)
-        st.success("📤 Automatically exported attendance to Excel file: 'attendance_records.xlsx'")
+        st.info(f"📤 Attendance is exported to '{EXPORT_FILE}' in the background "
+                f"(at most every {EXPORT_INTERVAL}s).")
+        if st.button("Export now"):
+            if get_exporter().flush(timeout=60):
+                st.success(f"✅ Attendance exported to '{EXPORT_FILE}'")
+            else:
+                st.warning("⚠️ Export is taking longer than expected.")
     else:
         st.warning("⚠️ No attendance records found.")
@@ -0,0 +1,208 @@
+# dashboard_data.py
+# Incrementally refreshed attendance data for the Streamlit dashboards.
+#
+# The cache lives in st.session_state. On a rerun it only reads what was added
+# since the last one: rows with id > last_id from SQLite, or the bytes appended
+# to attendance.csv. For the CSV, daily counts are topped up the same way; the
+# database keeps its own in the summary tables (see summary.py).
+# A full reload only happens when rows were deleted or the CSV was rewritten.
+#
+# render_attendance(st, csv_file, db_file) draws the records, summary and roster
+# sections shared by the dashboards under src/.
+import sqlite3
+from datetime import datetime, timedelta
+from io import StringIO
+from pathlib import Path
+
+import pandas as pd
+
+from roster import absentee_streaks, absentees, classes, has_roster
+from summary import daily_counts, ensure_summary, student_percentages
+
+COLUMNS = ["name", "date", "time", "status"]
+
+
+class AttendanceCache:
+    """Rows seen so far (newest first), and per-date/status counts for the CSV."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.df = pd.DataFrame(columns=COLUMNS)
+        self.daily = pd.DataFrame()
+        self.last_id = 0       # SQLite: highest attendance.id loaded
+        self.offset = 0        # CSV: bytes of the file already parsed
+        self.count = 0
+
+    def refresh_db(self, conn):
+        """Returns the number of new rows."""
+        total, max_id = conn.execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM attendance").fetchone()
+        if max_id < self.last_id or total < self.count:
+            self.reset()  # rows were deleted; start over
+        if max_id == self.last_id and total == self.count:
+            return 0
+        new = pd.read_sql_query("SELECT id, name, date, time, status FROM attendance WHERE id > ? ORDER BY id",
+                                conn, params=(self.last_id,))
+        if not new.empty:
+            self.last_id = int(new["id"].iloc[-1])
+        self._append(new[COLUMNS].fillna({"date": "", "time": ""}))
+        if self.count != total:
+            # rows were deleted and others added between two reruns
+            self.reset()
+            return self.refresh_db(conn)
+        return len(new)
+
+    def refresh_csv(self, path):
+        path = Path(path)
+        if not path.exists():
+            self.reset()
+            return 0
+        size = path.stat().st_size
+        if size < self.offset:
+            self.reset()  # file was truncated or rewritten
+        if size == self.offset:
+            return 0
+        with open(path, "rb") as f:
+            f.seek(self.offset)
+            chunk = f.read()
+        # only parse whole lines; a half-written last line is picked up next time
+        end = chunk.rfind(b"\n") + 1
+        if end == 0:
+            return 0
+        text = chunk[:end].decode("utf-8")
+        header = 0 if self.offset == 0 and text.lower().startswith("name,") else None
+        new = pd.read_csv(StringIO(text), header=header, dtype=str, keep_default_na=False)
+        if header is None:
+            new = new.iloc[:, :len(COLUMNS)]
+            new.columns = COLUMNS[:new.shape[1]]
+            if "status" not in new:
+                new["status"] = "Present"  # recognize_faces.py only writes name,date,time of present faces
+        new = new.reindex(columns=COLUMNS)
+        self.offset += end
+        counts = new.fillna({"status": ""}).groupby(["date", "status"]).size().reset_index(name="n")
+        self._append(new, counts)
+        return len(new)
+
+    def _append(self, new, counts=None):
+        if new.empty:
+            return
+        new = new.sort_values(["date", "time"], ascending=False, kind="stable")
+        if self.df.empty:
+            self.df = new.reset_index(drop=True)
+        elif (new["date"].iloc[-1], new["time"].iloc[-1]) >= (self.df["date"].iloc[0], self.df["time"].iloc[0]):
+            # the usual case: everything new is newer than what is cached, no re-sort needed
+            self.df = pd.concat([new, self.df], ignore_index=True)
+        else:
+            self.df = (pd.concat([new, self.df], ignore_index=True)
+                       .sort_values(["date", "time"], ascending=False, kind="stable")
+                       .reset_index(drop=True))
+        self.count += len(new)
+        if counts is None:
+            return
+        pivot = counts.pivot_table(index="date", columns="status", values="n", aggfunc="sum", fill_value=0)
+        self.daily = pivot if self.daily.empty else self.daily.add(pivot, fill_value=0).fillna(0).astype(int)
+        self.daily = self.daily.sort_index(ascending=False)
+
+    def page(self, number, size):
+        """Rows [number * size, (number + 1) * size) of the newest-first records."""
+        return self.df.iloc[number * size:(number + 1) * size]
+
+    def pages(self, size):
+        return max(1, -(-len(self.df) // size))
+
+
+def render_attendance(st, csv_file, db_file):
+    """Records, summary and roster actions; `st` is the streamlit module."""
+    db_file = Path(db_file)
+    st.sidebar.header("Data Source")
+    source = st.sidebar.selectbox("Load from", ["SQLite DB", "CSV file"])
+
+    # rows loaded so far are kept per source; a rerun only reads what was added since
+    caches = st.session_state.setdefault("attendance_cache", {})
+    cache = caches.setdefault(source, AttendanceCache())
+    if st.sidebar.button("Reload all"):
+        cache.reset()
+    if source == "CSV file":
+        cache.refresh_csv(csv_file)
+    elif db_file.exists():
+        conn = sqlite3.connect(db_file)
+        cache.refresh_db(conn)
+        conn.close()
+    daily = cache.daily
+    percentages = pd.DataFrame()
+    if source == "SQLite DB" and db_file.exists():
+        # counts from the trigger-maintained summary tables: O(days), not O(marks)
+        term = st.sidebar.text_input("Term months (YYYY-MM to YYYY-MM)",
+                                     f"{datetime.today():%Y-%m} to {datetime.today():%Y-%m}")
+        first_month, _, last_month = term.partition(" to ")
+        conn = sqlite3.connect(db_file)
+        ensure_summary(conn)
+        counts = pd.DataFrame(daily_counts(conn), columns=["date", "status", "count"])
+        if not counts.empty:
+            daily = (counts.pivot(index="date", columns="status", values="count").fillna(0).astype(int)
+                     .sort_index(ascending=False))
+        percentages = pd.DataFrame(
+            student_percentages(conn, first_month.strip(), (last_month or first_month).strip()),
+            columns=["student", "name", "roll_no", "class", "attended", "sessions", "percent"])
+        conn.close()
+
+    st.subheader("Attendance Records")
+    page_size = st.sidebar.selectbox("Rows per page", [50, 100, 500], index=1)
+    page = st.number_input(f"Page (of {cache.pages(page_size)})", min_value=1,
+                           max_value=cache.pages(page_size), value=1) - 1
+    st.dataframe(cache.page(page, page_size))
+    st.caption(f"{len(cache.df)} records")
+
+    st.subheader("Summary")
+    if not daily.empty:
+        st.write("Daily counts")
+        st.dataframe(daily)
+    else:
+        st.info("No attendance records yet.")
+    if not percentages.empty:
+        st.write("Term attendance %")
+        st.dataframe(percentages.drop(columns=["student"]))
+
+    render_roster_actions(st, db_file)
+
+
+def render_roster_actions(st, db_file):
+    """Absentees for a day and absence streaks, from the students roster."""
+    db_file = Path(db_file)
+    st.subheader("Actions")
+    date_filter = st.date_input("Select date", datetime.today())
+    selected_date = date_filter.strftime("%Y-%m-%d")
+    subject_filter = st.text_input("Subject (optional)")
+    roster_ready = False
+    class_filter = "All"
+    if db_file.exists():
+        conn = sqlite3.connect(db_file)
+        roster_ready = has_roster(conn)
+        if roster_ready:
+            class_filter = st.selectbox("Class", ["All"] + classes(conn))
+        conn.close()
+    if st.button("Show absentees for selected date"):
+        if not roster_ready:
+            st.warning("No students registered in the database.")
+        else:
+            # roster comes from the students table, absentees from one anti-join query
+            conn = sqlite3.connect(db_file)
+            missing = absentees(conn, selected_date, subject_filter or None,
+                                None if class_filter == "All" else class_filter)
+            conn.close()
+            st.write(f"Absentees ({len(missing)}):")
+            st.dataframe(pd.DataFrame(missing, columns=["id", "name", "roll_no", "class"]))
+
+    streak_days = st.number_input("Flag students absent for at least this many class days in a row",
+                                  min_value=2, value=3)
+    if st.button("Show absentee streaks (last 30 days)"):
+        if not roster_ready:
+            st.warning("No students registered in the database.")
+        else:
+            conn = sqlite3.connect(db_file)
+            streaks = absentee_streaks(conn, (date_filter - timedelta(days=30)).strftime("%Y-%m-%d"), selected_date,
+                                       subject_filter or None, None if class_filter == "All" else class_filter,
+                                       min_days=streak_days)
+            conn.close()
+            st.dataframe(pd.DataFrame(streaks, columns=["id", "name", "roll_no", "class", "from", "to", "days"]))
@@ -0,0 +1,131 @@
+# dataset_encoder.py
+# Shared image -> encoding step for the trainers, with a persistent per-image cache
+# so retraining only decodes/detects/encodes new or changed files.
+import hashlib
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import face_recognition
+
+CACHE_VERSION = 1
+ENCODER_SETTINGS = {"model": "hog", "upsample": 1, "jitters": 1}
+
+
+def file_digest(path):
+    """sha1 of the file content, so renamed/touched files still hit the cache."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def encode_image(path, settings=ENCODER_SETTINGS):
+    """Detect faces and encode the first one. Returns (boxes, encoding or None)."""
+    image = face_recognition.load_image_file(str(path))
+    boxes = face_recognition.face_locations(image, number_of_times_to_upsample=settings["upsample"],
+                                            model=settings["model"])
+    if not boxes:
+        return [], None
+    encs = face_recognition.face_encodings(image, boxes[:1], num_jitters=settings["jitters"])
+    return boxes, (encs[0] if encs else None)
+
+
+class EncodingCache:
+    """Pickled dict of {content hash + encoder settings: (boxes, encoding)}."""
+
+    def __init__(self, path, settings=ENCODER_SETTINGS):
+        self.path = Path(path)
+        self.settings = settings
+        self.settings_tag = ",".join(f"{k}={v}" for k, v in sorted(settings.items()))
+        self.entries = {}
+        self.seen = set()
+        if self.path.exists():
+            try:
+                with open(self.path, "rb") as f:
+                    data = pickle.load(f)
+                if data.get("version") == CACHE_VERSION:
+                    self.entries = data["entries"]
+            except Exception as e:
+                print(f"  ignoring unreadable cache {self.path}: {e}")
+
+    def key(self, digest):
+        return f"{digest}|{self.settings_tag}"
+
+    def get(self, digest):
+        key = self.key(digest)
+        self.seen.add(key)
+        return self.entries.get(key)
+
+    def put(self, digest, boxes, encoding):
+        key = self.key(digest)
+        self.seen.add(key)
+        self.entries[key] = (boxes, encoding)
+
+    def prune(self):
+        """Drop entries not looked up this run (deleted files, old settings). Returns how many."""
+        stale = [k for k in self.entries if k not in self.seen]
+        for k in stale:
+            del self.entries[k]
+        return len(stale)
+
+    def save(self):
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump({"version": CACHE_VERSION, "entries": self.entries}, f)
+        os.replace(tmp, self.path)
+
+
+def _encode_job(job):
+    # runs in a pool worker; errors come back as values so one bad file doesn't kill the run
+    path, settings = job
+    try:
+        boxes, encoding = encode_image(path, settings)
+        return boxes, encoding, None
+    except Exception as e:
+        return None, None, str(e)
+
+
+def encode_files(paths, cache, workers=1, chunksize=8, progress_every=50):
+    """Encode many files in input order: cache hits are served locally, misses are
+    fanned out over a process pool in chunks of `chunksize` images.
+
+    Returns (results, reused) where results[i] is (boxes, encoding, error) for paths[i].
+    """
+    results = [None] * len(paths)
+    todo = []
+    reused = 0
+    for i, path in enumerate(paths):
+        try:
+            digest = file_digest(path)
+        except OSError as e:
+            results[i] = (None, None, str(e))
+            continue
+        hit = cache.get(digest)
+        if hit is not None:
+            results[i] = (hit[0], hit[1], None)
+            reused += 1
+        else:
+            todo.append((i, digest))
+
+    jobs = [(str(paths[i]), cache.settings) for i, _ in todo]
+    if workers > 1 and len(jobs) > 1:
+        # chunksize keeps IPC overhead low; map() yields results in submission order
+        pool = ProcessPoolExecutor(max_workers=workers)
+        outputs = pool.map(_encode_job, jobs, chunksize=chunksize)
+    else:
+        pool = None
+        outputs = map(_encode_job, jobs)
+    try:
+        for n, ((i, digest), result) in enumerate(zip(todo, outputs), 1):
+            if result[2] is None:
+                cache.put(digest, result[0], result[1])
+            results[i] = result
+            if n % progress_every == 0 or n == len(todo):
+                print(f"  encoded {n}/{len(todo)} new images")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return results, reused
@@ -0,0 +1,255 @@
+# dataset_manifest.py
+# Manifest of the training images, kept as a `dataset_images` table in the
+# attendance database. Capture code records every image it writes, and the
+# trainers query this table instead of walking dataset/ on every run.
+#
+# The three naming conventions in use all map to one label:
+#   dataset/<name>/<n>.jpg          -> <name>
+#   dataset/<roll_no>_<count>.jpg   -> <roll_no>
+#   dataset/<roll_no>.jpg           -> <roll_no>
+#
+#   python dataset_manifest.py rebuild   # one-time scan of dataset/ to fill the table
+#   python dataset_manifest.py check     # stale / orphaned entries, without listing dataset/
+import glob
+import hashlib
+import sys
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+
+from attendance_store import DB_PATH, connect
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def ensure_manifest(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS dataset_images (
+            path TEXT PRIMARY KEY,      -- relative to the project root, e.g. dataset/100_1.jpg
+            label TEXT NOT NULL,        -- folder name or roll number
+            student_id INTEGER,         -- students.id when known
+            size INTEGER,
+            mtime_ns INTEGER,
+            sha1 TEXT,
+            added_at TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_dataset_images_label ON dataset_images(label)")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_dataset_images_student ON dataset_images(student_id)")
+    conn.commit()
+
+
+def label_for(rel_path):
+    parts = PurePosixPath(rel_path).parts
+    if len(parts) >= 3:
+        return parts[-2]  # dataset/<name>/<file>
+    stem = PurePosixPath(rel_path).stem
+    return stem.rsplit("_", 1)[0] if "_" in stem else stem
+
+
+def _relative(path, root):
+    path = Path(path)
+    if path.is_absolute():
+        path = path.relative_to(Path(root).resolve())
+    # Windows-created rows (dataset\142.jpg) and posix ones share one key
+    return PurePosixPath(*path.parts).as_posix().replace("\\", "/")
+
+
+def _has_students(conn):
+    # the trainers may run against a database the Streamlit apps never initialized
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'students'").fetchone() is not None
+
+
+def _sha1(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def record_image(conn, path, label=None, student_id=None, root=".", commit=True):
+    """Add or refresh one image. Call it right after cv2.imwrite."""
+    rel = _relative(path, root)
+    full = Path(root) / rel
+    stat = full.stat()
+    conn.execute("""
+        INSERT INTO dataset_images (path, label, student_id, size, mtime_ns, sha1, added_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(path) DO UPDATE SET
+            label = excluded.label,
+            student_id = COALESCE(excluded.student_id, dataset_images.student_id),
+            size = excluded.size, mtime_ns = excluded.mtime_ns, sha1 = excluded.sha1
+    """, (rel, label or label_for(rel), student_id, stat.st_size, stat.st_mtime_ns,
+          _sha1(full), datetime.now().isoformat(timespec="seconds")))
+    if commit:
+        conn.commit()
+
+
+def assign_student(conn, label, student_id, commit=True):
+    """Link the images captured for a roll number to the student row created for it."""
+    conn.execute("UPDATE dataset_images SET student_id = ? WHERE label = ?", (student_id, label))
+    if commit:
+        conn.commit()
+
+
+def register_student(conn, name, roll_no, student_class, image_path, keep, dataset_dir="dataset", root="."):
+    """Save the student enrolled from <roll_no>_1..<keep>.jpg: update the row already
+    registered under roll_no (it is UNIQUE), or insert one. Its captures are linked and
+    the stale ones dropped only once that write succeeded, in the same transaction.
+    Returns (student_id, created)."""
+    with conn:
+        row = conn.execute("SELECT id FROM students WHERE roll_no = ?", (roll_no,)).fetchone()
+        if row:
+            student_id = row[0]
+            conn.execute("UPDATE students SET name = ?, class = ?, image_path = ? WHERE id = ?",
+                         (name, student_class, image_path, student_id))
+        else:
+            student_id = conn.execute("INSERT INTO students (name, roll_no, class, image_path) VALUES (?, ?, ?, ?)",
+                                      (name, roll_no, student_class, image_path)).lastrowid
+        assign_student(conn, roll_no, student_id, commit=False)
+        drop_stale_captures(conn, roll_no, keep, dataset_dir, root, commit=False)
+    return student_id, row is None
+
+
+def drop_stale_captures(conn, label, keep, dataset_dir="dataset", root=".", commit=True):
+    """After a re-enrollment wrote <label>_1..<keep>.jpg: delete the higher-numbered
+    captures an earlier, longer enrollment left behind, files and manifest rows.
+    Returns the removed paths."""
+    flat = {f"{dataset_dir}/{file.name}"
+            for file in (Path(root) / dataset_dir).glob(f"{glob.escape(label)}_*.jpg")}
+    flat.update(path for path, in conn.execute(
+        "SELECT path FROM dataset_images WHERE label = ? AND path LIKE ?", (label, f"{dataset_dir}/%")))
+    removed = []
+    for rel in sorted(flat):
+        stem = PurePosixPath(rel).stem
+        count = stem[len(label) + 1:]
+        if PurePosixPath(rel).parent.as_posix() == dataset_dir and stem.startswith(f"{label}_") \
+                and count.isdigit() and int(count) > keep:
+            (Path(root) / rel).unlink(missing_ok=True)
+            conn.execute("DELETE FROM dataset_images WHERE path = ?", (rel,))
+            removed.append(rel)
+    if commit:
+        conn.commit()
+    return removed
+
+
+def list_images(conn, label=None):
+    """[(path, label, student_id), ...] ordered by label then path."""
+    query = "SELECT path, label, student_id FROM dataset_images"
+    params = ()
+    if label is not None:
+        query += " WHERE label = ?"
+        params = (label,)
+    return conn.execute(query + " ORDER BY label, path", params).fetchall()
+
+
+def person_images(conn, label=None):
+    """[(path, label), ...] of the dataset/<name>/<file> layout only, label stripped.
+
+    These are the photos the face_recognition trainers learn from. The flat
+    dataset/<roll_no>_<n>.jpg files are the Streamlit apps' grayscale LBPH crops.
+    """
+    query = """
+        SELECT path, TRIM(label) FROM dataset_images
+        WHERE path LIKE 'dataset/%/%' AND path NOT LIKE 'dataset/%/%/%'
+    """
+    params = ()
+    if label is not None:
+        query += " AND TRIM(label) = ?"
+        params = (label.strip(),)
+    return conn.execute(query + " ORDER BY 2, 1", params).fetchall()
+
+
+def student_samples(conn):
+    """[(student_id, path), ...] for images linked to a student, directly or by roll number."""
+    return conn.execute("""
+        SELECT COALESCE(d.student_id, s.id), d.path
+        FROM dataset_images d
+        LEFT JOIN students s ON d.student_id IS NULL AND s.roll_no = d.label
+        WHERE d.student_id IS NOT NULL OR s.id IS NOT NULL
+        ORDER BY 1, 2
+    """).fetchall()
+
+
+def find_stale(conn, root="."):
+    """Entries whose file is gone or changed since it was recorded (one stat per entry)."""
+    stale = []
+    for path, size, mtime_ns in conn.execute("SELECT path, size, mtime_ns FROM dataset_images"):
+        try:
+            stat = (Path(root) / path).stat()
+        except OSError:
+            stale.append((path, "missing"))
+            continue
+        if stat.st_size != size or stat.st_mtime_ns != mtime_ns:
+            stale.append((path, "changed"))
+    return stale
+
+
+def find_orphans(conn):
+    """Entries pointing at a student id that no longer exists."""
+    if not _has_students(conn):
+        return []
+    return conn.execute("""
+        SELECT d.path, d.student_id FROM dataset_images d
+        WHERE d.student_id IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM students s WHERE s.id = d.student_id)
+    """).fetchall()
+
+
+def refresh(conn, root="."):
+    """Re-record changed files and drop missing ones. Returns the stale list."""
+    stale = find_stale(conn, root)
+    for path, reason in stale:
+        if reason == "missing":
+            conn.execute("DELETE FROM dataset_images WHERE path = ?", (path,))
+        else:
+            record_image(conn, path, root=root, commit=False)
+    conn.commit()
+    return stale
+
+
+def rebuild(conn, root=".", dataset_dir="dataset"):
+    """One full scan of dataset/ (bootstrap, or after files were copied in by hand)."""
+    ensure_manifest(conn)
+    count = 0
+    for file in sorted((Path(root) / dataset_dir).rglob("*")):
+        if file.is_file() and file.suffix.lower() in IMAGE_EXTENSIONS:
+            record_image(conn, file.relative_to(root), root=root, commit=False)
+            count += 1
+    # link roll-number labels to students where the roll number is known
+    if _has_students(conn):
+        conn.execute("""
+            UPDATE dataset_images SET student_id = (
+                SELECT MIN(s.id) FROM students s WHERE s.roll_no = dataset_images.label)
+            WHERE student_id IS NULL
+        """)
+    conn.commit()
+    return count
+
+
+def fill_manifest(conn, root="."):
+    """Create the manifest table and fill it by a one-time scan if it is empty,
+    e.g. on a database from before the manifest existed."""
+    ensure_manifest(conn)
+    if conn.execute("SELECT COUNT(*) FROM dataset_images").fetchone()[0] == 0:
+        print(f"Indexed {rebuild(conn, root)} dataset images into the manifest")
+
+
+def open_manifest(db_path=DB_PATH, root="."):
+    """Connection with the manifest table, filled by a one-time scan if it is empty."""
+    conn = connect(db_path)
+    fill_manifest(conn, root)
+    return conn
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "check"
+    conn = connect(DB_PATH)
+    ensure_manifest(conn)
+    if command == "rebuild":
+        print(f"✅ Indexed {rebuild(conn)} images")
+    elif command == "check":
+        for path, reason in find_stale(conn):
+            print(f"⚠️ {reason}: {path}")
+        for path, student_id in find_orphans(conn):
+            print(f"⚠️ orphaned (student {student_id} deleted): {path}")
+    else:
+        print("usage: python dataset_manifest.py [rebuild|check]")
+    conn.close()
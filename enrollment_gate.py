@@ -0,0 +1,114 @@
+# enrollment_gate.py
+# Capture-time filter for enrollment images.
+#
+# Every face crop the registration loop sees is scored for size, exposure,
+# sharpness and (roughly) frontal pose. Crops that pass are compared to the
+# samples kept so far with a 64-bit difference hash: a near-duplicate is only
+# kept if it is sharper than the sample it resembles, and then replaces it.
+# Capture stops once `target` mutually distinct samples are kept, so every
+# student gets a few varied, sharp images instead of 20 copies of one frame.
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+TARGET_SAMPLES = 6      # distinct images to keep per student
+MIN_FACE_PX = 80        # smaller detections are too coarse for LBPH / encodings
+MIN_SHARPNESS = 40.0    # variance of the Laplacian on a 100x100 downscale
+MIN_BRIGHTNESS, MAX_BRIGHTNESS = 40, 220
+MIN_CONTRAST = 20.0     # grey-level standard deviation
+MAX_ASYMMETRY = 1.1     # left half vs mirrored right half; turned heads score high
+MIN_HASH_DISTANCE = 8   # differing dHash bits for two samples to count as distinct
+MAX_CAPTURE_FRAMES = 300  # give up after ~10-20 s if the target is never reached
+
+# accepted: keep this crop; slot: sample index to write (an existing slot is replaced);
+# reason: why it was rejected, or "new" / "sharper"; score: sharpness
+Decision = namedtuple("Decision", ["accepted", "slot", "reason", "score"])
+
+
+def dhash(gray, size=8):
+    """64-bit difference hash: one bit per horizontally adjacent pixel pair."""
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def sharpness(gray):
+    small = cv2.resize(gray, (100, 100), interpolation=cv2.INTER_AREA)
+    return float(cv2.Laplacian(small, cv2.CV_64F).var())
+
+
+def asymmetry(gray):
+    """Mean |left - mirrored right| relative to contrast; about 0.6-0.9 for a frontal face."""
+    face = cv2.resize(gray, (100, 100), interpolation=cv2.INTER_AREA).astype(np.float32)
+    left, right = face[:, :50], face[:, 50:][:, ::-1]
+    return float(np.abs(left - right).mean() / (face.std() + 1e-6))
+
+
+def largest_face(faces):
+    """The registering student is the biggest face in view; bystanders are ignored."""
+    if len(faces) == 0:
+        return None
+    return max(faces, key=lambda f: f[2] * f[3])
+
+
+class EnrollmentGate:
+    def __init__(self, target=TARGET_SAMPLES, min_size=MIN_FACE_PX, min_sharpness=MIN_SHARPNESS,
+                 max_asymmetry=MAX_ASYMMETRY, min_distance=MIN_HASH_DISTANCE):
+        self.target = target
+        self.min_size = min_size
+        self.min_sharpness = min_sharpness
+        self.max_asymmetry = max_asymmetry
+        self.min_distance = min_distance
+        self.hashes = []   # per kept slot
+        self.scores = []
+        self.seen = 0
+        self.rejected = {}
+
+    @property
+    def done(self):
+        return len(self.hashes) >= self.target
+
+    def consider(self, gray_face):
+        """Decide on one grayscale face crop."""
+        self.seen += 1
+        decision = self._decide(gray_face)
+        if not decision.accepted:
+            self.rejected[decision.reason] = self.rejected.get(decision.reason, 0) + 1
+        return decision
+
+    def _decide(self, gray):
+        height, width = gray.shape[:2]
+        if min(height, width) < self.min_size:
+            return Decision(False, None, "too small", 0.0)
+        mean, std = float(gray.mean()), float(gray.std())
+        if not MIN_BRIGHTNESS <= mean <= MAX_BRIGHTNESS or std < MIN_CONTRAST:
+            return Decision(False, None, "exposure", 0.0)
+        score = sharpness(gray)
+        if score < self.min_sharpness:
+            return Decision(False, None, "blurry", score)
+        if asymmetry(gray) > self.max_asymmetry:
+            return Decision(False, None, "pose", score)
+
+        h = dhash(gray)
+        distances = [hamming(h, kept) for kept in self.hashes]
+        if distances and min(distances) < self.min_distance:
+            nearest = int(np.argmin(distances))
+            if score > self.scores[nearest] * 1.2:
+                # same look, noticeably sharper: swap it in
+                self.hashes[nearest], self.scores[nearest] = h, score
+                return Decision(True, nearest, "sharper", score)
+            return Decision(False, None, "duplicate", score)
+        if self.done:
+            return Decision(False, None, "enough", score)
+        self.hashes.append(h)
+        self.scores.append(score)
+        return Decision(True, len(self.hashes) - 1, "new", score)
+
+    def summary(self):
+        rejected = ", ".join(f"{n} {reason}" for reason, n in sorted(self.rejected.items())) or "none"
+        return f"kept {len(self.hashes)} of {self.seen} crops (rejected: {rejected})"
@@ -0,0 +1,74 @@
+# excel_exporter.py
+# Debounced background export, so marking attendance only flags the export as
+# dirty instead of rewriting the whole spreadsheet on every mark.
+import os
+import threading
+import time
+from pathlib import Path
+
+
+class BackgroundExporter(threading.Thread):
+    """Calls export(tmp_path) at most once per `interval` seconds while dirty, then
+    atomically replaces `path` with the result. flush() exports right away."""
+
+    def __init__(self, export, path, interval=30.0):
+        super().__init__(daemon=True)
+        self.export = export
+        self.path = Path(path)
+        self.interval = interval
+        self.last_export = 0.0
+        self.last_error = None
+        self._dirty = False
+        self._wake = threading.Event()
+        self._done = threading.Condition()
+        # flush() requests are numbered; an export covers every request made before it started
+        self._flush_requested = 0
+        self._flush_started = 0
+        self._flush_finished = 0
+
+    def mark_dirty(self):
+        self._dirty = True
+        self._wake.set()
+
+    def flush(self, timeout=None):
+        """Export now (if anything changed) and wait for it to finish."""
+        with self._done:
+            self._flush_requested += 1
+            target = self._flush_requested
+            self._wake.set()
+            return self._done.wait_for(lambda: self._flush_finished >= target, timeout)
+
+    @property
+    def _force(self):
+        return self._flush_requested > self._flush_started
+
+    def run(self):
+        while True:
+            wait = None
+            if self._dirty and not self._force:
+                wait = max(0.0, self.last_export + self.interval - time.monotonic())
+            self._wake.wait(wait)
+            self._wake.clear()
+            if self._force or (self._dirty and time.monotonic() - self.last_export >= self.interval):
+                self._run_export()
+
+    def _run_export(self):
+        with self._done:
+            force = self._force
+            started = self._flush_started = self._flush_requested
+        if self._dirty or force:
+            # clear first: a mark that lands during the export makes it dirty again
+            self._dirty = False
+            tmp = self.path.with_name(self.path.stem + ".tmp" + self.path.suffix)
+            try:
+                if self.export(tmp):
+                    os.replace(tmp, self.path)
+                self.last_error = None
+            except Exception as e:
+                self._dirty = True
+                self.last_error = e
+                print(f"⚠️ Export to {self.path} failed: {e}")
+            self.last_export = time.monotonic()
+        with self._done:
+            self._flush_finished = max(self._flush_finished, started)
+            self._done.notify_all()
@@ -1,5 +1,10 @@
 import cv2
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from attendance_store import connect
+from dataset_manifest import ensure_manifest, record_image
 
 # Ask user for their name
 name = input("Enter your name: ").strip()
@@ -18,6 +23,10 @@ if not cam.isOpened():
 print("✅ Camera opened successfully.")
 print("Press SPACE to capture an image or ESC to exit.")
 
+# every saved image is recorded in the dataset manifest for the trainers
+conn = connect("attendance.sqlite3")
+ensure_manifest(conn)
+
 count = 0
 while True:
     ret, frame = cam.read()
@@ -34,8 +43,10 @@ while True:
     elif key == 32:  # SPACE to capture
         img_name = os.path.join(user_path, f"{name}_{count}.jpg")
         cv2.imwrite(img_name, frame)
+        record_image(conn, img_name, label=name)
         print(f"📸 Saved: {img_name}")
         count += 1
 
 cam.release()
 cv2.destroyAllWindows()
+conn.close()
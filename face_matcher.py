@@ -0,0 +1,96 @@
+# face_matcher.py
+# Vectorized gallery matching shared by the recognizer scripts.
+from collections import namedtuple
+
+import numpy as np
+
+from gallery_store import build_gallery
+
+# name: matched identity or "Unknown", index: gallery row of the best match (-1 if none),
+# distance: euclidean distance to that row, margin: gap to the closest *other* identity
+Match = namedtuple("Match", ["name", "index", "distance", "margin"])
+
+
+class FaceMatcher:
+    """Keeps the known encodings as one float32 matrix and matches whole frames at once."""
+
+    def __init__(self, encodings, names, tolerance=0.6, index=None, nprobe=8):
+        self._init(build_gallery(encodings, names), tolerance, index, nprobe)
+
+    @classmethod
+    def from_gallery(cls, gallery, tolerance=0.6, index=None, nprobe=8):
+        """Wrap a gallery_store.Gallery as-is, so a memory-mapped matrix is not copied."""
+        matcher = cls.__new__(cls)
+        matcher._init(gallery, tolerance, index, nprobe)
+        return matcher
+
+    def _init(self, gallery, tolerance, index, nprobe):
+        self.tolerance = tolerance
+        # optional ann_index.IVFIndex; nprobe trades recall for latency
+        self.index = index
+        self.nprobe = nprobe
+        self.encodings = gallery.encodings
+        # squared norms, so a distance is |a|^2 + |b|^2 - 2ab
+        self.norms = gallery.norms
+        self.labels = gallery.labels
+        self.identities = list(gallery.identities)
+        self.generation = gallery.generation
+
+    def __len__(self):
+        return len(self.encodings)
+
+    def distances(self, face_encodings):
+        """(faces x gallery) euclidean distance matrix."""
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, self.encodings.shape[1])
+        sq = (np.einsum("ij,ij->i", queries, queries)[:, None]
+              + self.norms[None, :]
+              - 2.0 * queries @ self.encodings.T)
+        return np.sqrt(np.maximum(sq, 0.0))
+
+    def use_index(self):
+        """True when the ANN index is present, was built for this gallery generation
+        and would skip rows. A stale index (e.g. loaded between a publish's gallery
+        and index writes) falls back to exact search."""
+        return (self.index is not None
+                and self.index.count == len(self)
+                and self.index.gallery == self.generation
+                and self.nprobe < self.index.nlist)
+
+    def match(self, face_encodings):
+        """Match every face of a frame in a single call, returns one Match per face."""
+        if len(face_encodings) == 0:
+            return []
+        if len(self) == 0:
+            return [Match("Unknown", -1, float("inf"), 0.0) for _ in face_encodings]
+        if self.use_index():
+            return [self._match_rows(enc, self.index.candidates(enc, self.nprobe))
+                    for enc in face_encodings]
+
+        dists = self.distances(face_encodings)
+        rows = np.arange(len(dists))
+        best = dists.argmin(axis=1)
+        best_dist = dists[rows, best]
+        best_label = self.labels[best]
+
+        # closest row that belongs to a different identity
+        others = np.where(self.labels[None, :] == best_label[:, None], np.inf, dists)
+        margin = others.min(axis=1) - best_dist
+
+        return [self._result(int(best[i]), float(best_dist[i]), float(margin[i]))
+                for i in range(len(dists))]
+
+    def _match_rows(self, face_encoding, rows):
+        # exact search restricted to the candidate rows returned by the index
+        query = np.asarray(face_encoding, dtype=np.float32)
+        sq = float(query @ query) + self.norms[rows] - 2.0 * (self.encodings[rows] @ query)
+        dists = np.sqrt(np.maximum(sq, 0.0))
+        best = int(dists.argmin())
+        labels = self.labels[rows]
+        others = dists[labels != labels[best]]
+        margin = float(others.min()) - float(dists[best]) if len(others) else float("inf")
+        return self._result(int(rows[best]), float(dists[best]), margin)
+
+    def _result(self, index, distance, margin):
+        label = self.labels[index]
+        name = self.identities[label] if distance <= self.tolerance else "Unknown"
+        return Match(name, index, distance, margin)
@@ -0,0 +1,92 @@
+# face_tracker.py
+# IoU tracker that lets the recognizers skip face_encodings for faces that were
+# already identified in earlier frames. A track keeps its identity and is only
+# re-encoded every `reencode_every` frames, or sooner while it is unknown or
+# its last match was ambiguous (small margin to the next identity).
+import itertools
+
+import numpy as np
+
+
+class Track:
+    def __init__(self, track_id, box, frame_no):
+        self.id = track_id
+        self.box = box  # (top, right, bottom, left)
+        self.name = None  # None until the first encoding
+        self.distance = float("inf")
+        self.margin = 0.0
+        self.last_encoded = None
+        self.last_seen = frame_no
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """IoU between every (top, right, bottom, left) box of a and of b."""
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    top = np.maximum(a[:, None, 0], b[None, :, 0])
+    right = np.minimum(a[:, None, 1], b[None, :, 1])
+    bottom = np.minimum(a[:, None, 2], b[None, :, 2])
+    left = np.maximum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(right - left, 0, None) * np.clip(bottom - top, 0, None)
+    area_a = (a[:, 1] - a[:, 3]) * (a[:, 2] - a[:, 0])
+    area_b = (b[:, 1] - b[:, 3]) * (b[:, 2] - b[:, 0])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0)
+
+
+class FaceTracker:
+    def __init__(self, iou_threshold=0.3, reencode_every=15, retry_unknown_every=3,
+                 min_margin=0.08, max_misses=5):
+        self.iou_threshold = iou_threshold
+        self.reencode_every = reencode_every
+        self.retry_unknown_every = retry_unknown_every
+        self.min_margin = min_margin
+        self.max_misses = max_misses
+        self.tracks = []
+        self.frame_no = 0
+        self._ids = itertools.count(1)
+
+    def update(self, boxes):
+        """Associate this frame's detections with existing tracks.
+        Returns one Track per box, in the same order as boxes."""
+        self.frame_no += 1
+        assigned = [None] * len(boxes)
+        if self.tracks and boxes:
+            iou = iou_matrix([t.box for t in self.tracks], boxes)
+            # greedy: best overlapping pair first
+            for flat in np.argsort(iou, axis=None)[::-1]:
+                ti, bi = np.unravel_index(flat, iou.shape)
+                if iou[ti, bi] < self.iou_threshold:
+                    break
+                track = self.tracks[ti]
+                if assigned[bi] is not None or track.last_seen == self.frame_no:
+                    continue
+                track.box = tuple(boxes[bi])
+                track.last_seen = self.frame_no
+                assigned[bi] = track
+
+        for i, box in enumerate(boxes):
+            if assigned[i] is None:
+                assigned[i] = Track(next(self._ids), tuple(box), self.frame_no)
+                self.tracks.append(assigned[i])
+
+        # forget tracks that have been missing for a while (student left / track lost)
+        self.tracks = [t for t in self.tracks if self.frame_no - t.last_seen <= self.max_misses]
+        return assigned
+
+    def needs_encoding(self, track):
+        if track.last_encoded is None:
+            return True
+        age = self.frame_no - track.last_encoded
+        if track.name == "Unknown":
+            return age >= self.retry_unknown_every
+        if track.margin < self.min_margin:
+            return age >= self.retry_unknown_every
+        return age >= self.reencode_every
+
+    def assign(self, track, match):
+        """Store a face_matcher.Match on the track."""
+        track.name = match.name
+        track.distance = match.distance
+        track.margin = match.margin
+        track.last_encoded = self.frame_no
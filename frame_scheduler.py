@@ -0,0 +1,88 @@
+# frame_scheduler.py
+# Picks the detection scale and processing cadence at runtime so the camera
+# loops hit a per-frame time budget on both slow edge boxes and workstations.
+#
+# Detection (HOG) runs on a downscaled copy of the frame; the boxes are scaled
+# back to full resolution and face_encodings is run on the full-resolution
+# frame, so encodings keep their quality whatever detection scale is chosen.
+import cv2
+import face_recognition
+
+SCALES = (1.0, 0.75, 0.5, 0.33, 0.25)
+
+
+class AdaptiveScheduler:
+    """Over budget: shrink the detection scale first, then skip more frames.
+    Well under budget: process more frames first, then grow the scale back."""
+
+    def __init__(self, target_ms=80.0, scales=SCALES, start_scale=0.5, max_interval=6,
+                 smoothing=0.2, settle=5):
+        self.target_ms = target_ms
+        self.scales = scales
+        self.scale_idx = min(range(len(scales)), key=lambda i: abs(scales[i] - start_scale))
+        self.interval = 1  # process every Nth frame
+        self.max_interval = max_interval
+        self.smoothing = smoothing
+        self.settle = settle  # processed frames to wait between two adjustments
+        self.avg_ms = None
+        self._frames = 0
+        self._since_change = 0
+
+    @property
+    def scale(self):
+        return self.scales[self.scale_idx]
+
+    @property
+    def settings(self):
+        return {"scale": self.scale, "interval": self.interval,
+                "avg_ms": round(self.avg_ms or 0.0, 1), "target_ms": self.target_ms}
+
+    def should_process(self):
+        self._frames += 1
+        return self._frames % self.interval == 0
+
+    def record(self, elapsed_ms):
+        """Feed the time one processed frame took; returns True when the settings changed."""
+        if self.avg_ms is None:
+            self.avg_ms = elapsed_ms
+        else:
+            self.avg_ms += self.smoothing * (elapsed_ms - self.avg_ms)
+        self._since_change += 1
+        if self._since_change < self.settle:
+            return False
+
+        # per-frame cost amortized over the skipped frames
+        cost = self.avg_ms / self.interval
+        changed = False
+        if cost > self.target_ms * 1.15:
+            if self.scale_idx < len(self.scales) - 1:
+                self.scale_idx += 1
+                changed = True
+            elif self.interval < self.max_interval:
+                self.interval += 1
+                changed = True
+        elif self.avg_ms * 1.5 < self.target_ms:
+            if self.interval > 1:
+                self.interval -= 1
+                changed = True
+            elif self.scale_idx > 0:
+                self.scale_idx -= 1
+                changed = True
+        if changed:
+            self._since_change = 0
+            # the old average described other settings
+            self.avg_ms = None
+        return changed
+
+
+def detect_faces(rgb_frame, scale, model="hog"):
+    """face_locations on a downscaled copy, boxes returned in full-resolution coordinates."""
+    if scale >= 1.0:
+        return face_recognition.face_locations(rgb_frame, model=model)
+    small = cv2.resize(rgb_frame, (0, 0), fx=scale, fy=scale)
+    height, width = rgb_frame.shape[:2]
+    boxes = []
+    for top, right, bottom, left in face_recognition.face_locations(small, model=model):
+        boxes.append((max(0, int(top / scale)), min(width, int(right / scale)),
+                      min(height, int(bottom / scale)), max(0, int(left / scale))))
+    return boxes
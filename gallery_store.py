@@ -0,0 +1,216 @@
+# gallery_store.py
+# Versioned on-disk gallery: a float32 .npy matrix that can be memory-mapped,
+# an int32 label per row and a separate identity table.
+#
+#   trained_faces.gallery/
+#       meta.json                  version, row count, generation, data file names and,
+#                                  for a compressed gallery, prototypes per identity
+#       encodings-<stamp>.npy      float32 (rows x 128)
+#       norms-<stamp>.npy          float32 squared row norms
+#       labels-<stamp>.npy         int32 index into identities
+#       identities-<stamp>.json    list of names
+#
+# meta.json is written last with os.replace, so a reader always sees one
+# complete generation of data files, even while a trainer is writing a new one.
+# Writers (trainers, `live_gallery.py enroll`, the recognition service) take an
+# exclusive lock on the directory's .lock file, see gallery_lock.
+# The generation stamp is also stored in the ANN index (ann_index.py), so an
+# index built for another generation is recognised as stale.
+#
+# Convert an old pickle once with:  python gallery_store.py trained_faces.pkl
+import json
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+
+GALLERY_VERSION = 1
+
+# generation: stamp from meta.json, None for a gallery that was never saved
+Gallery = namedtuple("Gallery", ["encodings", "norms", "labels", "identities", "generation"],
+                     defaults=(None,))
+
+
+def gallery_path_for(model_path):
+    """trained_faces.pkl -> trained_faces.gallery"""
+    model_path = Path(model_path)
+    return model_path.with_name(model_path.stem + ".gallery")
+
+
+def _lock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        return
+    f.seek(0)
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)  # gives up after ~10 s
+            return
+        except OSError:
+            continue
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+_locks = {}  # gallery directory -> [RLock, depth, open lock file]
+_locks_guard = threading.Lock()
+
+
+@contextmanager
+def gallery_lock(path):
+    """Exclusive write lock on a gallery directory, across processes and threads.
+    Re-entrant within a thread, so a read-modify-write (live_gallery.publish) can
+    hold it around save_gallery, which takes it too."""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    with _locks_guard:
+        entry = _locks.setdefault(str(path.resolve()), [threading.RLock(), 0, None])
+    with entry[0]:
+        if entry[1] == 0:
+            f = open(path / ".lock", "a+b")
+            try:
+                _lock_file(f)
+            except BaseException:
+                f.close()
+                raise
+            entry[2] = f
+        entry[1] += 1
+        try:
+            yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                _unlock_file(entry[2])
+                entry[2].close()
+                entry[2] = None
+
+
+def build_gallery(encodings, names):
+    identities, labels = np.unique(np.asarray(names, dtype=str), return_inverse=True)
+    if len(encodings):
+        matrix = np.ascontiguousarray(np.asarray(encodings), dtype=np.float32)
+    else:
+        matrix = np.empty((0, 128), dtype=np.float32)
+    norms = np.einsum("ij,ij->i", matrix, matrix)
+    return Gallery(matrix, norms, labels.astype(np.int32), identities.tolist())
+
+
+def save_gallery(path, gallery, prototypes=None):
+    """Write a new generation. prototypes: the k the rows were compressed to
+    (prototypes.py), so later enrollments are compressed the same way."""
+    with gallery_lock(path):
+        return _save_generation(Path(path), gallery, prototypes)
+
+
+def _save_generation(path, gallery, prototypes=None):
+    stamp = f"{time.time_ns():x}"
+    files = {
+        "encodings": f"encodings-{stamp}.npy",
+        "norms": f"norms-{stamp}.npy",
+        "labels": f"labels-{stamp}.npy",
+        "identities": f"identities-{stamp}.json",
+    }
+    np.save(path / files["encodings"], np.asarray(gallery.encodings, dtype=np.float32))
+    np.save(path / files["norms"], np.asarray(gallery.norms, dtype=np.float32))
+    np.save(path / files["labels"], np.asarray(gallery.labels, dtype=np.int32))
+    with open(path / files["identities"], "w", encoding="utf-8") as f:
+        json.dump(list(gallery.identities), f, ensure_ascii=False)
+
+    # the previous generation stays on disk so a reader that just read the old
+    # meta.json can still open its files
+    keep = set(files.values())
+    try:
+        with open(path / "meta.json", encoding="utf-8") as f:
+            keep.update(json.load(f)["files"].values())
+    except (OSError, ValueError, KeyError):
+        pass
+
+    meta = {"version": GALLERY_VERSION, "count": len(gallery.encodings),
+            "dim": int(np.shape(gallery.encodings)[1]), "generation": stamp, "files": files}
+    if prototypes:
+        meta["prototypes"] = int(prototypes)
+    tmp = path / f"meta.json.{os.getpid()}-{stamp}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, path / "meta.json")
+
+    # older generations are no longer referenced; open memory maps keep working on POSIX
+    for old in path.iterdir():
+        if old.suffix in (".npy", ".json") and old.name != "meta.json" and old.name not in keep:
+            try:
+                old.unlink()
+            except OSError:
+                pass  # still mapped by a reader on Windows, removed next time
+    return meta
+
+
+def read_meta(path):
+    """meta.json of a gallery directory, {} if none has been written yet."""
+    try:
+        with open(Path(path) / "meta.json", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def load_gallery(path, mmap=True):
+    """Load a gallery directory. With mmap the matrix pages are shared by every
+    process on the host instead of each holding its own copy."""
+    path = Path(path)
+    with open(path / "meta.json", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("version") != GALLERY_VERSION:
+        raise ValueError(f"{path}: unsupported gallery version {meta.get('version')}")
+    files = meta["files"]
+    # numpy cannot memory-map a zero-length array
+    mode = "r" if mmap and meta["count"] else None
+    encodings = np.load(path / files["encodings"], mmap_mode=mode)
+    norms = np.load(path / files["norms"], mmap_mode=mode)
+    labels = np.load(path / files["labels"])
+    with open(path / files["identities"], encoding="utf-8") as f:
+        identities = json.load(f)
+    # galleries saved before generations were recorded: the data file names are unique per save
+    return Gallery(encodings, norms, labels, identities, meta.get("generation") or files["encodings"])
+
+
+def convert_pickle(pickle_path, gallery_path=None):
+    """One-shot conversion of a {"encodings": [...], "names": [...]} pickle."""
+    gallery_path = gallery_path or gallery_path_for(pickle_path)
+    with open(pickle_path, "rb") as f:
+        data = pickle.load(f)
+    meta = save_gallery(gallery_path, build_gallery(data["encodings"], data["names"]))
+    print(f"Converted {pickle_path} -> {gallery_path} ({meta['count']} encodings)")
+    return gallery_path
+
+
+def open_gallery(model_path, mmap=True):
+    """Load the gallery that belongs to a model path, converting a legacy pickle on first use."""
+    gallery_path = gallery_path_for(model_path)
+    if not (gallery_path / "meta.json").exists() and Path(model_path).exists():
+        convert_pickle(model_path, gallery_path)
+    return load_gallery(gallery_path, mmap=mmap)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python gallery_store.py <encodings.pickle> [<output.gallery>]")
+        sys.exit(1)
+    convert_pickle(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
@@ -1,30 +1,175 @@
+import argparse
 import sqlite3
+from datetime import datetime
 
-conn = sqlite3.connect("attendance.sqlite3")
-c = conn.cursor()
-
-# Create students table
-c.execute('''
-CREATE TABLE IF NOT EXISTS students (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    name TEXT NOT NULL,
-    roll_no TEXT UNIQUE NOT NULL,
-    class TEXT,
-    image_path TEXT
-)
-''')
-
-# Create attendance table (if not already)
-c.execute('''
-CREATE TABLE IF NOT EXISTS attendance (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    name TEXT,
-    date TEXT,
-    time TEXT,
-    status TEXT
+from attendance_query import SORT_INDEX_SQL
+from attendance_store import DB_PATH, connect
+from summary import ensure_summary
+
+
+def create_tables(conn):
+    c = conn.cursor()
+
+    # Create students table
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS students (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        roll_no TEXT UNIQUE NOT NULL,
+        class TEXT,
+        image_path TEXT
+    )
+    ''')
+
+    # Create attendance table (if not already)
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS attendance (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        date TEXT,
+        time TEXT,
+        status TEXT
+    )
+    ''')
+    conn.commit()
+
+
+# One mark per day for each key, enforced by a partial unique index:
+# (index, key, rows it covers, rows that can collide). Subjects are compared
+# through COALESCE because SQLite treats NULLs as distinct in unique indexes,
+# and most marks have no subject.
+UNIQUE_MARKS = (
+    # one mark per student, subject and day (Streamlit apps)
+    ("ux_attendance_student_subject_day", "student_id, COALESCE(subject, ''), date",
+     "student_id IS NOT NULL", "student_id IS NOT NULL AND date IS NOT NULL"),
+    # one mark per name, subject and day (camera loops, which only know the name;
+    # multi_stream.py records each stream's subject)
+    ("ux_attendance_name_subject_day", "name, COALESCE(subject, ''), date",
+     "student_id IS NULL", "student_id IS NULL AND name IS NOT NULL AND date IS NOT NULL"),
 )
-''')
+# replaced by an entry of UNIQUE_MARKS; dropped once the replacement exists
+RETIRED_INDEXES = ("ux_attendance_student_subject_date", "ux_attendance_name_date")
+
+
+def _add_columns(conn):
+    # the scripts created `attendance` with different columns (name-based for the
+    # camera loops, student_id/subject for the Streamlit apps)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(attendance)")}
+    for column, kind in (("name", "TEXT"), ("student_id", "INTEGER"), ("subject", "TEXT")):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE attendance ADD COLUMN {column} {kind}")
+
+
+def _duplicates(key, collide):
+    # every row of a colliding group except its earliest mark
+    return f"""attendance WHERE {collide} AND id NOT IN (
+        SELECT MIN(id) FROM attendance WHERE {collide} GROUP BY {key})"""
+
+
+def count_duplicates(conn):
+    """{index: rows that keep it from being created}."""
+    return {index: conn.execute(f"SELECT COUNT(*) FROM {_duplicates(key, collide)}").fetchone()[0]
+            for index, key, _, collide in UNIQUE_MARKS}
+
+
+def migrate(conn):
+    """Bring an existing attendance table up to the indexed schema.
+
+    Adds missing columns and indexes and never deletes anything, so it is safe
+    to run on every start. A unique index is only created once the table has no
+    duplicates for it; until then the old one (if any) stays in place and a
+    warning points at `python init_db.py dedupe`. Returns the number of
+    duplicate rows still pending.
+    """
+    c = conn.cursor()
+    _add_columns(conn)
+
+    indexes = {row[0] for row in c.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    pending = 0
+    for index, key, where, collide in UNIQUE_MARKS:
+        if index in indexes:
+            continue
+        duplicates = c.execute(f"SELECT COUNT(*) FROM {_duplicates(key, collide)}").fetchone()[0]
+        if duplicates:
+            pending += duplicates
+            continue
+        c.execute(f"CREATE UNIQUE INDEX {index} ON attendance({key}) WHERE {where}")
+        indexes.add(index)
+    if all(index in indexes for index, *_ in UNIQUE_MARKS):
+        for index in RETIRED_INDEXES:
+            c.execute(f"DROP INDEX IF EXISTS {index}")
+    # reports list marks newest first
+    c.execute("CREATE INDEX IF NOT EXISTS ix_attendance_date_time ON attendance(date, time)")
+    c.execute(SORT_INDEX_SQL)  # the NULL-safe sort key of attendance_query's pages
+    # absentee anti-joins look a student up by day, whatever the subject (see roster.py)
+    c.execute("CREATE INDEX IF NOT EXISTS ix_attendance_student_date ON attendance(student_id, date)")
+    if c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'students'").fetchone():
+        c.execute("CREATE INDEX IF NOT EXISTS ix_students_class ON students(TRIM(class))")
+    conn.commit()
+    # daily / per-student counts maintained by triggers (see summary.py)
+    ensure_summary(conn)
+    if pending:
+        print(f"⚠️ {pending} duplicate attendance rows block the one-mark-per-day indexes. "
+              "Review them with `python init_db.py dedupe --dry-run`, then run `python init_db.py dedupe`.")
+    return pending
+
+
+def backup(conn, path):
+    """Consistent copy of the whole database, also while other processes write to it."""
+    dest = sqlite3.connect(path)
+    try:
+        conn.backup(dest)
+    finally:
+        dest.close()
+    return path
+
+
+def dedupe(conn, dry_run=False, backup_path=None):
+    """Delete duplicate marks, keeping the earliest of each group, then create the
+    unique indexes. With dry_run only counts. Returns {index: rows (to be) removed}."""
+    _add_columns(conn)
+    counts = count_duplicates(conn)
+    if dry_run or not any(counts.values()):
+        return counts
+    if backup_path:
+        backup(conn, backup_path)
+    with conn:
+        # the summary triggers (summary.py) keep the daily counts in step with the deletes
+        for index, key, _, collide in UNIQUE_MARKS:
+            conn.execute(f"DELETE FROM {_duplicates(key, collide)}")
+    migrate(conn)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create or upgrade the attendance database")
+    parser.add_argument("--db", default=DB_PATH, help="database file")
+    sub = parser.add_subparsers(dest="command")
+    p = sub.add_parser("dedupe", help="delete duplicate marks (keeps the earliest) so the unique indexes can be created")
+    p.add_argument("--dry-run", action="store_true", help="only count the rows that would be deleted")
+    p.add_argument("--no-backup", action="store_true", help="skip the copy of the database made before deleting")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    create_tables(conn)
+    if args.command == "dedupe":
+        backup_path = None if args.dry_run or args.no_backup else f"{args.db}.{datetime.now():%Y%m%d-%H%M%S}.bak"
+        counts = dedupe(conn, args.dry_run, backup_path)
+        total = sum(counts.values())
+        for index, removed in counts.items():
+            print(f"  {index}: {removed} duplicate rows")
+        if args.dry_run:
+            print(f"🔎 {total} duplicate attendance rows would be removed (no rows deleted).")
+        elif total:
+            print(f"💾 Backup written to {backup_path}" if backup_path else "⚠️ No backup made.")
+            print(f"🧹 Removed {total} duplicate attendance rows.")
+        else:
+            print("✅ No duplicate attendance rows.")
+    else:
+        migrate(conn)
+        print("✅ Database initialized with 'students' and 'attendance' tables.")
+    conn.close()
+
 
-conn.commit()
-conn.close()
-print("✅ Database initialized with 'students' and 'attendance' tables.")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# lbph_model.py
+# Persisted LBPH recognizer for the Streamlit apps. The trained model is saved as
+# OpenCV's YAML next to a small JSON file describing what it was trained on, so
+# a rerun only reloads it, and newly enrolled students are added with update()
+# instead of retraining everybody.
+import hashlib
+import json
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+FACE_SIZE = (200, 200)  # every training crop and every probe is resized to this
+MODEL_PATH = "lbph_model.yml"
+
+
+def normalize_face(image):
+    """Grayscale, fixed-size crop as used for enrollment, training and predict."""
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    if image.shape[:2] != FACE_SIZE[::-1]:
+        image = cv2.resize(image, FACE_SIZE)
+    return image
+
+
+def describe_samples(samples):
+    """[(student_id, path), ...] -> sorted [[student_id, path, size, mtime_ns], ...] for existing files."""
+    described = []
+    for student_id, path in samples:
+        try:
+            stat = Path(path).stat()
+        except OSError:
+            continue
+        described.append([int(student_id), str(path), stat.st_size, stat.st_mtime_ns])
+    return sorted(described)
+
+
+def fingerprint(described):
+    """Changes whenever a student/image pairing or an image file changes."""
+    return hashlib.sha1(json.dumps(described).encode("utf-8")).hexdigest()
+
+
+def _read_faces(described):
+    faces, labels = [], []
+    for student_id, path, _, _ in described:
+        img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if img is not None:
+            faces.append(normalize_face(img))
+            labels.append(student_id)
+    return faces, np.array(labels, dtype=np.int32)
+
+
+def load_or_train(samples, model_path=MODEL_PATH):
+    """Returns a trained cv2.face LBPH recognizer, or None if there is nothing to train on.
+
+    Reuses the saved model when the samples are unchanged, and only feeds the new
+    samples through update() when everything the model was trained on is still there.
+    """
+    model_path = Path(model_path)
+    meta_path = model_path.with_suffix(".json")
+    described = describe_samples(samples)
+    current = fingerprint(described)
+
+    meta = None
+    if model_path.exists() and meta_path.exists():
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    if meta is not None and meta.get("fingerprint") == current:
+        recognizer.read(str(model_path))
+        return recognizer
+
+    trained = {tuple(s) for s in meta["samples"]} if meta is not None else set()
+    if meta is not None and trained.issubset(tuple(s) for s in described):
+        # only new enrollments since the last save
+        faces, labels = _read_faces([s for s in described if tuple(s) not in trained])
+        recognizer.read(str(model_path))
+        if faces:
+            recognizer.update(faces, labels)
+    else:
+        faces, labels = _read_faces(described)
+        if not faces:
+            return None
+        recognizer.train(faces, labels)
+
+    recognizer.write(str(model_path))
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"fingerprint": current, "face_size": FACE_SIZE, "samples": described}, f)
+    return recognizer
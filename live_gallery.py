@@ -0,0 +1,225 @@
+# live_gallery.py
+# Hot-reloadable gallery for running recognizers, and incremental enrollment.
+#
+# LiveMatcher keeps the current FaceMatcher behind one reference
+# (read-copy-update). Every match() works on whichever matcher was current when
+# it started. A reload or an enrollment builds a complete new matcher first and
+# then swaps the reference, so recognition never pauses and never sees a
+# half-updated gallery. The previous generation's files stay on disk until the
+# next save (see gallery_store.save_gallery), so matches in flight finish on it.
+#
+#   python live_gallery.py enroll prashant              # encode the images in dataset/prashant/
+#   python live_gallery.py enroll prashant a.jpg b.jpg  # or just these images
+#   python live_gallery.py remove prashant
+#
+# Only the new student's images are encoded. A recognizer running
+# LiveMatcher(...).watch() picks the change up within WATCH_INTERVAL seconds.
+import argparse
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from ann_index import IVFIndex, index_path_for
+from face_matcher import FaceMatcher
+from gallery_store import build_gallery, gallery_lock, gallery_path_for, open_gallery, read_meta, save_gallery
+from prototypes import compress
+from recognition import MODEL_PATH, load_matcher
+
+CACHE_PATH = "trained_faces.cache.pkl"  # shared with train_svm.py, so a full retrain reuses the encodings
+WATCH_INTERVAL = 1.0  # seconds between checks of the gallery files
+
+
+def _stamp(path):
+    try:
+        stat = path.stat()
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
+
+def files_stamp(model_path):
+    """Changes whenever a new gallery generation or ANN index is published."""
+    return _stamp(gallery_path_for(model_path) / "meta.json"), _stamp(index_path_for(model_path))
+
+
+def publish(model_path=MODEL_PATH, add=None, remove=()):
+    """Write a new gallery generation with the identities in `remove` dropped and
+    `add` ({name: [encoding, ...]}) appended, replacing earlier rows of those names.
+    A gallery trained with --prototypes K gets the added rows compressed to K too.
+
+    The gallery's meta.json is written first, then an existing ANN index is
+    re-bucketed for the new rows and stamped with the new generation. A reader that
+    sees the new gallery with the old index finds the stamps differ and searches
+    exactly until the index lands. Returns (gallery, index).
+    """
+    add = add or {}
+    gallery_path = gallery_path_for(model_path)
+    # held across read, write and index update: the CLI, the service and a trainer
+    # may publish at the same time from different processes
+    with gallery_lock(gallery_path):
+        if (gallery_path / "meta.json").exists() or Path(model_path).exists():
+            gallery = open_gallery(model_path, mmap=False)
+        else:
+            gallery = build_gallery([], [])
+        names = np.asarray(gallery.identities, dtype=object)[gallery.labels] if len(gallery.labels) else []
+        drop = set(remove) | set(add)
+        keep = [i for i, name in enumerate(names) if name not in drop]
+        encodings = [gallery.encodings[i] for i in keep]
+        labels = [names[i] for i in keep]
+        prototypes = read_meta(gallery_path).get("prototypes")
+        for name, rows in add.items():
+            if prototypes and rows:
+                kept, outliers = compress(rows, [name] * len(rows), prototypes)
+                for row, _, distance in outliers:
+                    print(f"⚠️ Outlier encoding {row} of {name} not stored (distance {distance:.2f})")
+                print(f"🧩 Kept {len(kept)} of {len(rows)} encodings of {name} (at most {prototypes} per student)")
+                rows = [rows[i] for i in kept]
+            encodings.extend(rows)
+            labels.extend([name] * len(rows))
+        gallery = build_gallery(encodings, labels)
+        meta = save_gallery(gallery_path, gallery, prototypes)
+        gallery = gallery._replace(generation=meta["generation"])
+
+        index = IVFIndex.load(index_path_for(model_path))
+        if index is not None:
+            index = index.reassign(gallery.encodings, gallery=gallery.generation)
+            if index is None:
+                index_path_for(model_path).unlink()
+            else:
+                index.save(index_path_for(model_path))
+        return gallery, index
+
+
+def encode_student(paths, workers=1):
+    """Encodings of one student's images, through the trainer's encoding cache."""
+    from dataset_encoder import EncodingCache, encode_files
+
+    cache = EncodingCache(CACHE_PATH)
+    results, _ = encode_files(list(paths), cache, workers=workers)
+    cache.save()
+    encodings = []
+    for path, (_, encoding, error) in zip(paths, results):
+        if error is not None:
+            print(f"⚠️ Error processing {path}: {error}")
+        elif encoding is not None:
+            encodings.append(encoding)
+    return encodings
+
+
+def enroll(label, paths=None, model_path=MODEL_PATH, workers=1):
+    """Encode one student's images (default: their dataset/<label>/ folder in the
+    manifest) and publish them. Returns the number of encodings added."""
+    if not paths:
+        from dataset_manifest import open_manifest, person_images
+
+        conn = open_manifest()
+        paths = [path for path, _ in person_images(conn, label)]
+        conn.close()
+    encodings = encode_student(paths, workers)
+    if encodings:
+        publish(model_path, add={label: encodings})
+    return len(encodings)
+
+
+class LiveMatcher:
+    """Drop-in for FaceMatcher whose gallery can change while recognizers run."""
+
+    def __init__(self, model_path=MODEL_PATH, tolerance=0.6, nprobe=8):
+        self.model_path = model_path
+        self.tolerance = tolerance
+        self.nprobe = nprobe
+        self.generation = 0
+        self._lock = threading.Lock()  # serializes writers; readers never take it
+        self._stamp = files_stamp(model_path)
+        self.current = load_matcher(model_path, tolerance, nprobe)
+        self._watcher = None
+
+    def match(self, face_encodings):
+        # one read of the reference: the whole call sees a single generation
+        return self.current.match(face_encodings)
+
+    def __len__(self):
+        return len(self.current)
+
+    def __getattr__(self, name):
+        # encodings, identities, ... of the current generation
+        if name == "current":
+            raise AttributeError(name)
+        return getattr(self.current, name)
+
+    def _swap(self, matcher, reason):
+        self.current = matcher
+        self.generation += 1
+        print(f"🔄 Gallery {reason}: {len(matcher)} encodings, {len(matcher.identities)} identities")
+
+    def reload(self, force=False):
+        """Load a new generation if the files changed since the last one. Returns True if swapped."""
+        with self._lock:
+            stamp = files_stamp(self.model_path)
+            if stamp == self._stamp and not force:
+                return False
+            matcher = load_matcher(self.model_path, self.tolerance, self.nprobe)
+            self._stamp = stamp
+            self._swap(matcher, "reloaded")
+            return True
+
+    def watch(self, interval=WATCH_INTERVAL):
+        """Poll the gallery files on a daemon thread. Returns self."""
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reload()
+                except Exception as e:
+                    # e.g. a trainer replaced files between our reads; the next poll retries
+                    print(f"⚠️ Gallery reload failed: {e}")
+
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=loop, daemon=True)
+            self._watcher.start()
+        return self
+
+    def enroll(self, label, encodings):
+        """Publish one student's encodings and switch to them right away."""
+        return self._publish(add={label: list(encodings)}, reason=f"enrolled {label}")
+
+    def remove(self, label):
+        return self._publish(remove=(label,), reason=f"removed {label}")
+
+    def _publish(self, add=None, remove=(), reason="updated"):
+        with self._lock:
+            gallery, index = publish(self.model_path, add, remove)
+            self._stamp = files_stamp(self.model_path)
+            self._swap(FaceMatcher.from_gallery(gallery, self.tolerance, index, self.nprobe), reason)
+            return len(gallery.encodings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add or remove one student in the gallery without retraining")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("enroll")
+    p.add_argument("label", help="name the images belong to, as in dataset/<name>/")
+    p.add_argument("images", nargs="*", help="image files (default: the dataset/<label>/ images in the manifest)")
+    p.add_argument("--workers", type=int, default=1, help="encoding processes")
+    p = sub.add_parser("remove")
+    p.add_argument("label")
+    for p in sub.choices.values():
+        p.add_argument("--model", default=MODEL_PATH, help="gallery / encodings file")
+    args = parser.parse_args()
+
+    if args.command == "enroll":
+        added = enroll(args.label, args.images, args.model, args.workers)
+        if not added:
+            print(f"❌ No face found in the images of {args.label}")
+            return
+        print(f"✅ Enrolled {args.label} with {added} encodings")
+    else:
+        gallery, _ = publish(args.model, remove=(args.label,))
+        print(f"🗑 Removed {args.label} ({len(gallery.encodings)} encodings left)")
+    print(f"📢 Running recognizers pick this up within {WATCH_INTERVAL:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+# metrics.py
+# Low-overhead timing instrumentation for the camera loops.
+#
+# Every stage (capture, detect, encode, match, persist, render) is timed into a
+# histogram: cumulative buckets for Prometheus, plus a rolling window of the
+# most recent observations for live p50/p90/p99. Queue depths and dropped-frame
+# counters are read lazily from callbacks when the metrics are scraped.
+#
+#   metrics = Metrics()
+#   metrics.serve()                      # http://127.0.0.1:9108/metrics (Prometheus text)
+#   with metrics.timed("detect"):        #                     /metrics.json (dashboard)
+#       boxes = detect_faces(...)
+#   metrics.observe("faces_per_frame", len(boxes))
+import json
+import threading
+import time
+import urllib.request
+from bisect import bisect_left
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PORT = 9108
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)  # seconds
+COUNT_BUCKETS = (0, 1, 2, 3, 4, 6, 8, 12, 16, 32)
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class Histogram:
+    """Cumulative bucket counts since start, and quantiles over the last `window` values."""
+
+    def __init__(self, buckets, window=1024):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.recent.append(value)
+
+    def quantiles(self, qs=QUANTILES):
+        values = sorted(self.recent)
+        if not values:
+            return {q: None for q in qs}
+        return {q: values[min(len(values) - 1, int(q * len(values)))] for q in qs}
+
+
+class Metrics:
+    """Thread-safe registry shared by the capture, recognition and writer threads."""
+
+    def __init__(self, prefix="attendance", window=1024):
+        self.prefix = prefix
+        self.window = window
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self.stages = {}       # stage -> Histogram of seconds
+        self.histograms = {}   # name -> Histogram of plain values (faces per frame, ...)
+        self.counters = defaultdict(int)
+        self._callbacks = {}   # (name, label, value) -> (kind, fn), read at scrape time
+
+    def observe_stage(self, stage, seconds):
+        with self._lock:
+            hist = self.stages.get(stage)
+            if hist is None:
+                hist = self.stages[stage] = Histogram(STAGE_BUCKETS, self.window)
+            hist.observe(seconds)
+
+    @contextmanager
+    def timed(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, time.perf_counter() - started)
+
+    def observe(self, name, value, buckets=COUNT_BUCKETS):
+        with self._lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = Histogram(buckets, self.window)
+            hist.observe(value)
+
+    def inc(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def gauge(self, name, fn, label=None, kind="gauge"):
+        """Register fn() to be read on every scrape. label is an optional (key, value) pair;
+        kind="counter" for monotonic totals kept elsewhere, e.g. LatestQueue.dropped."""
+        self._callbacks[(name, *(label or (None, None)))] = (kind, fn)
+
+    def snapshot(self):
+        """Plain dict of everything, used by /metrics.json and the dashboard."""
+        with self._lock:
+            stages = {stage: _summary(h, scale=1000) for stage, h in self.stages.items()}
+            histograms = {name: _summary(h) for name, h in self.histograms.items()}
+            counters = dict(self.counters)
+        gauges = {}
+        for (name, key, value), (_, fn) in list(self._callbacks.items()):
+            gauges[name if key is None else f"{name}{{{key}={value}}}"] = _read(fn)
+        return {"uptime_s": round(time.time() - self.started, 1), "stages_ms": stages,
+                "histograms": histograms, "counters": counters, "gauges": gauges}
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        p = self.prefix
+        lines = []
+        with self._lock:
+            if self.stages:
+                lines.append(f"# HELP {p}_stage_duration_seconds Time spent per frame in each pipeline stage")
+                lines.append(f"# TYPE {p}_stage_duration_seconds histogram")
+                for stage, hist in sorted(self.stages.items()):
+                    lines.extend(_histogram_lines(f"{p}_stage_duration_seconds", hist, f'stage="{stage}"'))
+                lines.append(f"# HELP {p}_stage_duration_seconds_recent Quantiles over the most recent observations")
+                lines.append(f"# TYPE {p}_stage_duration_seconds_recent gauge")
+                for stage, hist in sorted(self.stages.items()):
+                    for q, value in hist.quantiles().items():
+                        if value is not None:
+                            lines.append(f'{p}_stage_duration_seconds_recent{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+            for name, hist in sorted(self.histograms.items()):
+                lines.append(f"# TYPE {p}_{name} histogram")
+                lines.extend(_histogram_lines(f"{p}_{name}", hist))
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE {p}_{name}_total counter")
+                lines.append(f"{p}_{name}_total {value}")
+        typed = set()
+        for (name, key, label), (kind, fn) in sorted(self._callbacks.items(), key=lambda item: str(item[0])):
+            metric = f"{p}_{name}_total" if kind == "counter" else f"{p}_{name}"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} {kind}")
+                typed.add(metric)
+            labels = "" if key is None else f'{{{key}="{label}"}}'
+            value = _read(fn)
+            if value is not None:
+                lines.append(f"{metric}{labels} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=METRICS_PORT, host="127.0.0.1"):
+        """Start the HTTP endpoint on a daemon thread. Returns the server (call shutdown() to stop),
+        or None if the port is taken, e.g. by a second recognizer on the same machine."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = metrics.render().encode(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = json.dumps(metrics.snapshot()).encode(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # keep the console for attendance messages
+
+        try:
+            server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as e:
+            print(f"⚠️ metrics endpoint not started on port {port}: {e}")
+            return None
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"📈 Metrics at http://{host}:{port}/metrics")
+        return server
+
+
+def fetch_metrics(url=f"http://127.0.0.1:{METRICS_PORT}/metrics.json", timeout=1.0):
+    """Snapshot from a running recognizer, or None if none is listening."""
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return json.load(response)
+    except (OSError, ValueError):
+        return None
+
+
+def render_metrics_panel(st, url=None):
+    """Live recognizer panel for the Streamlit dashboards; `st` is the streamlit module.
+    Without a url, the sidebar asks for one."""
+    import pandas as pd  # only the dashboards need pandas, not the camera loops
+
+    st.subheader("Live recognizer metrics")
+    if url is None:
+        url = st.sidebar.text_input("Recognizer metrics URL", f"http://127.0.0.1:{METRICS_PORT}/metrics.json")
+    snapshot = fetch_metrics(url)
+    if snapshot is None:
+        st.info("No recognizer is running (start recognize_attendance.py or recognize_faces.py).")
+        return
+    stages = pd.DataFrame(snapshot["stages_ms"]).T
+    if not stages.empty:
+        st.write(f"Per-stage time in ms (last observations, uptime {snapshot['uptime_s']} s)")
+        st.dataframe(stages)
+        st.bar_chart(stages[["p50", "p99"]])
+    col1, col2 = st.columns(2)
+    col1.write("Counters")
+    col1.json({**snapshot["counters"], **snapshot["gauges"]})
+    col2.write("Faces per frame")
+    col2.json(snapshot["histograms"])
+    if st.button("Refresh metrics"):
+        st.rerun()
+
+
+def _read(fn):
+    try:
+        return fn()
+    except Exception:
+        return None
+
+
+def _summary(hist, scale=1):
+    summary = {"count": hist.count, "mean": round(hist.sum / hist.count * scale, 3) if hist.count else None}
+    for q, value in hist.quantiles().items():
+        summary[f"p{int(q * 100)}"] = None if value is None else round(value * scale, 3)
+    return summary
+
+
+def _histogram_lines(metric, hist, labels=""):
+    sep = "," if labels else ""
+    lines = []
+    cumulative = 0
+    for bound, count in zip(hist.buckets + (float("inf"),), hist.counts):
+        cumulative += count
+        le = "+Inf" if bound == float("inf") else repr(bound)
+        lines.append(f'{metric}_bucket{{{labels}{sep}le="{le}"}} {cumulative}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{metric}_sum{suffix} {hist.sum:.6f}")
+    lines.append(f"{metric}_count{suffix} {hist.count}")
+    return lines
@@ -0,0 +1,349 @@
+# multi_stream.py
+# One process recognizing faces on many camera streams at once.
+#
+# Every source (device index, RTSP/HTTP URL or video file) is read on its own
+# thread, throttled to --fps and kept latest-frame-wins. Detection + encoding,
+# the CPU-bound part, runs on one shared pool of --workers processes that all
+# streams feed round-robin, with a cap on how many frames of one stream may be
+# in flight, so a busy camera cannot starve a quiet one and the host runs one
+# encoder per core instead of one competing loop per camera. Matching happens
+# in this process against a single copy of the gallery. Each stream keeps its
+# own attendance session: a subject and a PresenceCache.
+#
+#   python multi_stream.py 0 rtsp://10.0.0.12/live lecture.mp4
+#   python multi_stream.py DBMS=0 OS=rtsp://10.0.0.12/live --fps 4 --workers 6
+#
+# A source may be prefixed with SUBJECT= ; marks from that stream are recorded
+# with that subject (default: the stream's name, e.g. "cam0"), once per name,
+# subject and day (see init_db.UNIQUE_MARKS).
+import argparse
+import math
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+
+from attendance_store import DB_PATH, PresenceCache, connect, mark_present
+from init_db import create_tables, migrate
+from metrics import METRICS_PORT, Metrics
+from pipeline import AttendanceWriter, LatestQueue
+from live_gallery import LiveMatcher
+from recognition import MODEL_PATH, encode_frame, encode_job
+
+RECONNECT_S = 2.0    # wait before reopening a network stream that dropped
+REPORT_S = 10.0      # how often the per-stream status line is printed
+
+
+class StreamSession:
+    """Attendance state of one stream: its subject and who it has already marked today."""
+
+    def __init__(self, subject, writer, cooldown=None):
+        self.subject = subject
+        self.writer = writer
+        self.presence = PresenceCache(cooldown=cooldown, session=subject)
+        self._lock = threading.Lock()  # several workers report results for the same stream
+
+    def seen(self, name):
+        with self._lock:
+            if not self.presence.should_mark(name):
+                return False
+            self.presence.mark(name)
+        self.writer.submit((self.subject, name, datetime.now()))
+        return True
+
+
+class StreamSource(threading.Thread):
+    """Reads one source. Frames come faster than `fps` are grabbed but never decoded;
+    video files are paced at their own frame rate so they behave like a camera."""
+
+    def __init__(self, name, source, session, fps=None, on_frame=None):
+        super().__init__(daemon=True, name=f"stream-{name}")
+        self.name = name
+        self.source = source
+        self.session = session
+        self.interval = 1.0 / fps if fps else 0.0
+        self.on_frame = on_frame
+        self.frames = LatestQueue()
+        self.stop_event = threading.Event()
+        self.is_file = Path(source).is_file()
+        self.is_network = "://" in source
+        self.captured = 0
+        self.processed = 0
+        self.faces = 0
+        self.latency = 0.0
+
+    def _open(self):
+        cap = cv2.VideoCapture(int(self.source) if self.source.isdigit() else self.source)
+        if not cap.isOpened():
+            cap.release()
+            return None
+        return cap
+
+    def run(self):
+        cap = None
+        next_due = 0.0
+        started = 0.0
+        try:
+            while not self.stop_event.is_set():
+                if cap is None:
+                    cap = self._open()
+                    started = time.monotonic()
+                    if cap is None:
+                        if not self.is_network:
+                            print(f"❌ [{self.name}] unable to open {self.source}")
+                            return
+                        self.stop_event.wait(RECONNECT_S)
+                        continue
+                if not cap.grab():
+                    cap.release()
+                    cap = None
+                    if not self.is_network:
+                        print(f"📼 [{self.name}] end of {self.source}")
+                        return
+                    print(f"⚠️ [{self.name}] stream dropped, reconnecting...")
+                    self.stop_event.wait(RECONNECT_S)
+                    continue
+                self.captured += 1
+                if self.is_file:
+                    ahead = started + cap.get(cv2.CAP_PROP_POS_MSEC) / 1000 - time.monotonic()
+                    if ahead > 0:
+                        time.sleep(ahead)
+                now = time.monotonic()
+                if now < next_due:
+                    continue  # over the fps limit: skip the decode
+                ret, frame = cap.retrieve()
+                if not ret:
+                    continue
+                next_due = now + self.interval
+                self.frames.put((self.captured, now, frame))
+                if self.on_frame is not None:
+                    self.on_frame()
+        finally:
+            if cap is not None:
+                cap.release()
+            self.stop_event.set()
+
+    def stop(self):
+        self.stop_event.set()
+
+
+class FairScheduler:
+    """Hands waiting frames to workers round-robin across streams.
+
+    At most `per_stream` frames of one stream are being processed at a time, so
+    with more streams than workers every stream still gets its turn, and with
+    fewer streams the spare workers are shared out.
+    """
+
+    def __init__(self, streams, per_stream=1):
+        self.streams = streams
+        self.per_stream = per_stream
+        self._cond = threading.Condition()
+        self._next = 0
+        self._in_flight = [0] * len(streams)
+
+    def notify(self):
+        with self._cond:
+            self._cond.notify()
+
+    def take(self, timeout=0.5):
+        """(index, stream, (seq, captured_at, frame)), or None if nothing came in time."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                n = len(self.streams)
+                for i in range(n):
+                    index = (self._next + i) % n
+                    if self._in_flight[index] >= self.per_stream:
+                        continue
+                    item = self.streams[index].frames.get_nowait()
+                    if item is not None:
+                        self._next = (index + 1) % n
+                        self._in_flight[index] += 1
+                        return index, self.streams[index], item
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def done(self, index):
+        with self._cond:
+            self._in_flight[index] -= 1
+            self._cond.notify()
+
+
+class RecognitionWorker(threading.Thread):
+    """Takes frames from the scheduler, encodes them in the shared process pool
+    (or in this thread without one) and matches against the shared gallery."""
+
+    def __init__(self, scheduler, matcher, pool=None, scale=1.0, metrics=None):
+        super().__init__(daemon=True)
+        self.scheduler = scheduler
+        self.matcher = matcher
+        self.pool = pool
+        self.scale = scale
+        self.metrics = metrics
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            taken = self.scheduler.take()
+            if taken is None:
+                continue
+            index, stream, (_, captured_at, frame) = taken
+            try:
+                self._process(stream, captured_at, frame)
+            except Exception as e:
+                print(f"⚠️ [{stream.name}] recognition failed: {e}")
+            finally:
+                self.scheduler.done(index)
+
+    def _process(self, stream, captured_at, frame):
+        started = time.perf_counter()
+        if self.pool is not None:
+            boxes, encodings = self.pool.submit(encode_job, (frame, self.scale)).result()
+            if self.metrics is not None:
+                # detect + encode in the worker process, including the frame transfer
+                self.metrics.observe_stage("encode_pool", time.perf_counter() - started)
+        else:
+            boxes, encodings = encode_frame(frame, self.scale, metrics=self.metrics)
+        matches = []
+        if encodings:
+            started = time.perf_counter()
+            matches = self.matcher.match(encodings)
+            if self.metrics is not None:
+                self.metrics.observe_stage("match", time.perf_counter() - started)
+        stream.processed += 1
+        stream.faces += len(boxes)
+        stream.latency = time.monotonic() - captured_at
+        if self.metrics is not None:
+            self.metrics.observe_stage("end_to_end", stream.latency)
+            self.metrics.observe("faces_per_frame", len(boxes))
+        for match in matches:
+            if match.name != "Unknown":
+                stream.session.seen(match.name)  # write_mark reports the outcome
+
+    def stop(self):
+        self.stop_event.set()
+
+
+def parse_sources(specs):
+    """'SUBJECT=source' or 'source' -> [(name, subject, source), ...]"""
+    parsed = []
+    for i, spec in enumerate(specs):
+        m = re.match(r"^([\w -]+)=(.+)$", spec)
+        subject, source = (m.group(1), m.group(2)) if m else (None, spec)
+        name = f"cam{source}" if source.isdigit() else (subject or f"stream{i + 1}")
+        parsed.append((name, subject or name, source))
+    return parsed
+
+
+def write_mark(conn, item):
+    subject, name, when = item
+    if mark_present(conn, when.strftime("%Y-%m-%d"), when.strftime("%H:%M:%S"), subject=subject, name=name):
+        print(f"✅ {name} ({subject})")
+    else:
+        # e.g. marked by an earlier run today
+        print(f"ℹ️ {name} ({subject}) was already marked today")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recognize faces on several camera streams with one shared model")
+    parser.add_argument("sources", nargs="+", help="device index, RTSP/HTTP URL or video file, optionally SUBJECT=source")
+    parser.add_argument("--fps", type=float, default=5.0, help="frames per second taken from each stream (0 = all)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="encoding processes shared by all streams (0 = one per CPU core)")
+    parser.add_argument("--in-process", action="store_true",
+                        help="encode on worker threads instead of processes (debugging)")
+    parser.add_argument("--scale", type=float, default=0.5, help="detection scale (encodings stay full resolution)")
+    parser.add_argument("--model", default=MODEL_PATH, help="gallery / encodings file")
+    parser.add_argument("--tolerance", type=float, default=0.6)
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database attendance is marked in")
+    parser.add_argument("--cooldown", type=float, default=None,
+                        help="seconds before a name may be marked again on the same stream (default: once per day)")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT)
+    args = parser.parse_args()
+
+    workers = args.workers or os.cpu_count() or 1
+    print("📂 Loading trained model...")
+    # one gallery for every stream; enrollments (live_gallery.py) are picked up while running
+    matcher = LiveMatcher(args.model, tolerance=args.tolerance).watch()
+    metrics = Metrics()
+    metrics.serve(args.metrics_port)
+
+    conn = connect(args.db)
+    create_tables(conn)
+    migrate(conn)
+    # one mark per name, subject and day (see init_db.UNIQUE_MARKS)
+    today = datetime.now().strftime("%Y-%m-%d")
+    marked_today = {}
+    for name, subject in conn.execute("""
+            SELECT name, COALESCE(subject, '') FROM attendance
+            WHERE date = ? AND student_id IS NULL AND name IS NOT NULL""", (today,)):
+        marked_today.setdefault(subject, set()).add(name)
+    conn.close()
+
+    writer = AttendanceWriter(args.db, write_mark, metrics=metrics)
+    writer.start()
+    streams = []
+    for name, subject, source in parse_sources(args.sources):
+        session = StreamSession(subject, writer, cooldown=args.cooldown)
+        session.presence.seed(marked_today.get(subject, ()))
+        stream = StreamSource(name, source, session, fps=args.fps)
+        metrics.gauge("frames_dropped", lambda s=stream: s.frames.dropped, ("stream", name), kind="counter")
+        metrics.gauge("frames_processed", lambda s=stream: s.processed, ("stream", name), kind="counter")
+        streams.append(stream)
+
+    # enough frames in flight per stream to keep every worker busy, but no more
+    scheduler = FairScheduler(streams, per_stream=max(1, math.ceil(workers / len(streams))))
+    pool = None if args.in_process else ProcessPoolExecutor(max_workers=workers)
+    recognizers = [RecognitionWorker(scheduler, matcher, pool, args.scale, metrics) for _ in range(workers)]
+    for stream in streams:
+        stream.on_frame = scheduler.notify
+        stream.start()
+    for recognizer in recognizers:
+        recognizer.start()
+
+    print(f"▶ {len(streams)} streams, {workers} {'threads' if pool is None else 'encoder processes'}. "
+          "Press Ctrl+C to stop.")
+    started = time.monotonic()
+    last = {stream.name: 0 for stream in streams}
+    next_report = started + REPORT_S
+    try:
+        while any(stream.is_alive() for stream in streams):
+            time.sleep(0.2)
+            if time.monotonic() < next_report:
+                continue
+            next_report += REPORT_S
+            elapsed = time.monotonic() - started
+            parts = []
+            for stream in streams:
+                rate = (stream.processed - last[stream.name]) / REPORT_S
+                last[stream.name] = stream.processed
+                parts.append(f"{stream.name}: {rate:.1f} fps, {stream.faces} faces, "
+                             f"{stream.frames.dropped} dropped, {stream.latency * 1000:.0f} ms")
+            total_faces = sum(stream.faces for stream in streams)
+            print(f"📊 {elapsed:.0f}s  {total_faces / elapsed:.1f} faces/s  |  " + "  |  ".join(parts))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for stream in streams:
+            stream.stop()
+        for recognizer in recognizers:
+            recognizer.stop()
+        for recognizer in recognizers:
+            recognizer.join()
+        if pool is not None:
+            pool.shutdown()
+        writer.stop()
+        writer.join()
+    print(f"✅ {sum(s.processed for s in streams)} frames, {sum(s.faces for s in streams)} faces")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+# pipeline.py
+# Staged capture -> recognize -> persist pipeline for the camera loops.
+#
+# The camera is read on its own thread and only the newest frame is kept
+# (latest-frame-wins), recognition runs on a second thread on whatever frame is
+# newest when it becomes free, and attendance writes go through a bounded queue
+# to a third thread. The display loop draws the latest frame with the latest
+# results, so display fps no longer depends on recognition fps.
+#
+# Each stage takes an optional metrics.Metrics and reports its timings, queue
+# depth and dropped frames to it.
+import queue
+import threading
+import time
+
+from attendance_store import connect
+
+
+class LatestQueue:
+    """Bounded queue of size 1: putting a new item replaces one that was never taken."""
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=1)
+        self.dropped = 0
+
+    def put(self, item):
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        """Returns None on timeout."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def get_nowait(self):
+        """Returns None when empty."""
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def qsize(self):
+        return self._queue.qsize()
+
+
+class FrameGrabber(threading.Thread):
+    """Reads frames as fast as the camera delivers them."""
+
+    def __init__(self, capture, metrics=None):
+        super().__init__(daemon=True)
+        self.capture = capture
+        self.metrics = metrics
+        self.stop_event = threading.Event()
+        self.consumers = []  # LatestQueue per downstream stage
+        self._cond = threading.Condition()
+        self._frame = None
+        self._seq = 0
+
+    def subscribe(self):
+        q = LatestQueue()
+        self.consumers.append(q)
+        if self.metrics is not None:
+            self.metrics.gauge("frames_dropped", lambda: q.dropped, ("consumer", len(self.consumers)), kind="counter")
+        return q
+
+    def run(self):
+        while not self.stop_event.is_set():
+            started = time.perf_counter()
+            ret, frame = self.capture.read()
+            if not ret:
+                break
+            if self.metrics is not None:
+                self.metrics.observe_stage("capture", time.perf_counter() - started)
+                self.metrics.inc("frames_captured")
+            with self._cond:
+                self._seq += 1
+                self._frame = frame
+                self._cond.notify_all()
+            for q in self.consumers:
+                q.put((self._seq, time.monotonic(), frame))
+        self.stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def wait_frame(self, last_seq, timeout=0.5):
+        """Block until a frame newer than last_seq exists. Returns (seq, frame); frame is
+        None on timeout or once the camera stopped."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > last_seq or self.stop_event.is_set(), timeout)
+            if self._seq > last_seq:
+                return self._seq, self._frame
+            return last_seq, None
+
+    def stop(self):
+        self.stop_event.set()
+
+
+class RecognitionWorker(threading.Thread):
+    """Runs recognize(frame) -> [((top, right, bottom, left), name), ...] on the newest frame.
+    recognize may return None to skip a frame.
+
+    Recognized names are handed to on_name (usually AttendanceWriter.submit).
+    """
+
+    def __init__(self, frames, recognize, on_name=None, metrics=None):
+        super().__init__(daemon=True)
+        self.frames = frames
+        self.recognize = recognize
+        self.on_name = on_name
+        self.metrics = metrics
+        self.stop_event = threading.Event()
+        self.results = []
+        self.result_seq = 0
+        self.latency = 0.0  # seconds from capture to results of the last processed frame
+
+    def run(self):
+        while not self.stop_event.is_set():
+            item = self.frames.get(timeout=0.1)
+            if item is None:
+                continue
+            seq, captured_at, frame = item
+            try:
+                results = self.recognize(frame)
+            except Exception as e:
+                # one bad frame (or a gallery swap mid-match) must not stop recognition
+                print(f"⚠️ Recognition failed: {e}")
+                if self.metrics is not None:
+                    self.metrics.inc("recognition_errors")
+                continue
+            if results is None:
+                if self.metrics is not None:
+                    self.metrics.inc("frames_skipped")
+                continue  # frame skipped by the recognizer, keep the previous results
+            # publish a new list instead of mutating, so the renderer never sees a half-built one
+            self.results = results
+            self.result_seq = seq
+            self.latency = time.monotonic() - captured_at
+            if self.metrics is not None:
+                self.metrics.observe_stage("end_to_end", self.latency)
+                self.metrics.observe("faces_per_frame", len(results))
+            if self.on_name is not None:
+                for _, name in results:
+                    if name != "Unknown":
+                        self.on_name(name)
+
+    def stop(self):
+        self.stop_event.set()
+
+
+class AttendanceWriter(threading.Thread):
+    """Persists names on a dedicated thread with its own SQLite connection.
+
+    mark(conn, name) is called for every submitted name; the queue is bounded so a
+    stalled disk applies back-pressure instead of growing memory.
+    """
+
+    def __init__(self, db_path, mark, maxsize=256, metrics=None):
+        super().__init__(daemon=True)
+        self.db_path = db_path
+        self.mark = mark
+        self.queue = queue.Queue(maxsize=maxsize)
+        self._stop_token = object()
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.gauge("queue_depth", self.queue.qsize, ("queue", "writer"))
+
+    def submit(self, name):
+        self.queue.put(name)
+
+    def run(self):
+        conn = connect(self.db_path)
+        try:
+            while True:
+                name = self.queue.get()
+                if name is self._stop_token:
+                    break
+                started = time.perf_counter()
+                try:
+                    self.mark(conn, name)
+                    if self.metrics is not None:
+                        self.metrics.observe_stage("persist", time.perf_counter() - started)
+                except Exception as e:
+                    print(f"⚠️ could not mark attendance for {name}: {e}")
+        finally:
+            conn.close()
+
+    def stop(self):
+        # drains everything queued before the stop token
+        self.queue.put(self._stop_token)
@@ -0,0 +1,205 @@
+# prototypes.py
+# Per-identity prototype compression of the gallery.
+#
+# The trainers store one encoding per dataset image, ~20 per roll number, so
+# matching cost and memory grow with images rather than students. This reduces
+# each identity to at most k medoids: real encodings of that student that best
+# cover their other images, found by k-medoids. Encodings far from the rest of
+# their identity (another person in the frame, a bad crop, heavy blur) are
+# flagged as outliers and left out, instead of becoming a prototype that
+# attracts other students' faces.
+#
+#   python train_svm.py --prototypes 3                # train a compressed gallery
+#   python prototypes.py evaluate --k 1 2 3 5         # recall / latency against the full gallery
+#   python prototypes.py evaluate --synthetic 1000    # same on a synthetic 1000-student gallery
+import argparse
+from collections import defaultdict
+
+import numpy as np
+
+from face_matcher import FaceMatcher
+from gallery_store import open_gallery
+
+OUTLIER_Z = 3.0          # robust z-score (median / MAD) of the distance to the identity's medoid
+MIN_OUTLIER_DISTANCE = 0.45  # never flag closer than this; same-person dlib distances sit below ~0.4
+
+
+def pairwise(encodings):
+    x = np.asarray(encodings, dtype=np.float32)
+    sq = np.einsum("ij,ij->i", x, x)
+    return np.sqrt(np.maximum(sq[:, None] + sq[None, :] - 2.0 * x @ x.T, 0.0))
+
+
+def medoids(dists, k, iters=20):
+    """Indices of up to k medoids for a (n x n) distance matrix: farthest-first
+    seeding from the overall medoid, then alternating assign / re-centre until
+    stable. Fewer than k when there are fewer distinct points (duplicate images)."""
+    n = len(dists)
+    if n <= k:
+        return list(range(n))
+    chosen = [int(dists.sum(axis=1).argmin())]
+    while len(chosen) < k:
+        gaps = dists[:, chosen].min(axis=1)
+        farthest = int(gaps.argmax())
+        if gaps[farthest] <= 0:
+            break  # every remaining point duplicates a chosen one
+        chosen.append(farthest)
+    for _ in range(iters):
+        assign = dists[:, chosen].argmin(axis=1)
+        updated = []
+        for c, medoid in enumerate(chosen):
+            members = np.flatnonzero(assign == c)
+            if not len(members):
+                updated.append(medoid)  # lost all its points in a tie; keep it as is
+                continue
+            # the member with the smallest total distance to the rest of its cluster
+            updated.append(int(members[dists[np.ix_(members, members)].sum(axis=1).argmin()]))
+        if updated == chosen:
+            break
+        chosen = updated
+    return sorted(set(chosen))
+
+
+def find_outliers(dists, z=OUTLIER_Z, min_distance=MIN_OUTLIER_DISTANCE):
+    """Indices whose distance to the identity's medoid is far above the typical one.
+    Returns ([index, ...], distance to the medoid per row)."""
+    to_center = dists[int(dists.sum(axis=1).argmin())]
+    if len(dists) < 4:
+        return [], to_center  # too few images to tell an outlier from variety
+    median = float(np.median(to_center))
+    mad = 1.4826 * float(np.median(np.abs(to_center - median)))
+    limit = max(median + z * mad, min_distance)
+    return [int(i) for i in np.flatnonzero(to_center > limit)], to_center
+
+
+def prototype_count(text):
+    """argparse type for a number of prototypes per identity."""
+    k = int(text)
+    if k < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {k}")
+    return k
+
+
+def compress(encodings, names, k=3, z=OUTLIER_Z, min_distance=MIN_OUTLIER_DISTANCE):
+    """Choose the rows to keep. Returns (kept rows, [(row, name, distance), ...] outliers),
+    both as indices into `encodings`; kept rows stay in input order."""
+    if k < 1:
+        raise ValueError(f"k must be at least 1, got {k}")
+    rows_by_name = defaultdict(list)
+    for row, name in enumerate(names):
+        rows_by_name[name].append(row)
+    encodings = np.asarray(encodings, dtype=np.float32)
+    kept, outliers = [], []
+    for name, rows in rows_by_name.items():
+        rows = np.asarray(rows)
+        dists = pairwise(encodings[rows])
+        flagged, to_center = find_outliers(dists, z, min_distance)
+        outliers.extend((int(rows[i]), name, float(to_center[i])) for i in flagged)
+        inliers = np.setdiff1d(np.arange(len(rows)), flagged)
+        chosen = medoids(dists[np.ix_(inliers, inliers)], k)
+        kept.extend(int(rows[inliers[i]]) for i in chosen)
+    return sorted(kept), sorted(outliers)
+
+
+def split_holdout(names, every=5):
+    """Every `every`-th image of each identity with at least two becomes a query."""
+    seen = defaultdict(int)
+    counts = defaultdict(int)
+    for name in names:
+        counts[name] += 1
+    reference, queries = [], []
+    for row, name in enumerate(names):
+        seen[name] += 1
+        if counts[name] > 1 and seen[name] % every == 0:
+            queries.append(row)
+        else:
+            reference.append(row)
+    return reference, queries
+
+
+def synthetic_identities(identities, per_identity=20, modes=3, outlier_rate=0.05, seed=0):
+    """Clustered 128-d encodings: a centre per student, a few pose/lighting modes
+    around it, per-image noise, and some mislabeled images."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(0, 0.05, (identities, 128))
+    offsets = rng.normal(0, 0.02, (identities, modes, 128))
+    ids = np.repeat(np.arange(identities), per_identity)
+    mode = rng.integers(0, modes, len(ids))
+    encodings = centres[ids] + offsets[ids, mode] + rng.normal(0, 0.018, (len(ids), 128))
+    wrong = rng.random(len(ids)) < outlier_rate
+    encodings[wrong] = centres[rng.integers(0, identities, wrong.sum())] + rng.normal(0, 0.018, (wrong.sum(), 128))
+    return encodings.astype(np.float32), [f"id{i}" for i in ids]
+
+
+def evaluate(encodings, names, ks, tolerance=0.6, every=5, faces_per_frame=4, repeat=3):
+    """Hold out every `every`-th image per identity and match them against the full
+    reference gallery and against its k-prototype compressions."""
+    from benchmark import measure
+
+    encodings = np.asarray(encodings, dtype=np.float32)
+    names = np.asarray(names, dtype=object)
+    reference, queries = split_holdout(list(names), every)
+    ref_enc, ref_names = encodings[reference], names[reference]
+    probes = encodings[queries]
+    truth = names[queries]
+    frames = [probes[i:i + faces_per_frame] for i in range(0, len(probes), faces_per_frame)]
+
+    def run(matcher):
+        predicted = np.asarray([m.name for m in matcher.match(probes)], dtype=object)
+        stats = measure(matcher.match, frames, repeat=repeat, items_per_call=faces_per_frame)
+        return predicted, stats
+
+    full = FaceMatcher(ref_enc, list(ref_names), tolerance=tolerance)
+    full_predicted, full_stats = run(full)
+    rows = [("full", len(ref_enc), 0, full_predicted, full_stats)]
+    for k in ks:
+        kept, outliers = compress(ref_enc, list(ref_names), k)
+        matcher = FaceMatcher(ref_enc[kept], list(ref_names[kept]), tolerance=tolerance)
+        predicted, stats = run(matcher)
+        rows.append((f"k={k}", len(kept), len(outliers), predicted, stats))
+
+    identities = len(set(ref_names))
+    print(f"📏 {len(queries)} held-out queries, {identities} identities, {len(ref_enc)} reference encodings")
+    print(f"{'gallery':<8} {'rows':>8} {'rows/id':>8} {'flagged':>8} {'recall':>8} {'agree':>8} "
+          f"{'p50 ms':>8} {'speedup':>8}")
+    results = []
+    for label, size, flagged, predicted, stats in rows:
+        recall = float(np.mean(predicted == truth))
+        agree = float(np.mean(predicted == full_predicted))
+        speedup = full_stats["mean_ms"] / stats["mean_ms"] if stats["mean_ms"] else float("nan")
+        print(f"{label:<8} {size:>8} {size / identities:>8.1f} {flagged:>8} {recall:>8.2%} {agree:>8.2%} "
+              f"{stats['p50_ms']:>8.3f} {speedup:>7.1f}x")
+        results.append({"gallery": label, "rows": size, "flagged": flagged, "recall": round(recall, 4),
+                        "agreement": round(agree, 4), **stats})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prototype compression of the face gallery")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("evaluate", help="recall / latency of k-prototype galleries against the full one")
+    p.add_argument("--k", type=prototype_count, nargs="+", default=[1, 2, 3, 5],
+                   help="prototypes per identity to try")
+    p.add_argument("--model", default="trained_faces.pkl",
+                   help="full (uncompressed) gallery to evaluate, e.g. trained without --prototypes")
+    p.add_argument("--synthetic", type=int, metavar="IDENTITIES", help="use a synthetic gallery instead")
+    p.add_argument("--per-identity", type=int, default=20, help="images per synthetic identity")
+    p.add_argument("--tolerance", type=float, default=0.6)
+    p.add_argument("--holdout-every", type=int, default=5, help="every Nth image of an identity is a query")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        encodings, names = synthetic_identities(args.synthetic, args.per_identity)
+    else:
+        gallery = open_gallery(args.model, mmap=False)
+        encodings = gallery.encodings
+        names = [gallery.identities[label] for label in gallery.labels]
+        per_identity = len(names) / max(1, len(gallery.identities))
+        if per_identity <= max(args.k):
+            print(f"⚠️ {args.model} has {per_identity:.1f} encodings per identity; "
+                  "it may already be compressed, retrain without --prototypes to evaluate")
+    evaluate(encodings, names, args.k, args.tolerance, args.holdout_every)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# recognition.py
+# The detect -> encode -> match path shared by the camera loops, the offline
+# batch mode and the other entry points that need the same results.
+import time
+
+import cv2
+import face_recognition
+
+from ann_index import IVFIndex, index_path_for
+from face_matcher import FaceMatcher
+from frame_scheduler import detect_faces
+from gallery_store import open_gallery
+
+MODEL_PATH = "trained_faces.pkl"
+
+
+def load_matcher(model_path=MODEL_PATH, tolerance=0.6, nprobe=8):
+    """Memory-mapped gallery (a legacy pickle is converted once) plus the ANN index
+    if one was built; without an index the matcher uses exact search."""
+    gallery = open_gallery(model_path)
+    index = IVFIndex.load(index_path_for(model_path))
+    return FaceMatcher.from_gallery(gallery, tolerance=tolerance, index=index, nprobe=nprobe)
+
+
+def encode_frame(frame, scale=1.0, model="hog", metrics=None):
+    """BGR frame -> (boxes, encodings). Detection runs at `scale`, encodings on full resolution.
+    With a metrics.Metrics, the detect and encode stages are timed into it."""
+    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    started = time.perf_counter()
+    boxes = detect_faces(rgb_frame, scale, model=model)
+    if metrics is not None:
+        metrics.observe_stage("detect", time.perf_counter() - started)
+    if not boxes:
+        return [], []
+    started = time.perf_counter()
+    encodings = face_recognition.face_encodings(rgb_frame, boxes)
+    if metrics is not None:
+        metrics.observe_stage("encode", time.perf_counter() - started)
+    return boxes, encodings
+
+
+def encode_job(job):
+    # process-pool entry point: (frame, scale) -> (boxes, encodings)
+    frame, scale = job
+    return encode_frame(frame, scale)
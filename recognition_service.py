@@ -0,0 +1,337 @@
+# recognition_service.py
+# Local HTTP recognition service: one warm process holds the gallery and a
+# pool of encoder processes, thin clients (kiosks, door cameras) just POST.
+#
+#   python recognition_service.py --port 8765 --workers 4
+#
+#   POST /recognize   body: a JPEG (Content-Type: image/jpeg), ?scale=0.5 optional (0 < scale <= 2)
+#                     or JSON {"encodings": [[128 floats], ...]}
+#                  -> {"faces": [{"name", "distance", "margin", "box": [top, right, bottom, left]}, ...]}
+#   POST /enroll   JSON {"label": "142", "encodings": [[...], ...]} -> adds or replaces
+#                  that student in the gallery (see live_gallery.py), no restart
+#   DELETE /enroll?label=142 -> removes them
+#   GET  /health   -> gallery size and queue depths
+#   GET  /metrics  -> Prometheus text (see metrics.py)
+#
+# Concurrent requests are coalesced into micro-batches: a batch is dispatched
+# when --max-batch requests are waiting or the oldest has waited --max-wait-ms.
+# JPEG batches are decoded + detected + encoded in the process pool (one
+# batch per worker at a time, so when all workers are busy the next batch
+# simply grows); encodings from every request in a batch go through a single
+# matcher.match call.
+import argparse
+import asyncio
+import json
+import math
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import cv2
+import numpy as np
+
+from metrics import Metrics
+from live_gallery import LiveMatcher
+from recognition import MODEL_PATH, encode_frame
+
+SERVICE_PORT = 8765
+MAX_BODY = 10 * 1024 * 1024  # bytes; a 1080p JPEG is well below this
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+MAX_SCALE = 2.0  # detection upsampling beyond this costs far more than it finds
+
+
+class BadRequest(Exception):
+    pass
+
+
+def encode_jpegs(jobs):
+    # process-pool entry point: [(jpeg_bytes, scale), ...] -> [(boxes, encodings), None or exception, ...]
+    # one bad image fails only its own request, never the rest of the batch
+    results = []
+    for data, scale in jobs:
+        try:
+            frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            results.append(None if frame is None else encode_frame(frame, scale))
+        except Exception as e:
+            # rebuilt as a plain RuntimeError so it always pickles back to the service
+            results.append(RuntimeError(f"{type(e).__name__}: {e}"))
+    return results
+
+
+class MicroBatcher:
+    """Coalesces concurrent submit() calls into one `process(items) -> results` call.
+
+    A batch is closed when `max_batch` items are waiting or the oldest one has
+    waited `max_wait` seconds, and at most `concurrency` batches run at a time.
+    process may return an Exception in place of a result to fail just that item.
+    """
+
+    def __init__(self, process, max_batch=16, max_wait=0.01, concurrency=1, metrics=None, name="batch"):
+        self.process = process
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.metrics = metrics
+        self.name = name
+        self.queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(concurrency)
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._collect())
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((time.monotonic(), item, future))
+        return await future
+
+    async def _collect(self):
+        while True:
+            # wait for a free slot first: while every slot is busy, requests pile
+            # up in the queue and the next batch picks them all up at once
+            await self._slots.acquire()
+            first = await self.queue.get()
+            batch = [first]
+            deadline = first[0] + self.max_wait
+            while len(batch) < self.max_batch:
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            asyncio.create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch):
+        started = time.monotonic()
+        if self.metrics is not None:
+            self.metrics.observe(f"{self.name}_size", len(batch), BATCH_BUCKETS)
+            for queued_at, _, _ in batch:
+                self.metrics.observe_stage(f"{self.name}_wait", started - queued_at)
+        try:
+            results = await self.process([item for _, item, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        finally:
+            self._slots.release()
+        if self.metrics is not None:
+            self.metrics.observe_stage(self.name, time.monotonic() - started)
+        for (_, _, future), result in zip(batch, results):
+            if future.done():
+                continue  # the client went away
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+class RecognitionService:
+    def __init__(self, matcher, pool, max_batch=16, max_wait=0.01, workers=1, metrics=None):
+        self.matcher = matcher
+        self.pool = pool
+        self.metrics = metrics or Metrics(prefix="recognition_service")
+        self.encoder = MicroBatcher(self._encode_batch, max_batch, max_wait, concurrency=workers,
+                                    metrics=self.metrics, name="encode")
+        self.matching = MicroBatcher(self._match_batch, max_batch * 4, max_wait, concurrency=1,
+                                     metrics=self.metrics, name="match")
+        self.dimension = matcher.encodings.shape[1] if len(matcher) else 128
+
+    async def start(self, host="127.0.0.1", port=SERVICE_PORT):
+        self.encoder.start()
+        self.matching.start()
+        return await asyncio.start_server(self._handle, host, port)
+
+    # ---- batch workers ----
+    async def _encode_batch(self, jobs):
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(self.pool, encode_jpegs, jobs)
+        return [BadRequest("body is not a decodable image") if r is None else r for r in results]
+
+    async def _match_batch(self, requests):
+        # every face of every request in one matcher call, then split back per request
+        flat = [enc for encodings in requests for enc in encodings]
+        matches = await asyncio.get_running_loop().run_in_executor(None, self.matcher.match, flat)
+        results, start = [], 0
+        for encodings in requests:
+            results.append(matches[start:start + len(encodings)])
+            start += len(encodings)
+        return results
+
+    # ---- requests ----
+    async def recognize(self, body, content_type, scale=1.0):
+        if content_type.startswith("application/json"):
+            try:
+                encodings = np.asarray(json.loads(body)["encodings"], dtype=np.float32)
+            except (ValueError, KeyError, TypeError):
+                raise BadRequest('expected {"encodings": [[...], ...]}')
+            if encodings.size and (encodings.ndim != 2 or encodings.shape[1] != self.dimension):
+                raise BadRequest(f"encodings must be lists of {self.dimension} numbers")
+            if not np.isfinite(encodings).all():
+                # NaN/Infinity (or values past float32) would poison every distance in the batch
+                raise BadRequest("encodings must be finite numbers")
+            boxes = [None] * len(encodings)
+        else:
+            if not body:
+                raise BadRequest("empty body")
+            boxes, encodings = await self.encoder.submit((body, scale))
+        matches = await self.matching.submit(list(encodings)) if len(encodings) else []
+        return {"faces": [
+            {"name": m.name, "distance": round(m.distance, 4),
+             "margin": round(m.margin, 4) if math.isfinite(m.margin) else None,
+             "box": None if box is None else [int(v) for v in box]}
+            for box, m in zip(boxes, matches)]}
+
+    async def enroll(self, method, query, body):
+        if not hasattr(self.matcher, "enroll"):
+            raise BadRequest("this gallery is read-only")
+        loop = asyncio.get_running_loop()
+        if method == "DELETE":
+            label = query.get("label", [""])[0]
+            if not label:
+                raise BadRequest("label is required")
+            count = await loop.run_in_executor(None, self.matcher.remove, label)
+            return {"removed": label, "gallery": count}
+        try:
+            request = json.loads(body)
+            label = str(request["label"]).strip()
+            encodings = np.asarray(request["encodings"], dtype=np.float32)
+        except (ValueError, KeyError, TypeError):
+            raise BadRequest('expected {"label": "...", "encodings": [[...], ...]}')
+        if not label or encodings.ndim != 2 or not len(encodings) or encodings.shape[1] != self.dimension:
+            raise BadRequest(f"a label and at least one encoding of {self.dimension} numbers are required")
+        if not np.isfinite(encodings).all():
+            raise BadRequest("encodings must be finite numbers")
+        count = await loop.run_in_executor(None, self.matcher.enroll, label, list(encodings))
+        return {"enrolled": label, "encodings": len(encodings), "gallery": count}
+
+    async def _route(self, method, target, headers, body):
+        url = urlsplit(target)
+        if method == "POST" and url.path == "/recognize":
+            query = parse_qs(url.query)
+            try:
+                scale = float(query.get("scale", ["1.0"])[0])
+            except ValueError:
+                raise BadRequest("scale must be a number")
+            if not 0 < scale <= MAX_SCALE:  # also rejects nan
+                raise BadRequest(f"scale must be greater than 0 and at most {MAX_SCALE:g}")
+            started = time.perf_counter()
+            result = await self.recognize(body, headers.get("content-type", "image/jpeg"), scale)
+            self.metrics.observe_stage("request", time.perf_counter() - started)
+            self.metrics.inc("requests")
+            return 200, "application/json", json.dumps(result)
+        if url.path == "/enroll" and method in ("POST", "DELETE"):
+            return 200, "application/json", json.dumps(await self.enroll(method, parse_qs(url.query), body))
+        if method == "GET" and url.path == "/health":
+            return 200, "application/json", json.dumps({
+                "gallery": len(self.matcher), "identities": len(self.matcher.identities),
+                "encode_queue": self.encoder.queue.qsize(), "match_queue": self.matching.queue.qsize()})
+        if method == "GET" and url.path == "/metrics":
+            return 200, "text/plain; version=0.0.4", self.metrics.render()
+        return 404, "application/json", json.dumps({"error": f"no route for {method} {url.path}"})
+
+    async def _handle(self, reader, writer):
+        # minimal HTTP/1.1 with keep-alive; enough for urllib, requests and curl
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    # the body cannot be framed, so the connection cannot be reused
+                    await self._respond(writer, 400, "application/json", '{"error": "bad Content-Length"}', False)
+                    break
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, "application/json", '{"error": "body too large"}', False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                try:
+                    status, content_type, payload = await self._route(method, target, headers, body)
+                except BadRequest as e:
+                    status, content_type, payload = 400, "application/json", json.dumps({"error": str(e)})
+                except Exception as e:
+                    status, content_type, payload = 500, "application/json", json.dumps({"error": str(e)})
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                await self._respond(writer, status, content_type, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, content_type, payload, keep_alive):
+        data = payload.encode("utf-8")
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+                  500: "Internal Server Error"}[status]
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n"
+                     f"Content-Length: {len(data)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                     .encode("latin-1") + data)
+        await writer.drain()
+
+
+def recognize_remote(data, url=f"http://127.0.0.1:{SERVICE_PORT}/recognize", timeout=10.0):
+    """Client helper: JPEG bytes, or a list of encodings, -> the service's list of faces."""
+    if isinstance(data, (bytes, bytearray)):
+        body, content_type = bytes(data), "image/jpeg"
+    else:
+        body = json.dumps({"encodings": [np.asarray(e).tolist() for e in data]}).encode("utf-8")
+        content_type = "application/json"
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": content_type})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())["faces"]
+
+
+async def serve(args):
+    print("📂 Loading trained model...")
+    matcher = LiveMatcher(args.model, tolerance=args.tolerance).watch()
+    pool = ProcessPoolExecutor(max_workers=args.workers)
+    service = RecognitionService(matcher, pool, args.max_batch, args.max_wait_ms / 1000, args.workers)
+    server = await service.start(args.host, args.port)
+    print(f"🌐 Recognition service on http://{args.host}:{args.port}/recognize "
+          f"({len(matcher)} encodings, {args.workers} encoder processes)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP face recognition service with request micro-batching")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--workers", type=int, default=2, help="encoder processes")
+    parser.add_argument("--max-batch", type=int, default=8, help="images per encoder batch")
+    parser.add_argument("--max-wait-ms", type=float, default=10.0,
+                        help="longest a request waits for others to share its batch")
+    parser.add_argument("--model", default=MODEL_PATH, help="gallery / encodings file")
+    parser.add_argument("--tolerance", type=float, default=0.6)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,32 @@
 import cv2
-import numpy as np
 import face_recognition
-import pickle
-import csv
+import time
 from datetime import datetime
 
+from attendance_store import PresenceCache, names_marked_on
+from face_tracker import FaceTracker
+from frame_scheduler import AdaptiveScheduler, detect_faces
+from metrics import METRICS_PORT, Metrics
+from live_gallery import LiveMatcher
+
 MODEL_PATH = "trained_faces.pkl"
 ATTENDANCE_FILE = "attendance.csv"
+NPROBE = 8  # ANN clusters scanned per face: higher = better recall, slower
+TARGET_MS = 80  # per-frame time budget for detect + encode + match
+REMARK_COOLDOWN = None  # seconds before a name may be marked again; None = once per day
 
-# Load trained model
+# Load trained model (memory-mapped; a legacy trained_faces.pkl is converted once)
 print("📂 Loading trained model...")
-with open(MODEL_PATH, "rb") as f:
-    data = pickle.load(f)
-
-known_encodings = data["encodings"]
-known_names = data["names"]
+# falls back to exact search when no index was built (train_svm.py --ann);
+# students enrolled with live_gallery.py are picked up without a restart
+matcher = LiveMatcher(MODEL_PATH, nprobe=NPROBE).watch()
+tracker = FaceTracker()
+# adjusts detection scale / frame cadence to stay within TARGET_MS per processed frame
+scheduler = AdaptiveScheduler(target_ms=TARGET_MS)
+tracks = []
+# per-stage timings, served as Prometheus text on METRICS_PORT
+metrics = Metrics()
+metrics.serve(METRICS_PORT)
 
 # Initialize webcam
 print("📸 Starting camera...")
@@ -23,40 +35,62 @@ if not cam.isOpened():
     print("❌ Unable to access camera.")
     exit()
 
+# Who is already marked today, read from the CSV once instead of on every face
+presence = PresenceCache(cooldown=REMARK_COOLDOWN)
+presence.seed(names_marked_on(ATTENDANCE_FILE, datetime.now().strftime("%Y-%m-%d")))
+
 # Helper function to mark attendance
 def mark_attendance(name):
+    # Check if already marked today
+    if not presence.should_mark(name):
+        return
+
     now = datetime.now()
     date = now.strftime("%Y-%m-%d")
     time = now.strftime("%H:%M:%S")
-
-    # Check if already marked today
-    with open(ATTENDANCE_FILE, "r+") as f:
-        existing = f.readlines()
-        names_today = [line.split(",")[0] for line in existing if date in line]
-
-        if name not in names_today:
-            f.writelines(f"{name},{date},{time}\n")
-            print(f"✅ Attendance marked for {name} at {time}")
+    with metrics.timed("persist"), open(ATTENDANCE_FILE, "a") as f:
+        f.write(f"{name},{date},{time}\n")
+    presence.mark(name)
+    print(f"✅ Attendance marked for {name} at {time}")
 
 print("➡ Press ESC to quit.")
 while True:
-    ret, frame = cam.read()
+    with metrics.timed("capture"):
+        ret, frame = cam.read()
     if not ret:
         print("⚠️ Unable to read frame.")
         break
-
-    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    face_locations = face_recognition.face_locations(rgb_frame)
-    face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
-
-    for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-        matches = face_recognition.compare_faces(known_encodings, face_encoding)
-        name = "Unknown"
-
-        face_distances = face_recognition.face_distance(known_encodings, face_encoding)
-        best_match_index = np.argmin(face_distances)
-        if matches[best_match_index]:
-            name = known_names[best_match_index]
+    metrics.inc("frames_captured")
+
+    if scheduler.should_process():
+        started = time.perf_counter()
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        # detect on a downscaled copy, boxes come back in full-resolution coordinates
+        with metrics.timed("detect"):
+            face_locations = detect_faces(rgb_frame, scheduler.scale)
+        tracks = tracker.update(face_locations)
+        metrics.observe("faces_per_frame", len(face_locations))
+
+        # only encode faces that are new, unknown, ambiguous or due for a re-check
+        stale = [t for t in tracks if tracker.needs_encoding(t)]
+        if stale:
+            with metrics.timed("encode"):
+                face_encodings = face_recognition.face_encodings(rgb_frame, [t.box for t in stale])
+            with metrics.timed("match"):
+                matches = matcher.match(face_encodings)
+            for track, match in zip(stale, matches):
+                tracker.assign(track, match)
+        metrics.observe("faces_encoded_per_frame", len(stale))
+
+        if scheduler.record((time.perf_counter() - started) * 1000):
+            print(f"⚙️ Scheduler: {scheduler.settings}")
+    else:
+        metrics.inc("frames_skipped")
+
+    render_started = time.perf_counter()
+
+    for track in tracks:
+        (top, right, bottom, left), name = track.box, track.name
 
         # Draw box and label
         cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
@@ -66,9 +100,14 @@ while True:
         if name != "Unknown":
             mark_attendance(name)
 
+    settings = scheduler.settings
+    cv2.putText(frame, f"scale {settings['scale']}  every {settings['interval']}  {settings['avg_ms']} ms",
+                (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
     cv2.imshow("Face Recognition Attendance", frame)
+    key = cv2.waitKey(1) & 0xFF
+    metrics.observe_stage("render", time.perf_counter() - render_started)
 
-    if cv2.waitKey(1) & 0xFF == 27:  # ESC key
+    if key == 27:  # ESC key
         break
 
 cam.release()
@@ -0,0 +1,122 @@
+# roster.py
+# Roster and absentee queries against the `students` table.
+#
+# A student counts as present on a day when there is a 'Present' mark for their
+# students.id (Streamlit apps) or, for the camera loops that only know a name,
+# for their name if no other student has it. Absentees are the roster minus those, as a NOT EXISTS
+# anti-join that walks the (student_id, date) and (name, date) indexes instead
+# of loading attendance into pandas.
+#
+#   python roster.py absentees 2025-11-04 [--subject DBMS] [--class "bsc ds"]
+#   python roster.py streaks 2025-10-01 2025-11-04 [--min-days 3]
+import argparse
+
+from attendance_store import DB_PATH, connect
+
+# correlated on the roster row `s`; ?1 = subject (NULL for any subject)
+_PRESENT = """
+    EXISTS (SELECT 1 FROM attendance a
+            WHERE a.student_id = s.id AND a.date = {date}
+              AND a.status = 'Present' AND (?1 IS NULL OR a.subject = ?1))
+    OR EXISTS (SELECT 1 FROM attendance a
+               WHERE a.student_id IS NULL AND a.name = TRIM(s.name) AND a.date = {date}
+                 AND a.status = 'Present' AND (?1 IS NULL OR a.subject = ?1))
+       -- a name-only mark cannot tell two students with the same name apart
+       AND NOT EXISTS (SELECT 1 FROM students o WHERE o.id != s.id AND TRIM(o.name) = TRIM(s.name))
+"""
+
+
+def _roster_filter(student_class):
+    # class names were typed by hand, stray spaces included
+    return "TRIM(s.class) = TRIM(?2)" if student_class else "?2 IS NULL"
+
+
+def has_roster(conn):
+    # the camera loops' databases have no students table
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'students'").fetchone() is not None
+
+
+def roster(conn, student_class=None):
+    """[(id, name, roll_no, class), ...] ordered by class then roll number."""
+    return conn.execute(f"""
+        SELECT s.id, TRIM(s.name), TRIM(s.roll_no), TRIM(s.class) FROM students s
+        WHERE {_roster_filter(student_class)}
+        ORDER BY TRIM(s.class), TRIM(s.roll_no)
+    """, (None, student_class or None)).fetchall()
+
+
+def classes(conn):
+    return [row[0] for row in conn.execute(
+        "SELECT DISTINCT TRIM(class) FROM students WHERE class IS NOT NULL ORDER BY 1")]
+
+
+def absentees(conn, date, subject=None, student_class=None):
+    """Students on the roster with no 'Present' mark on `date` ('YYYY-MM-DD'),
+    optionally for one subject and one class. [(id, name, roll_no, class), ...]"""
+    return conn.execute(f"""
+        SELECT s.id, TRIM(s.name), TRIM(s.roll_no), TRIM(s.class) FROM students s
+        WHERE {_roster_filter(student_class)}
+          AND NOT ({_PRESENT.format(date="?3")})
+        ORDER BY TRIM(s.class), TRIM(s.roll_no)
+    """, (subject or None, student_class or None, date)).fetchall()
+
+
+def absentee_streaks(conn, date_from, date_to, subject=None, student_class=None, min_days=2):
+    """Runs of consecutive class days a student was absent, in one query.
+
+    Class days are the dates inside [date_from, date_to] on which anybody was
+    marked (for `subject` if given), so weekends and holidays do not break a run.
+    Returns [(id, name, roll_no, class, first_day, last_day, days), ...], longest first.
+    """
+    return conn.execute(f"""
+        WITH days AS (
+            SELECT DISTINCT date FROM attendance
+            WHERE date BETWEEN ?3 AND ?4 AND (?1 IS NULL OR subject = ?1)
+        ),
+        grid AS (
+            SELECT s.id, s.name, s.roll_no, s.class, d.date,
+                   ROW_NUMBER() OVER (PARTITION BY s.id ORDER BY d.date) AS day_no,
+                   {_PRESENT.format(date="d.date")} AS present
+            FROM students s CROSS JOIN days d
+            WHERE {_roster_filter(student_class)}
+        ),
+        absent AS (
+            -- gaps and islands: consecutive absent days share day_no - absent_no
+            SELECT *, day_no - ROW_NUMBER() OVER (PARTITION BY id ORDER BY date) AS run
+            FROM grid WHERE NOT present
+        )
+        SELECT id, TRIM(name), TRIM(roll_no), TRIM(class), MIN(date), MAX(date), COUNT(*) AS days
+        FROM absent
+        GROUP BY id, run
+        HAVING COUNT(*) >= ?5
+        ORDER BY days DESC, MIN(date), TRIM(roll_no)
+    """, (subject or None, student_class or None, date_from, date_to, min_days)).fetchall()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Roster and absentee reports")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("absentees")
+    p.add_argument("date")
+    p = sub.add_parser("streaks")
+    p.add_argument("date_from")
+    p.add_argument("date_to")
+    p.add_argument("--min-days", type=int, default=2)
+    for p in sub.choices.values():
+        p.add_argument("--subject")
+        p.add_argument("--class", dest="student_class")
+        p.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    if args.command == "absentees":
+        rows = absentees(conn, args.date, args.subject, args.student_class)
+        print(f"📋 {len(rows)} absent on {args.date}")
+        for _, name, roll_no, student_class in rows:
+            print(f"  {roll_no:<10} {name:<30} {student_class}")
+    else:
+        rows = absentee_streaks(conn, args.date_from, args.date_to, args.subject, args.student_class, args.min_days)
+        for _, name, roll_no, student_class, first, last, days in rows:
+            print(f"  {roll_no:<10} {name:<30} {days} days ({first} → {last})")
+    conn.close()
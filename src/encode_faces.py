@@ -1,43 +1,91 @@
 # src/encode_faces.py
 import os
-import face_recognition
-import pickle
+import sys
+import argparse
 from pathlib import Path
-import numpy as np
 
-DATASET_DIR = Path(__file__).resolve().parents[1] / "dataset"
-ENCODINGS_FILE = Path(__file__).resolve().parents[1] / "encodings" / "encodings.pickle"
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from ann_index import IVFIndex, index_path_for
+from dataset_encoder import EncodingCache, encode_files
+from dataset_manifest import open_manifest, person_images, refresh
+from gallery_store import build_gallery, gallery_lock, gallery_path_for, save_gallery
+from prototypes import compress, prototype_count
+
+ROOT = Path(__file__).resolve().parents[1]
+DB_FILE = ROOT / "attendance.sqlite3"
+ENCODINGS_FILE = ROOT / "encodings" / "encodings.pickle"
+GALLERY_DIR = gallery_path_for(ENCODINGS_FILE)
+CACHE_FILE = ENCODINGS_FILE.parent / "encode_cache.pickle"
 ENCODINGS_FILE.parent.mkdir(parents=True, exist_ok=True)
 
 known_encodings = []
 known_names = []
 
-def encode_dataset():
-    for person_dir in DATASET_DIR.iterdir():
-        if not person_dir.is_dir():
-            continue
-        name = person_dir.name
-        print(f"Processing {name}")
-        for img_path in person_dir.glob("*"):
-            try:
-                image = face_recognition.load_image_file(str(img_path))
-                # Convert to face_locations and encodings
-                boxes = face_recognition.face_locations(image, model="hog")
-                encs = face_recognition.face_encodings(image, boxes)
-                if len(encs) == 0:
-                    print(f"  no faces found in {img_path.name}")
-                    continue
-                # store first face encoding found in file
-                known_encodings.append(encs[0])
-                known_names.append(name)
-            except Exception as e:
-                print(f"  error processing {img_path}: {e}")
-
-    # Save
-    data = {"encodings": known_encodings, "names": known_names}
-    with open(ENCODINGS_FILE, "wb") as f:
-        pickle.dump(data, f)
-    print(f"Saved encodings to {ENCODINGS_FILE}")
+def encode_dataset(build_index=False, nlist=None, use_cache=True, workers=1, chunksize=8, prototypes=None):
+    cache = EncodingCache(CACHE_FILE)
+    if not use_cache:
+        cache.entries.clear()
+    # image list comes from the dataset manifest (see dataset_manifest.py), not a directory walk
+    conn = open_manifest(DB_FILE, root=ROOT)
+    for rel_path, reason in refresh(conn, root=ROOT):
+        print(f"  {reason} since last run: {rel_path}")
+    img_paths = []
+    img_names = []
+    # one folder per person; the flat dataset/<roll_no>_<n>.jpg files are LBPH crops
+    for rel_path, name in person_images(conn):
+        if not img_names or img_names[-1] != name:
+            print(f"Processing {name}")
+        img_paths.append(ROOT / rel_path)
+        img_names.append(name)
+    conn.close()
+
+    # boxes + first face encoding, reused from the cache when the file is unchanged
+    results, _ = encode_files(img_paths, cache, workers=workers, chunksize=chunksize)
+    known_paths = []
+    for img_path, name, (_, encoding, error) in zip(img_paths, img_names, results):
+        if error is not None:
+            print(f"  error processing {img_path}: {error}")
+        elif encoding is None:
+            print(f"  no faces found in {img_path.name}")
+        else:
+            known_encodings.append(encoding)
+            known_names.append(name)
+            known_paths.append(img_path)
+
+    print(f"Dropped {cache.prune()} stale cache entries")
+    cache.save()
+
+    # at most `prototypes` representative encodings per person, outliers left out (see prototypes.py)
+    if prototypes and known_encodings:
+        kept, outliers = compress(known_encodings, known_names, prototypes)
+        for row, name, distance in outliers:
+            print(f"  outlier for {name}, not stored: {known_paths[row]} (distance {distance:.2f})")
+        print(f"Kept {len(kept)} of {len(known_encodings)} encodings")
+        known_encodings[:] = [known_encodings[i] for i in kept]
+        known_names[:] = [known_names[i] for i in kept]
+
+    # Save (gallery and index together; live_gallery.py enroll waits meanwhile)
+    with gallery_lock(GALLERY_DIR):
+        meta = save_gallery(GALLERY_DIR, build_gallery(known_encodings, known_names), prototypes)
+        print(f"Saved encodings to {GALLERY_DIR}")
+
+        if build_index and known_encodings:
+            index = IVFIndex.build(known_encodings, nlist=nlist, gallery=meta["generation"])
+            index.save(index_path_for(ENCODINGS_FILE))
+            print(f"Saved ANN index ({index.nlist} lists) to {index_path_for(ENCODINGS_FILE)}")
+        elif index_path_for(ENCODINGS_FILE).exists():
+            # an index from a previous run no longer describes this gallery
+            index_path_for(ENCODINGS_FILE).unlink()
 
 if __name__ == "__main__":
-    encode_dataset()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ann", action="store_true", help="also build an approximate nearest-neighbour index")
+    parser.add_argument("--nlist", type=int, default=None, help="number of ANN clusters (default: sqrt of gallery size)")
+    parser.add_argument("--workers", type=int, default=1, help="encoding processes (0 = one per CPU core)")
+    parser.add_argument("--chunksize", type=int, default=8, help="images handed to a worker at a time")
+    parser.add_argument("--no-cache", action="store_true", help="re-encode every image instead of reusing cached encodings")
+    parser.add_argument("--prototypes", type=prototype_count, default=None, metavar="K",
+                        help="keep at most K representative encodings per person and drop outliers")
+    args = parser.parse_args()
+    encode_dataset(build_index=args.ann, nlist=args.nlist, use_cache=not args.no_cache,
+                   workers=args.workers or os.cpu_count(), chunksize=args.chunksize, prototypes=args.prototypes)
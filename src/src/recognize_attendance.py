@@ -1,26 +1,43 @@
 # src/recognize_attendance.py
 import cv2
-import face_recognition
-import pickle
-import os
+import sys
+import time
 from datetime import datetime
 import pandas as pd
 from pathlib import Path
-import sqlite3
 
 BASE = Path(__file__).resolve().parents[1]
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from attendance_store import PresenceCache, connect, mark_present
+from frame_scheduler import AdaptiveScheduler
+from init_db import migrate
+from metrics import METRICS_PORT, Metrics
+from pipeline import AttendanceWriter, FrameGrabber, RecognitionWorker
+from live_gallery import LiveMatcher
+from recognition import encode_frame
+
 ENCODINGS_FILE = BASE / "encodings" / "encodings.pickle"
 CSV_FILE = BASE / "attendance.csv"
 DB_FILE = BASE / "attendance.sqlite3"
+NPROBE = 8  # ANN clusters scanned per face: higher = better recall, slower
+TARGET_MS = 80  # per-frame time budget for detect + encode + match
+REMARK_COOLDOWN = None  # seconds before a name may be marked again; None = once per day
 
-# load encodings
-with open(ENCODINGS_FILE, "rb") as f:
-    data = pickle.load(f)
-known_encodings = data["encodings"]
-known_names = data["names"]
+# load encodings (memory-mapped; a legacy encodings.pickle is converted once)
+# falls back to exact search when no index was built (encode_faces.py --ann);
+# `python live_gallery.py enroll <label> --model src/encodings/encodings.pickle`
+# adds a student while this keeps running
+matcher = LiveMatcher(ENCODINGS_FILE, tolerance=0.45, nprobe=NPROBE).watch()
+# per-stage timings, queue depths and dropped frames, served as Prometheus text on METRICS_PORT
+metrics = Metrics()
+metrics.serve(METRICS_PORT)
+# adjusts detection scale / frame cadence to stay within TARGET_MS per processed frame
+scheduler = AdaptiveScheduler(target_ms=TARGET_MS, start_scale=0.25)
 
 # initialize DB if not exists
-conn = sqlite3.connect(DB_FILE)
+conn = connect(DB_FILE)
 cur = conn.cursor()
 cur.execute("""
 CREATE TABLE IF NOT EXISTS attendance (
@@ -32,20 +49,27 @@ CREATE TABLE IF NOT EXISTS attendance (
 )
 """)
 conn.commit()
+# unique/secondary indexes, WAL (see init_db.py)
+migrate(conn)
+
+# who is already present today, loaded once; the recognizer consults this
+# instead of querying the DB for every recognized face
+presence = PresenceCache(cooldown=REMARK_COOLDOWN)
+# (this loop marks without a subject; multi_stream.py marks per subject)
+cur.execute("SELECT name FROM attendance WHERE date=? AND student_id IS NULL AND subject IS NULL",
+            (datetime.now().strftime("%Y-%m-%d"),))
+presence.seed(row[0] for row in cur.fetchall())
+conn.close()
 
 # helper: mark attendance (only once per person per day)
-def mark_attendance(name, status="Present"):
+# runs on the AttendanceWriter thread, which owns `conn`
+def mark_attendance(conn, name, status="Present"):
     now = datetime.now()
     date_str = now.strftime("%Y-%m-%d")
     time_str = now.strftime("%H:%M:%S")
-    # check DB if already present today
-    cur.execute("SELECT * FROM attendance WHERE name=? AND date=?", (name, date_str))
-    if cur.fetchone():
-        # already present today
+    # atomic insert-if-absent; False means already present today
+    if not mark_present(conn, date_str, time_str, name=name, status=status):
         return
-    cur.execute("INSERT INTO attendance (name,date,time,status) VALUES (?,?,?,?)",
-                (name, date_str, time_str, status))
-    conn.commit()
     # also add to CSV
     df = pd.DataFrame([[name, date_str, time_str, status]], columns=["name","date","time","status"])
     if CSV_FILE.exists():
@@ -53,53 +77,69 @@ def mark_attendance(name, status="Present"):
     else:
         df.to_csv(CSV_FILE, index=False)
 
-# start webcam
-video_capture = cv2.VideoCapture(0)  # change index if multiple cams
+# helper: detect + encode + match one frame, runs on the RecognitionWorker thread
+# returns None for frames the scheduler decided to skip
+def recognize(frame):
+    if not scheduler.should_process():
+        return None
+    started = time.perf_counter()
+    # detect on a downscaled copy, encode from the full-resolution frame
+    face_locations, face_encodings = encode_frame(frame, scheduler.scale, metrics=metrics)  # model="cnn" for accuracy (slower)
+    with metrics.timed("match"):
+        matches = matcher.match(face_encodings)
+    results = [(box, match.name) for box, match in zip(face_locations, matches)]
 
-process_frame = True
-while True:
-    ret, frame = video_capture.read()
-    if not ret:
-        break
+    if scheduler.record((time.perf_counter() - started) * 1000):
+        print(f"scheduler: {scheduler.settings}")
+    return results
 
-    # downscale for speed
-    small_frame = cv2.resize(frame, (0,0), fx=0.25, fy=0.25)
-    rgb_small_frame = small_frame[:, :, ::-1]
+# start webcam
+video_capture = cv2.VideoCapture(0)  # change index if multiple cams
 
-    if process_frame:
-        face_locations = face_recognition.face_locations(rgb_small_frame, model="hog")  # or 'cnn' for accuracy (slower)
-        face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
+# capture, recognition and DB writes each run on their own thread;
+# this loop only draws the newest frame with the newest results
+grabber = FrameGrabber(video_capture, metrics=metrics)
+writer = AttendanceWriter(DB_FILE, mark_attendance, metrics=metrics)
 
-        face_names = []
-        for face_encoding in face_encodings:
-            matches = face_recognition.compare_faces(known_encodings, face_encoding, tolerance=0.45)
-            name = "Unknown"
-            # use the shortest distance
-            face_distances = face_recognition.face_distance(known_encodings, face_encoding)
-            if len(face_distances) > 0:
-                best_idx = face_distances.argmin()
-                if matches[best_idx]:
-                    name = known_names[best_idx]
-            face_names.append(name)
+# helper: only hand names to the writer that are not already present
+def on_name(name):
+    if presence.should_mark(name):
+        presence.mark(name)
+        writer.submit(name)
 
-            if name != "Unknown":
-                mark_attendance(name)
+recognizer = RecognitionWorker(grabber.subscribe(), recognize, on_name=on_name, metrics=metrics)
+for stage in (writer, recognizer, grabber):
+    stage.start()
 
-    process_frame = not process_frame
+seq = 0
+while not grabber.stop_event.is_set():
+    seq, frame = grabber.wait_frame(seq)
+    if frame is None:
+        continue
+    render_started = time.perf_counter()
+    frame = frame.copy()
 
     # display
-    for (top, right, bottom, left), name in zip(face_locations, face_names):
-        # scale back up since we used 1/4 size
-        top *= 4; right *= 4; bottom *= 4; left *= 4
+    for (top, right, bottom, left), name in recognizer.results:
         cv2.rectangle(frame, (left, top), (right, bottom), (0,255,0), 2)
         cv2.rectangle(frame, (left, bottom-35), (right, bottom), (0,255,0), cv2.FILLED)
         cv2.putText(frame, name, (left+6, bottom-6), cv2.FONT_HERSHEY_DUPLEX, 1.0, (255,255,255), 1)
 
+    settings = scheduler.settings
+    cv2.putText(frame, f"scale {settings['scale']}  every {settings['interval']}  {settings['avg_ms']} ms",
+                (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,255,255), 1)
     cv2.imshow('Attendance (q to quit)', frame)
-    if cv2.waitKey(1) & 0xFF == ord('q'):
+    key = cv2.waitKey(1) & 0xFF
+    metrics.observe_stage("render", time.perf_counter() - render_started)
+    if key == ord('q'):
         break
 
 # cleanup
+grabber.stop()
+recognizer.stop()
+grabber.join()
+recognizer.join()
+writer.stop()
+writer.join()
 video_capture.release()
 cv2.destroyAllWindows()
-conn.close()
@@ -1,20 +1,21 @@
 import cv2
-import numpy as np
+import sys
 import face_recognition
-import pickle
-import csv
 from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+
+from recognition import load_matcher
 
 MODEL_PATH = "trained_faces.pkl"
 ATTENDANCE_FILE = "attendance.csv"
 
-# Load trained model
+# Load trained model: the gallery the trainers write (trained_faces.gallery/);
+# a legacy trained_faces.pkl is converted once
 print("📂 Loading trained model...")
-with open(MODEL_PATH, "rb") as f:
-    data = pickle.load(f)
-
-known_encodings = data["encodings"]
-known_names = data["names"]
+matcher = load_matcher(MODEL_PATH)
 
 # Initialize webcam
 print("📸 Starting camera...")
@@ -49,14 +50,8 @@ while True:
     face_locations = face_recognition.face_locations(rgb_frame)
     face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
 
-    for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-        matches = face_recognition.compare_faces(known_encodings, face_encoding)
-        name = "Unknown"
-
-        face_distances = face_recognition.face_distance(known_encodings, face_encoding)
-        best_match_index = np.argmin(face_distances)
-        if matches[best_match_index]:
-            name = known_names[best_match_index]
+    for (top, right, bottom, left), match in zip(face_locations, matcher.match(face_encodings)):
+        name = match.name
 
         # Draw box and label
         cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
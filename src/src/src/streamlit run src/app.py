@@ -2,9 +2,13 @@ import streamlit as st
 import sqlite3
 import cv2
 import os
-import numpy as np
-import pandas as pd
-from datetime import datetime
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[4]))
+from dataset_manifest import fill_manifest, record_image, register_student, student_samples
+from enrollment_gate import MAX_CAPTURE_FRAMES, EnrollmentGate, largest_face
+from lbph_model import describe_samples, fingerprint as dataset_fingerprint, load_or_train, normalize_face
 
 # ============ DATABASE SETUP ============
 DB_PATH = "attendance.sqlite3"
@@ -29,6 +33,17 @@ c.execute('''CREATE TABLE IF NOT EXISTS attendance (
                 FOREIGN KEY(student_id) REFERENCES students(id)
             )''')
 conn.commit()
+# a database from before the manifest gets its dataset/ images indexed once
+fill_manifest(conn)
+
+# LBPH model kept in memory across reruns; load_or_train persists it to LBPH_MODEL.
+# Its own file: the other Streamlit app (streamlit_app.py) trains on a different sample set and would
+# otherwise retrain over this one on every switch
+LBPH_MODEL = "lbph_model_app.yml"
+
+@st.cache_resource(max_entries=2)
+def get_recognizer(fingerprint, _samples):
+    return load_or_train(_samples, LBPH_MODEL)
 
 # ============ STREAMLIT APP ============
 st.set_page_config(page_title="Smart Face Attendance", layout="centered")
@@ -64,34 +79,50 @@ elif choice == "🧑‍💼 Register Student":
             cap = cv2.VideoCapture(0)
             face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
 
-            count = 0
-            st.info("Capturing face images... Press 'Enter' in window to stop early.")
-            while True:
+            # keeps only sharp, frontal, mutually different crops (see enrollment_gate.py)
+            gate = EnrollmentGate()
+            frames = 0
+            st.info("Capturing face images... Turn your head slightly between shots. "
+                    "Press 'Enter' in window to stop early.")
+            while not gate.done and frames < MAX_CAPTURE_FRAMES:
                 ret, frame = cap.read()
                 if not ret:
                     break
+                frames += 1
                 gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                faces = face_cascade.detectMultiScale(gray, 1.3, 5)
-                for (x, y, w, h) in faces:
-                    count += 1
-                    face = gray[y:y + h, x:x + w]
-                    file_path = f"{dataset_dir}/{roll_no}_{count}.jpg"
-                    cv2.imwrite(file_path, face)
-                    cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+                face_box = largest_face(face_cascade.detectMultiScale(gray, 1.3, 5))
+                if face_box is not None:
+                    x, y, w, h = face_box
+                    decision = gate.consider(gray[y:y + h, x:x + w])
+                    if decision.accepted:
+                        # stored normalized (gray, FACE_SIZE) so training never has to resize
+                        face = normalize_face(gray[y:y + h, x:x + w])
+                        file_path = f"{dataset_dir}/{roll_no}_{decision.slot + 1}.jpg"
+                        cv2.imwrite(file_path, face)
+                        record_image(conn, file_path, label=roll_no)
+                    color = (0, 255, 0) if decision.accepted else (0, 0, 255)
+                    cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
+                    cv2.putText(frame, f"{decision.reason} {len(gate.hashes)}/{gate.target}", (x, y - 10),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
 
                 cv2.imshow("Capturing Faces", frame)
-                if cv2.waitKey(1) == 13 or count >= 20:  # Enter key or 20 faces
+                if cv2.waitKey(1) == 13:  # Enter key
                     break
 
             cap.release()
             cv2.destroyAllWindows()
+            st.write(f"📸 {gate.summary()}")
 
-            first_image = f"{dataset_dir}/{roll_no}_1.jpg"
-            c.execute("INSERT INTO students (name, roll_no, class, image_path) VALUES (?, ?, ?, ?)",
-                      (name, roll_no, student_class, first_image))
-            conn.commit()
+            if not gate.hashes:
+                st.error("No usable face image was captured. Improve the lighting and try again.")
+            else:
+                # a re-enrollment overwrote slots 1..N and updates the existing student;
+                # older captures past N are dropped once the student row is saved
+                first_image = f"{dataset_dir}/{roll_no}_1.jpg"
+                _, created = register_student(conn, name, roll_no, student_class, first_image,
+                                              len(gate.hashes), dataset_dir)
 
-            st.success(f"✅ Student {name} registered successfully!")
+                st.success(f"✅ Student {name} {'registered' if created else 're-enrolled'} successfully!")
 
 # ============ MARK ATTENDANCE ============
 elif choice == "📷 Mark Attendance":
@@ -103,24 +134,15 @@ elif choice == "📷 Mark Attendance":
     if not students:
         st.warning("⚠️ No students found. Please register students first.")
     else:
-        recognizer = cv2.face.LBPHFaceRecognizer_create()
-        faces, labels = [], []
-
-        for s in students:
-            student_id, name, roll_no, cls, img_path = s
-            for file in os.listdir("dataset"):
-                if file.startswith(roll_no):
-                    path = os.path.join("dataset", file)
-                    img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
-                    if img is not None:
-                        faces.append(img)
-                        labels.append(student_id)
-
-        if len(faces) == 0:
+        # training images per student come from the dataset manifest, no directory scan
+        samples = student_samples(conn)
+
+        # trained once per dataset/students fingerprint, not on every rerun
+        recognizer = get_recognizer(dataset_fingerprint(describe_samples(samples)), samples)
+
+        if recognizer is None:
             st.error("No face data found to train recognizer!")
         else:
-            recognizer.train(faces, np.array(labels))
-
             cap = cv2.VideoCapture(0)
             face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
 
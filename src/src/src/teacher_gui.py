@@ -1,20 +1,73 @@
 # src/teacher_gui.py
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import pandas as pd
 from pathlib import Path
+import csv
+from datetime import date
+import queue
 import sqlite3
+import sys
+import threading
 
 BASE = Path(__file__).resolve().parents[1]
 CSV_FILE = BASE / "attendance.csv"
 DB_FILE = BASE / "attendance.sqlite3"
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from attendance_query import COLUMNS, PAGE_SIZE, build_filters, count_rows, fetch_page, iter_rows, load_csv
+from attendance_store import connect
+from summary import daily_counts, ensure_summary, student_percentages
+
+POLL_MS = 50  # how often the Tk thread picks up finished queries
+
+
+class PageLoader(threading.Thread):
+    """Runs every query on one background thread that owns the connection,
+    so the window never waits on SQLite or on reading the CSV."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.conn = None
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+
+    def submit(self, kind, generation, fn):
+        # fn(loader) runs on this thread; its result (or exception) comes back on self.results
+        self.requests.put((kind, generation, fn))
+
+    def run(self):
+        while True:
+            kind, generation, fn = self.requests.get()
+            try:
+                result = fn(self)
+            except Exception as e:
+                result = e
+            self.results.put((kind, generation, result))
+
+    def open(self, conn):
+        if self.conn is not None:
+            self.conn.close()
+        self.conn = conn
+
+
 class TeacherApp(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("Attendance Reports")
         self.geometry("800x500")
+        self.loader = PageLoader()
+        self.loader.start()
+        self.source = None
+        self.generation = 0   # bumped on every reload, so late pages of an old view are dropped
+        self.next_key = None
+        self.loading = False
+        self.exhausted = True
+        self.shown = 0
+        self.total = None
+        self.sort = "date"
+        self.descending = True
         self.create_widgets()
+        self.after(POLL_MS, self._poll)
 
     def create_widgets(self):
         toolbar = tk.Frame(self)
@@ -22,47 +75,222 @@ class TeacherApp(tk.Tk):
         tk.Button(toolbar, text="Load CSV", command=self.load_csv).pack(side=tk.LEFT, padx=4, pady=4)
         tk.Button(toolbar, text="Load DB", command=self.load_db).pack(side=tk.LEFT, padx=4, pady=4)
         tk.Button(toolbar, text="Export CSV", command=self.export_csv).pack(side=tk.LEFT, padx=4, pady=4)
+        tk.Button(toolbar, text="Summary", command=self.show_summary).pack(side=tk.LEFT, padx=4, pady=4)
 
-        cols = ("name","date","time","status")
-        self.tree = ttk.Treeview(self, columns=cols, show="headings")
-        for c in cols:
-            self.tree.heading(c, text=c.title())
+        filters = tk.Frame(self)
+        filters.pack(side=tk.TOP, fill=tk.X)
+        self.name_var = tk.StringVar()
+        self.from_var = tk.StringVar()
+        self.to_var = tk.StringVar()
+        self.status_var = tk.StringVar()
+        for label, var, width in (("Name", self.name_var, 16), ("From (YYYY-MM-DD)", self.from_var, 11),
+                                  ("To", self.to_var, 11)):
+            tk.Label(filters, text=label).pack(side=tk.LEFT, padx=(4, 0))
+            entry = tk.Entry(filters, textvariable=var, width=width)
+            entry.pack(side=tk.LEFT, padx=4, pady=4)
+            entry.bind("<Return>", lambda e: self.reload())
+        tk.Label(filters, text="Status").pack(side=tk.LEFT, padx=(4, 0))
+        ttk.Combobox(filters, textvariable=self.status_var, values=("", "Present", "Absent"),
+                     width=9, state="readonly").pack(side=tk.LEFT, padx=4)
+        tk.Button(filters, text="Apply", command=self.reload).pack(side=tk.LEFT, padx=4)
+
+        self.status_label = tk.Label(self, anchor="w")
+        self.status_label.pack(side=tk.BOTTOM, fill=tk.X)
+
+        body = tk.Frame(self)
+        body.pack(expand=True, fill=tk.BOTH)
+        self.tree = ttk.Treeview(body, columns=COLUMNS, show="headings")
+        self.scrollbar = ttk.Scrollbar(body, orient=tk.VERTICAL, command=self.tree.yview)
+        # fetch the next page when the user scrolls near the end of what is loaded
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        for c in COLUMNS:
+            self.tree.heading(c, text=c.title(), command=lambda c=c: self.sort_by(c))
             self.tree.column(c, width=180)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.tree.pack(expand=True, fill=tk.BOTH)
 
     def load_csv(self):
         if not CSV_FILE.exists():
             messagebox.showinfo("Info", f"{CSV_FILE} not found")
             return
-        df = pd.read_csv(CSV_FILE)
-        self._show_df(df)
+
+        def open_csv(loader):
+            # the CSV is streamed into an in-memory table so it pages and filters like the DB
+            conn = sqlite3.connect(":memory:")
+            load_csv(conn, CSV_FILE)
+            loader.open(conn)
+        self._open_source("CSV", open_csv)
 
     def load_db(self):
-        conn = sqlite3.connect(DB_FILE)
-        df = pd.read_sql_query("SELECT name,date,time,status FROM attendance ORDER BY date DESC, time DESC", conn)
-        conn.close()
-        self._show_df(df)
-
-    def _show_df(self, df):
-        # clear
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        for _, row in df.iterrows():
-            self.tree.insert("", "end", values=(row["name"], row["date"], row["time"], row["status"]))
+        if not DB_FILE.exists():
+            messagebox.showinfo("Info", f"{DB_FILE} not found")
+            return
+        self._open_source("DB", lambda loader: loader.open(connect(DB_FILE)))
+
+    def _open_source(self, source, opener):
+        self.source = source
+        self.generation += 1
+        self._clear()
+        self.status_label.config(text=f"Opening {source}...")
+        self.loader.submit("opened", self.generation, opener)
+
+    def sort_by(self, column):
+        if self.sort == column:
+            self.descending = not self.descending
+        else:
+            self.sort, self.descending = column, column in ("date", "time")
+        for c in COLUMNS:
+            arrow = (" ▼" if self.descending else " ▲") if c == self.sort else ""
+            self.tree.heading(c, text=c.title() + arrow)
+        self.reload()
+
+    def _filters(self):
+        return build_filters(self.name_var.get().strip(), self.from_var.get().strip(),
+                             self.to_var.get().strip(), self.status_var.get())
+
+    def reload(self):
+        if self.source is None:
+            return
+        self.generation += 1
+        self._clear()
+        self.exhausted = False
+        filters = self._filters()
+        self.loader.submit("count", self.generation, lambda loader: count_rows(loader.conn, filters))
+        self._request_page()
+
+    def _clear(self):
+        self.tree.delete(*self.tree.get_children())
+        self.next_key = None
+        self.loading = False
+        self.exhausted = True
+        self.shown = 0
+        self.total = None
+
+    def _request_page(self):
+        if self.loading or self.exhausted:
+            return
+        self.loading = True
+        filters, sort, descending, after = self._filters(), self.sort, self.descending, self.next_key
+        self.loader.submit("page", self.generation,
+                           lambda loader: fetch_page(loader.conn, filters, sort, descending, after, PAGE_SIZE))
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if float(last) > 0.9:
+            self._request_page()
+
+    def _poll(self):
+        # Tk is not thread-safe: results are handed over through a queue and applied here
+        try:
+            while True:
+                kind, generation, result = self.loader.results.get_nowait()
+                if kind == "export":
+                    self._export_done(result)
+                elif kind == "summary":
+                    self._show_summary(result)
+                elif generation != self.generation:
+                    continue
+                elif isinstance(result, Exception):
+                    self.loading = False
+                    messagebox.showerror("Error", str(result))
+                elif kind == "opened":
+                    self.reload()
+                elif kind == "count":
+                    self.total = result
+                    self._update_status()
+                elif kind == "page":
+                    self._show_page(*result)
+        except queue.Empty:
+            pass
+        self.after(POLL_MS, self._poll)
+
+    def _show_page(self, rows, next_key):
+        for row in rows:
+            self.tree.insert("", "end", values=tuple("" if v is None else v for v in row))
+        self.shown += len(rows)
+        self.next_key = next_key
+        self.exhausted = next_key is None
+        self.loading = False
+        self._update_status()
+        # keep going until the view is filled and can scroll
+        if not self.exhausted and float(self.tree.yview()[1]) > 0.9:
+            self._request_page()
+
+    def _update_status(self):
+        total = "…" if self.total is None else self.total
+        self.status_label.config(text=f"{self.source}: showing {self.shown} of {total} records")
 
     def export_csv(self):
         path = filedialog.asksaveasfilename(defaultextension=".csv")
         if not path:
             return
-        # try DB first
-        try:
-            conn = sqlite3.connect(DB_FILE)
-            df = pd.read_sql_query("SELECT name,date,time,status FROM attendance", conn)
-            conn.close()
-            df.to_csv(path, index=False)
-            messagebox.showinfo("Exported", f"Exported to {path}")
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+        filters, sort, descending = self._filters(), self.sort, self.descending
+
+        def export(loader):
+            # the current view (source, filters, sort), streamed page by page; DB if nothing is loaded
+            own = loader.conn is None
+            conn = connect(DB_FILE) if own else loader.conn
+            try:
+                with open(path, "w", newline="", encoding="utf-8") as f:
+                    writer = csv.writer(f)
+                    writer.writerow(COLUMNS)
+                    writer.writerows(iter_rows(conn, filters, sort, descending))
+            finally:
+                if own:
+                    conn.close()
+            return path
+        self.status_label.config(text=f"Exporting to {path}...")
+        self.loader.submit("export", self.generation, export)
+
+    def _export_done(self, result):
+        if isinstance(result, Exception):
+            messagebox.showerror("Error", str(result))
+        else:
+            messagebox.showinfo("Exported", f"Exported to {result}")
+        self._update_status()
+
+
+    def show_summary(self):
+        """Daily counts and term percentages from the summary tables (see summary.py),
+        for the From/To range (whole months; the current month by default)."""
+        if not DB_FILE.exists():
+            messagebox.showinfo("Info", f"{DB_FILE} not found")
+            return
+        date_from, date_to = self.from_var.get().strip(), self.to_var.get().strip()
+        first_month = (date_from or date_to or date.today().isoformat())[:7]
+        last_month = (date_to or date_from or date.today().isoformat())[:7]
+
+        def summarize(loader):
+            conn = connect(DB_FILE)
+            try:
+                ensure_summary(conn)
+                return (first_month, last_month, daily_counts(conn, date_from or None, date_to or None),
+                        student_percentages(conn, first_month, last_month))
+            finally:
+                conn.close()
+        self.loader.submit("summary", self.generation, summarize)
+
+    def _show_summary(self, result):
+        if isinstance(result, Exception):
+            messagebox.showerror("Error", str(result))
+            return
+        first_month, last_month, counts, percentages = result
+        window = tk.Toplevel(self)
+        window.title(f"Summary {first_month} to {last_month}")
+        window.geometry("700x500")
+        for title, cols, rows in (
+                ("Daily counts", ("date", "status", "count"), counts),
+                ("Term attendance %", ("name", "roll_no", "class", "attended", "sessions", "percent"),
+                 [row[1:] for row in percentages])):
+            tk.Label(window, text=title, anchor="w").pack(fill=tk.X, padx=4)
+            tree = ttk.Treeview(window, columns=cols, show="headings", height=8)
+            for c in cols:
+                tree.heading(c, text=c.replace("_", " ").title())
+                tree.column(c, width=110)
+            for row in rows:
+                tree.insert("", "end", values=tuple("" if v is None else v for v in row))
+            tree.pack(expand=True, fill=tk.BOTH, padx=4, pady=4)
+
 
 if __name__ == "__main__":
     app = TeacherApp()
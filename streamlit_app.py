@@ -1,17 +1,23 @@
 import streamlit as st
 import cv2
 import os
-import numpy as np
 import pandas as pd
-import sqlite3
 from datetime import datetime, date
 
+from attendance_store import PresenceCache, connect, mark_present
+from dataset_manifest import fill_manifest, record_image, register_student, student_samples
+from enrollment_gate import MAX_CAPTURE_FRAMES, EnrollmentGate, largest_face
+from init_db import migrate
+from lbph_model import describe_samples, fingerprint as dataset_fingerprint, load_or_train, normalize_face
+from metrics import render_metrics_panel
+from summary import daily_counts, student_percentages
+
 # ---------------- DATABASE PATH ----------------
 DB_PATH = "attendance.sqlite3"
 
 # ---------------- DATABASE SETUP ----------------
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH)
     c = conn.cursor()
     c.execute("""
         CREATE TABLE IF NOT EXISTS students (
@@ -34,17 +40,30 @@ def init_db():
         )
     """)
     conn.commit()
+    # unique/secondary indexes, WAL (see init_db.py)
+    migrate(conn)
+    # a database from before the manifest gets its dataset/ images indexed once
+    fill_manifest(conn)
     conn.close()
 
 init_db()
 
+# LBPH model kept in memory across reruns; load_or_train persists it to LBPH_MODEL.
+# Its own file: the other Streamlit app (app.py) trains on a different sample set and would
+# otherwise retrain over this one on every switch
+LBPH_MODEL = "lbph_model_streamlit_app.yml"
+
+@st.cache_resource(max_entries=2)
+def get_recognizer(fingerprint, _samples):
+    return load_or_train(_samples, LBPH_MODEL)
+
 # ---------------- APP UI ----------------
 st.title("🎓 Smart Face Attendance System")
 
 menu = ["Home", "Register Student", "Mark Attendance", "View Attendance"]
 choice = st.sidebar.selectbox("Menu", menu)
 
-conn = sqlite3.connect(DB_PATH)
+conn = connect(DB_PATH)
 c = conn.cursor()
 
 # ---------------- REGISTER STUDENT ----------------
@@ -63,32 +82,48 @@ if choice == "Register Student":
             cap = cv2.VideoCapture(0)
             face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
 
-            count = 0
-            while True:
+            # keeps only sharp, frontal, mutually different crops (see enrollment_gate.py)
+            gate = EnrollmentGate()
+            st.info("Look at the camera and turn your head slightly between shots.")
+            frames = 0
+            while not gate.done and frames < MAX_CAPTURE_FRAMES:
                 ret, frame = cap.read()
                 if not ret:
                     break
+                frames += 1
                 gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                faces = face_cascade.detectMultiScale(gray, 1.3, 5)
-                for (x, y, w, h) in faces:
-                    count += 1
-                    face = frame[y:y + h, x:x + w]
-                    img_path = f"{dataset_dir}/{roll_no}_{count}.jpg"
-                    cv2.imwrite(img_path, face)
-                    cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+                face_box = largest_face(face_cascade.detectMultiScale(gray, 1.3, 5))
+                if face_box is not None:
+                    x, y, w, h = face_box
+                    decision = gate.consider(gray[y:y + h, x:x + w])
+                    if decision.accepted:
+                        # stored normalized (gray, FACE_SIZE) so training never has to resize
+                        face = normalize_face(frame[y:y + h, x:x + w])
+                        img_path = f"{dataset_dir}/{roll_no}_{decision.slot + 1}.jpg"
+                        cv2.imwrite(img_path, face)
+                        record_image(conn, img_path, label=roll_no)
+                    color = (0, 255, 0) if decision.accepted else (0, 0, 255)
+                    cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
+                    cv2.putText(frame, f"{decision.reason} {len(gate.hashes)}/{gate.target}", (x, y - 10),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
 
                 cv2.imshow("Capturing Faces (Press 'Enter' to stop)", frame)
-                if cv2.waitKey(1) == 13 or count >= 20:
+                if cv2.waitKey(1) == 13:
                     break
 
             cap.release()
             cv2.destroyAllWindows()
+            st.write(f"📸 {gate.summary()}")
 
-            image_path = f"{dataset_dir}/{roll_no}_1.jpg"
-            c.execute("INSERT INTO students (name, roll_no, class, image_path) VALUES (?, ?, ?, ?)",
-                      (name, roll_no, student_class, image_path))
-            conn.commit()
-            st.success(f"✅ Student {name} registered successfully!")
+            if not gate.hashes:
+                st.error("No usable face image was captured. Improve the lighting and try again.")
+            else:
+                # a re-enrollment overwrote slots 1..N and updates the existing student;
+                # older captures past N are dropped once the student row is saved
+                image_path = f"{dataset_dir}/{roll_no}_1.jpg"
+                _, created = register_student(conn, name, roll_no, student_class, image_path,
+                                              len(gate.hashes), dataset_dir)
+                st.success(f"✅ Student {name} {'registered' if created else 're-enrolled'} successfully!")
         else:
             st.warning("Please fill all fields before capturing.")
 
@@ -107,25 +142,20 @@ elif choice == "Mark Attendance":
         if not students:
             st.warning("⚠️ No students registered yet.")
         else:
-            recognizer = cv2.face.LBPHFaceRecognizer_create()
-            faces, labels = [], []
-
-            for s in students:
-                path = s[4]
-                if os.path.exists(path):
-                    img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
-                    if img is not None:
-                        faces.append(img)
-                        labels.append(s[0])
-
-            if faces:
-                recognizer.train(faces, np.array(labels))
+            # trained once per dataset/students fingerprint, not on every rerun
+            samples = student_samples(conn)
+            recognizer = get_recognizer(dataset_fingerprint(describe_samples(samples)), samples)
 
+            if recognizer is not None:
                 st.info("Click 'Start Camera' to begin marking attendance.")
                 if st.button("🎥 Start Camera"):
                     cap = cv2.VideoCapture(0)
                     face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-                    marked_today = set()
+                    # who already has this subject today, loaded once instead of a SELECT per face
+                    marked_today = PresenceCache(session=subject)
+                    c.execute("SELECT student_id FROM attendance WHERE subject=? AND date=?",
+                              (subject, datetime.now().strftime("%Y-%m-%d")))
+                    marked_today.seed(row[0] for row in c.fetchall())
 
                     while True:
                         ret, frame = cap.read()
@@ -135,7 +165,7 @@ elif choice == "Mark Attendance":
                         faces_detected = face_cascade.detectMultiScale(gray, 1.3, 5)
 
                         for (x, y, w, h) in faces_detected:
-                            face_roi = gray[y:y + h, x:x + w]
+                            face_roi = normalize_face(gray[y:y + h, x:x + w])
                             id_, conf = recognizer.predict(face_roi)
                             if conf < 70:
                                 student = [s for s in students if s[0] == id_][0]
@@ -145,17 +175,9 @@ elif choice == "Mark Attendance":
                                 date_str, time_str = now.strftime("%Y-%m-%d"), now.strftime("%H:%M:%S")
 
                                 # Prevent duplicate marking for the same day & subject
-                                if (id_, subject, date_str) not in marked_today:
-                                    c.execute("""SELECT * FROM attendance 
-                                                 WHERE student_id=? AND subject=? AND date=?""",
-                                              (id_, subject, date_str))
-                                    if not c.fetchone():
-                                        c.execute("""INSERT INTO attendance 
-                                                     (student_id, subject, date, time, status) 
-                                                     VALUES (?, ?, ?, ?, ?)""",
-                                                  (id_, subject, date_str, time_str, "Present"))
-                                        conn.commit()
-                                        marked_today.add((id_, subject, date_str))
+                                if marked_today.should_mark(id_):
+                                    marked_today.mark(id_)
+                                    if mark_present(conn, date_str, time_str, student_id=id_, subject=subject):
                                         st.success(f"✅ Attendance marked for {name} ({subject})")
 
                                 cv2.putText(frame, f"{name}", (x, y - 10),
@@ -216,3 +238,25 @@ elif choice == "View Attendance":
         st.success(f"✅ Attendance exported to {excel_path}")
     else:
         st.info("No records found for the selected filters.")
+
+    # counts and percentages come from the trigger-maintained summary tables (see summary.py)
+    st.subheader("📊 Daily Summary")
+    day = date_filter.strftime("%Y-%m-%d") if date_filter else None
+    counts = pd.DataFrame(daily_counts(conn, day, day, student_class=class_filter or None),
+                          columns=["date", "status", "count"])
+    if not counts.empty:
+        st.dataframe(counts.pivot(index="date", columns="status", values="count").fillna(0).astype(int)
+                     .sort_index(ascending=False))
+
+    st.subheader("🎯 Term Attendance %")
+    this_month = date.today().strftime("%Y-%m")
+    col1, col2 = st.columns(2)
+    first_month = col1.text_input("From month (YYYY-MM)", this_month)
+    last_month = col2.text_input("To month (YYYY-MM)", this_month)
+    percentages = pd.DataFrame(student_percentages(conn, first_month, last_month, student_class=class_filter or None),
+                               columns=["student", "name", "roll_no", "class", "attended", "sessions", "percent"])
+    if roll_filter:
+        percentages = percentages[percentages["roll_no"] == roll_filter.strip()]
+    st.dataframe(percentages.drop(columns=["student"]))
+
+    render_metrics_panel(st)
@@ -0,0 +1,235 @@
+# summary.py
+# Materialized attendance counts, kept current by triggers on `attendance`.
+#
+#   attendance_daily            (date, subject, class, status) -> count
+#   attendance_student_monthly  (student, month, subject, class, status) -> sessions
+#
+# Reports read these instead of counting raw marks, so a daily-counts view
+# costs O(days) and a term percentage O(students x months). NULL subject /
+# class / status are stored as '' so they can be part of the primary key.
+# `student` is 'id:<students.id>' for the Streamlit apps and 'name:<name>' for
+# the camera loops, which only know a name.
+#
+#   python summary.py backfill   # rebuild both tables from attendance
+#   python summary.py check      # compare them against a fresh recount
+import sys
+
+from attendance_store import DB_PATH, connect
+
+_TABLES = """
+    CREATE TABLE IF NOT EXISTS attendance_daily (
+        date TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        class TEXT NOT NULL,
+        status TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (date, subject, class, status)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS attendance_student_monthly (
+        student TEXT NOT NULL,
+        month TEXT NOT NULL,          -- YYYY-MM
+        subject TEXT NOT NULL,
+        class TEXT NOT NULL,
+        status TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (student, month, subject, class, status)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS ix_student_monthly_month ON attendance_student_monthly(month);
+"""
+
+
+def _keys(row, with_students):
+    """SQL expressions for the summary key of a NEW/OLD row (or an attendance alias)."""
+    student_class = (f"COALESCE((SELECT TRIM(class) FROM students WHERE id = {row}.student_id), '')"
+                     if with_students else "''")
+    return {
+        "date": f"COALESCE({row}.date, '')",
+        "month": f"substr(COALESCE({row}.date, ''), 1, 7)",
+        "subject": f"COALESCE({row}.subject, '')",
+        "class": student_class,
+        "status": f"COALESCE({row}.status, '')",
+        "student": (f"CASE WHEN {row}.student_id IS NOT NULL THEN 'id:' || {row}.student_id "
+                    f"ELSE 'name:' || COALESCE({row}.name, '') END"),
+    }
+
+
+def _add(row, delta, with_students):
+    k = _keys(row, with_students)
+    # the per-student table counts sessions, not marks: a repeated mark for the same
+    # student, day, subject and status (legacy rows with a NULL subject) only counts once
+    same_session = f"""
+        x.id != {row}.id AND x.date = {row}.date AND x.subject IS {row}.subject AND x.status IS {row}.status
+    """
+    monthly = f"""
+        INSERT INTO attendance_student_monthly (student, month, subject, class, status, count)
+        SELECT {k['student']}, {k['month']}, {k['subject']}, {k['class']}, {k['status']}, {delta}
+        WHERE {{who}} AND NOT EXISTS (SELECT 1 FROM attendance x WHERE {{match}} AND {same_session})
+        ON CONFLICT (student, month, subject, class, status) DO UPDATE SET count = count + ({delta});
+    """
+    return f"""
+        INSERT INTO attendance_daily (date, subject, class, status, count)
+        VALUES ({k['date']}, {k['subject']}, {k['class']}, {k['status']}, {delta})
+        ON CONFLICT (date, subject, class, status) DO UPDATE SET count = count + ({delta});
+        {monthly.format(who=f"{row}.student_id IS NOT NULL", match=f"x.student_id = {row}.student_id")}
+        {monthly.format(who=f"{row}.student_id IS NULL", match=f"x.student_id IS NULL AND x.name = {row}.name")}
+    """
+
+
+def _has_students(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'students'").fetchone() is not None
+
+
+def ensure_summary(conn):
+    """Create the tables (backfilled the first time) and the triggers.
+
+    The triggers are rebuilt once a students table appears, since the class
+    lookup can only be compiled in when it exists. Returns True if it backfilled.
+    """
+    created = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'attendance_daily'").fetchone() is None
+    with_students = _has_students(conn)
+    trigger = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_attendance_summary_insert'").fetchone()
+    if not created and trigger is not None and ("FROM students" in trigger[0]) == with_students:
+        return False  # already current; the report pages call this on every rerun
+    conn.executescript(_TABLES)
+    conn.executescript(f"""
+        DROP TRIGGER IF EXISTS trg_attendance_summary_insert;
+        DROP TRIGGER IF EXISTS trg_attendance_summary_delete;
+        DROP TRIGGER IF EXISTS trg_attendance_summary_update;
+        CREATE TRIGGER trg_attendance_summary_insert AFTER INSERT ON attendance BEGIN
+            {_add("NEW", 1, with_students)}
+        END;
+        CREATE TRIGGER trg_attendance_summary_delete AFTER DELETE ON attendance BEGIN
+            {_add("OLD", -1, with_students)}
+        END;
+        CREATE TRIGGER trg_attendance_summary_update
+        AFTER UPDATE OF date, subject, status, student_id, name ON attendance BEGIN
+            {_add("OLD", -1, with_students)}
+            {_add("NEW", 1, with_students)}
+        END;
+    """)
+    if created:
+        rebuild_summary(conn)
+    conn.commit()
+    return created
+
+
+def _recount(conn):
+    """The two summaries computed from scratch, as SELECTs."""
+    k = _keys("a", _has_students(conn))
+    daily = f"""
+        SELECT {k['date']}, {k['subject']}, {k['class']}, {k['status']}, COUNT(*)
+        FROM attendance a GROUP BY 1, 2, 3, 4
+    """
+    monthly = f"""
+        SELECT {k['student']}, {k['month']}, {k['subject']}, {k['class']}, {k['status']}, COUNT(DISTINCT a.date)
+        FROM attendance a GROUP BY 1, 2, 3, 4, 5
+    """
+    return daily, monthly
+
+
+def rebuild_summary(conn):
+    """Backfill: recount everything (also the fix after editing a student's class)."""
+    daily, monthly = _recount(conn)
+    conn.execute("DELETE FROM attendance_daily")
+    conn.execute("DELETE FROM attendance_student_monthly")
+    conn.execute(f"INSERT INTO attendance_daily (date, subject, class, status, count) {daily}")
+    conn.execute(f"INSERT INTO attendance_student_monthly (student, month, subject, class, status, count) {monthly}")
+    conn.commit()
+    return conn.execute("SELECT COUNT(*) FROM attendance_daily").fetchone()[0]
+
+
+def check_summary(conn):
+    """Rows where the materialized counts differ from a recount ([] when in sync)."""
+    daily, monthly = _recount(conn)
+    return conn.execute(f"""
+        SELECT 'daily', * FROM (
+            SELECT date, subject, class, status, count FROM attendance_daily WHERE count != 0
+            EXCEPT {daily})
+        UNION ALL SELECT 'daily (missing)', * FROM (
+            {daily} EXCEPT SELECT date, subject, class, status, count FROM attendance_daily)
+        UNION ALL SELECT 'monthly', student || ' ' || month, subject, class, status, count FROM (
+            SELECT student, month, subject, class, status, count FROM attendance_student_monthly WHERE count != 0
+            EXCEPT {monthly})
+    """).fetchall()
+
+
+def _filters(date_from=None, date_to=None, subject=None, student_class=None, date_column="date"):
+    clauses, params = [], []
+    for clause, value in ((f"{date_column} >= ?", date_from), (f"{date_column} <= ?", date_to),
+                          ("subject = ?", subject), ("class = TRIM(?)", student_class)):
+        if value:
+            clauses.append(clause)
+            params.append(value)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def daily_counts(conn, date_from=None, date_to=None, subject=None, student_class=None):
+    """[(date, status, count), ...] newest first, summed over the other keys."""
+    where, params = _filters(date_from, date_to, subject, student_class)
+    return conn.execute(f"""
+        SELECT date, status, SUM(count) FROM attendance_daily{where}
+        GROUP BY date, status HAVING SUM(count) > 0 ORDER BY date DESC, status
+    """, params).fetchall()
+
+
+def student_percentages(conn, first_month, last_month, subject=None, student_class=None):
+    """Per-student attendance over a term of whole months ('YYYY-MM' .. 'YYYY-MM').
+
+    Sessions held = distinct (date, subject) with any mark for the student's class;
+    attended = the student's 'Present' marks. Registered students without a single
+    mark are included at 0%. Returns
+    [(student, name, roll_no, class, attended, sessions, percent), ...] lowest percent first.
+    """
+    held_where, held_params = _filters(f"{first_month}-01", f"{last_month}-31", subject, student_class)
+    marks_where, marks_params = _filters(first_month, last_month, subject, student_class, date_column="month")
+    with_students = _has_students(conn)
+    roster = ""
+    roster_params = []
+    if with_students:
+        roster = "UNION SELECT 'id:' || id, COALESCE(TRIM(class), '') FROM students"
+        if student_class:
+            roster += " WHERE TRIM(class) = TRIM(?)"
+            roster_params.append(student_class)
+    names = ("LEFT JOIN students s ON p.student = 'id:' || s.id" if with_students
+             else "LEFT JOIN (SELECT NULL AS id, NULL AS name, NULL AS roll_no) s ON 0")
+    return conn.execute(f"""
+        WITH held AS (
+            SELECT class, COUNT(*) AS sessions FROM (
+                SELECT DISTINCT class, date, subject FROM attendance_daily{held_where})
+            GROUP BY class
+        ),
+        marks AS (
+            SELECT student, class, SUM(CASE WHEN status = 'Present' THEN count ELSE 0 END) AS attended
+            FROM attendance_student_monthly{marks_where}
+            GROUP BY student, class
+        ),
+        people AS (SELECT student, class FROM marks {roster})
+        SELECT p.student,
+               COALESCE(TRIM(s.name), CASE WHEN p.student LIKE 'name:%' THEN substr(p.student, 6) END),
+               TRIM(s.roll_no), p.class, COALESCE(m.attended, 0) AS attended, h.sessions,
+               ROUND(100.0 * COALESCE(m.attended, 0) / h.sessions, 1) AS percent
+        FROM people p
+        JOIN held h ON h.class = p.class
+        LEFT JOIN marks m ON m.student = p.student AND m.class = p.class
+        {names}
+        ORDER BY percent, p.student
+    """, held_params + marks_params + roster_params).fetchall()
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "check"
+    conn = connect(DB_PATH)
+    ensure_summary(conn)
+    if command == "backfill":
+        print(f"✅ Summary rebuilt ({rebuild_summary(conn)} daily rows)")
+    elif command == "check":
+        mismatches = check_summary(conn)
+        for row in mismatches:
+            print(f"⚠️ {row}")
+        print("✅ Summary is in sync" if not mismatches else f"❌ {len(mismatches)} mismatched rows")
+    else:
+        print("usage: python summary.py [backfill|check]")
+    conn.close()
@@ -0,0 +1,7 @@
+# tests/conftest.py
+# The modules live flat in the repository root, like the scripts that import them.
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
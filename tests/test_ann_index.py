@@ -0,0 +1,79 @@
+# tests/test_ann_index.py
+import numpy as np
+
+from ann_index import IVFIndex
+from face_matcher import FaceMatcher
+from gallery_store import build_gallery, load_gallery, save_gallery
+
+
+def clustered(n, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(0, 0.1, (16, 128))
+    encodings = centres[rng.integers(0, 16, n)] + rng.normal(0, 0.01, (n, 128))
+    return encodings.astype(np.float32)
+
+
+def buckets(index):
+    return [sorted(index.order[index.offsets[c]:index.offsets[c + 1]]) for c in range(index.nlist)]
+
+
+def test_reassign_buckets_every_row_once():
+    index = IVFIndex.build(clustered(400), nlist=16)
+    edited = clustered(250, seed=1)
+    moved = index.reassign(edited, gallery="g2")
+    assert moved.count == 250 and moved.gallery == "g2"
+    assert np.array_equal(moved.centroids, index.centroids)
+    assert sorted(moved.order) == list(range(250))
+    # each row sits in the list of its nearest centroid
+    for c, rows in enumerate(buckets(moved)):
+        for row in rows:
+            nearest = np.linalg.norm(index.centroids - edited[row], axis=1).argmin()
+            assert nearest == c
+
+
+def test_reassign_equals_build_assignment_for_same_rows():
+    encodings = clustered(300)
+    index = IVFIndex.build(encodings, nlist=12)
+    assert buckets(index.reassign(encodings)) == buckets(index)
+
+
+def test_reassign_empty_gallery():
+    assert IVFIndex.build(clustered(50), nlist=4).reassign(np.empty((0, 128))) is None
+
+
+def test_indexed_match_uses_candidates_from_reassigned_index():
+    encodings = clustered(600)
+    names = [f"s{i % 40}" for i in range(600)]
+    index = IVFIndex.build(encodings[:300], nlist=16).reassign(encodings)
+    exact = FaceMatcher(encodings, names)
+    ann = FaceMatcher(encodings, names, index=index, nprobe=15)
+    assert ann.use_index()
+    assert [m.index for m in ann.match(encodings[::7])] == [m.index for m in exact.match(encodings[::7])]
+
+
+def test_index_from_another_generation_is_not_used(tmp_path):
+    encodings = clustered(200)
+    names = [f"s{i % 10}" for i in range(200)]
+    meta = save_gallery(tmp_path / "g", build_gallery(encodings, names))
+    IVFIndex.build(encodings, nlist=8, gallery=meta["generation"]).save(tmp_path / "i.ivf.npz")
+    gallery = load_gallery(tmp_path / "g")
+    index = IVFIndex.load(tmp_path / "i.ivf.npz")
+    assert index.gallery == gallery.generation
+    assert FaceMatcher.from_gallery(gallery, index=index, nprobe=2).use_index()
+
+    # same row count, new generation: the old index must not be trusted
+    save_gallery(tmp_path / "g", build_gallery(encodings[::-1], names))
+    newer = load_gallery(tmp_path / "g")
+    assert len(newer.encodings) == index.count
+    assert not FaceMatcher.from_gallery(newer, index=index, nprobe=2).use_index()
+
+
+def test_legacy_index_without_stamp_is_stale(tmp_path):
+    encodings = clustered(100)
+    index = IVFIndex.build(encodings, nlist=4)
+    np.savez(tmp_path / "old.ivf.npz", version=1, centroids=index.centroids, order=index.order,
+             offsets=index.offsets, count=index.count)
+    loaded = IVFIndex.load(tmp_path / "old.ivf.npz")
+    assert loaded.gallery is None
+    save_gallery(tmp_path / "g", build_gallery(encodings, ["a"] * 100))
+    assert not FaceMatcher.from_gallery(load_gallery(tmp_path / "g"), index=loaded, nprobe=1).use_index()
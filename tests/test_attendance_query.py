@@ -0,0 +1,46 @@
+# tests/test_attendance_query.py
+import sqlite3
+
+from attendance_query import SORT_INDEX_SQL, build_filters, fetch_page, iter_rows
+
+
+def _conn(rows):
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE attendance (id INTEGER PRIMARY KEY, name TEXT, date TEXT, time TEXT, status TEXT)")
+    conn.executemany("INSERT INTO attendance (name, date, time, status) VALUES (?, ?, ?, ?)", rows)
+    conn.execute(SORT_INDEX_SQL)
+    return conn
+
+
+ROWS = [
+    ("a", "2025-11-04", "09:00", "Present"),
+    ("b", "2025-11-03", "09:00", "Present"),
+    ("c", "2025-11-03", None, "Present"),
+    ("d", None, "10:00", "Present"),
+    ("e", None, None, None),
+    ("f", None, None, "Present"),
+]
+
+
+def test_null_dated_rows_survive_page_boundaries():
+    conn = _conn(ROWS)
+    for sort in ("date", "name", "status"):
+        for descending in (True, False):
+            for size in (1, 2, 3, 4):
+                names = [row[0] for row in iter_rows(conn, sort=sort, descending=descending, page_size=size)]
+                assert sorted(names) == list("abcdef"), (sort, descending, size)
+
+
+def test_nulls_sort_as_oldest():
+    conn = _conn(ROWS)
+    rows, after = fetch_page(conn, limit=3)
+    assert [row[0] for row in rows] == ["a", "b", "c"]
+    rows, after = fetch_page(conn, after=after, limit=3)
+    assert [row[0] for row in rows] == ["d", "f", "e"]
+    assert fetch_page(conn, after=after, limit=3) == ([], None)
+
+
+def test_filters_apply_to_every_page():
+    conn = _conn(ROWS)
+    names = [row[0] for row in iter_rows(conn, build_filters(status="Present"), page_size=2)]
+    assert names == ["a", "b", "c", "d", "f"]
@@ -0,0 +1,46 @@
+# tests/test_attendance_store.py
+import shutil
+import threading
+
+from attendance_store import connect, mark_present
+from conftest import ROOT
+from init_db import create_tables, migrate
+
+
+def test_no_duplicates_without_the_unique_indexes(tmp_path):
+    # the shipped database still has duplicates, so migrate cannot create the indexes
+    shutil.copy(ROOT / "attendance.sqlite3", tmp_path / "a.sqlite3")
+    conn = connect(tmp_path / "a.sqlite3")
+    assert migrate(conn) > 0
+    assert mark_present(conn, "2031-01-01", "09:00", student_id=2, subject="math")
+    assert not mark_present(conn, "2031-01-01", "09:05", student_id=2, subject="math")
+    assert mark_present(conn, "2031-01-01", "09:10", student_id=2)
+    assert not mark_present(conn, "2031-01-01", "09:15", student_id=2, subject="")
+    assert mark_present(conn, "2031-01-01", "09:10", name="raju")
+    assert not mark_present(conn, "2031-01-01", "09:15", name="raju")
+    assert mark_present(conn, "2031-01-01", "09:15", name="raju", subject="OS")
+    assert conn.execute("SELECT COUNT(*) FROM attendance WHERE date = '2031-01-01'").fetchone()[0] == 4
+
+
+def test_concurrent_writers_mark_once(tmp_path):
+    conn = connect(tmp_path / "a.sqlite3")
+    create_tables(conn)
+    conn.execute("ALTER TABLE attendance ADD COLUMN student_id INTEGER")
+    conn.execute("ALTER TABLE attendance ADD COLUMN subject TEXT")
+    conn.close()
+    results = []
+
+    def writer():
+        own = connect(tmp_path / "a.sqlite3")
+        for _ in range(20):
+            results.append(mark_present(own, "2031-01-01", "09:00", student_id=7, subject="OS"))
+        own.close()
+
+    threads = [threading.Thread(target=writer) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results.count(True) == 1
+    conn = connect(tmp_path / "a.sqlite3")
+    assert conn.execute("SELECT COUNT(*) FROM attendance").fetchone()[0] == 1
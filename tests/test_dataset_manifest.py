@@ -0,0 +1,95 @@
+# tests/test_dataset_manifest.py
+import shutil
+import sqlite3
+
+import pytest
+
+from conftest import ROOT
+from dataset_manifest import (drop_stale_captures, ensure_manifest, fill_manifest, list_images, open_manifest,
+                              person_images, record_image, register_student, student_samples)
+
+
+@pytest.fixture
+def shipped(tmp_path):
+    """A copy of the shipped database and dataset/ (never touch the real ones)."""
+    shutil.copytree(ROOT / "dataset", tmp_path / "dataset")
+    shutil.copy(ROOT / "attendance.sqlite3", tmp_path / "attendance.sqlite3")
+    return tmp_path
+
+
+def test_fresh_manifest_over_shipped_dataset_has_samples(shipped):
+    conn = open_manifest(shipped / "attendance.sqlite3", root=shipped)
+    samples = student_samples(conn)
+    assert samples
+    for student_id, path in samples:
+        assert student_id is not None
+        assert (shipped / path).is_file()
+
+
+def test_fill_manifest_scans_only_once(shipped):
+    conn = sqlite3.connect(shipped / "attendance.sqlite3")
+    fill_manifest(conn, root=shipped)
+    count = conn.execute("SELECT COUNT(*) FROM dataset_images").fetchone()[0]
+    (shipped / "dataset" / "999_1.jpg").write_bytes(b"x")
+    fill_manifest(conn, root=shipped)
+    assert conn.execute("SELECT COUNT(*) FROM dataset_images").fetchone()[0] == count
+
+
+def test_person_images_skip_flat_crops(shipped):
+    conn = open_manifest(shipped / "attendance.sqlite3", root=shipped)
+    rows = person_images(conn)
+    assert rows
+    assert all(path.count("/") == 2 and label == label.strip() for path, label in rows)
+    assert {label for _, label in rows} == {p.name for p in (shipped / "dataset").iterdir() if p.is_dir()}
+    assert person_images(conn, " prashant ") == person_images(conn, "prashant")
+
+
+def test_re_enrollment_drops_older_captures(tmp_path):
+    conn = sqlite3.connect(":memory:")
+    ensure_manifest(conn)
+    (tmp_path / "dataset").mkdir()
+    for n in range(1, 21):
+        (tmp_path / "dataset" / f"142_{n}.jpg").write_bytes(b"old")
+        record_image(conn, f"dataset/142_{n}.jpg", label="142", root=tmp_path)
+    (tmp_path / "dataset" / "1420_9.jpg").write_bytes(b"other student")
+    record_image(conn, "dataset/1420_9.jpg", label="1420", root=tmp_path)
+    # a manifest row whose file was already deleted by hand
+    (tmp_path / "dataset" / "142_20.jpg").unlink()
+
+    removed = drop_stale_captures(conn, "142", 6, root=tmp_path)
+    assert len(removed) == 14
+    assert sorted(p.name for p in (tmp_path / "dataset").iterdir()) == \
+        sorted([f"142_{n}.jpg" for n in range(1, 7)] + ["1420_9.jpg"])
+    assert [path for path, _, _ in list_images(conn, "142")] == [f"dataset/142_{n}.jpg" for n in range(1, 7)]
+    assert list_images(conn, "1420")
+
+
+def _enroll(conn, root, roll_no, count):
+    for n in range(1, count + 1):
+        (root / "dataset" / f"{roll_no}_{n}.jpg").write_bytes(b"face")
+        record_image(conn, f"dataset/{roll_no}_{n}.jpg", label=roll_no, root=root)
+
+
+def test_re_registration_updates_the_student_then_drops_captures(tmp_path):
+    conn = sqlite3.connect(":memory:")
+    ensure_manifest(conn)
+    conn.execute("CREATE TABLE students (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, "
+                 "roll_no TEXT UNIQUE NOT NULL, class TEXT, image_path TEXT)")
+    (tmp_path / "dataset").mkdir()
+    _enroll(conn, tmp_path, "142", 20)
+    student_id, created = register_student(conn, "Ravi", "142", "CSE-A", "dataset/142_1.jpg", 20, root=tmp_path)
+    assert created
+
+    _enroll(conn, tmp_path, "142", 6)
+    assert register_student(conn, "Ravi K", "142", "CSE-B", "dataset/142_1.jpg", 6, root=tmp_path) == \
+        (student_id, False)
+    assert conn.execute("SELECT id, name, class FROM students").fetchall() == [(student_id, "Ravi K", "CSE-B")]
+    assert len(list((tmp_path / "dataset").iterdir())) == 6
+    assert {sid for _, _, sid in list_images(conn, "142")} == {student_id}
+
+    # a failed student write keeps the captures it would have replaced
+    _enroll(conn, tmp_path, "150", 4)
+    with pytest.raises(sqlite3.IntegrityError):
+        register_student(conn, None, "150", "CSE-B", "dataset/150_1.jpg", 2, root=tmp_path)
+    assert len(list_images(conn, "150")) == 4
+    assert len(list((tmp_path / "dataset").glob("150_*.jpg"))) == 4
@@ -0,0 +1,48 @@
+# tests/test_face_matcher.py
+import numpy as np
+
+from face_matcher import FaceMatcher
+
+
+def brute_force(encodings, names, query, tolerance):
+    dists = np.linalg.norm(np.asarray(encodings, dtype=np.float64) - query, axis=1)
+    best = int(dists.argmin())
+    others = [d for d, name in zip(dists, names) if name != names[best]]
+    margin = min(others) - dists[best] if others else float("inf")
+    return (names[best] if dists[best] <= tolerance else "Unknown"), best, dists[best], margin
+
+
+def random_gallery(identities=12, per_identity=5, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(0, 0.1, (identities, 128))
+    encodings = np.repeat(centres, per_identity, axis=0) + rng.normal(0, 0.02, (identities * per_identity, 128))
+    names = [f"s{i}" for i in range(identities) for _ in range(per_identity)]
+    return encodings.astype(np.float32), names, centres
+
+
+def test_match_agrees_with_brute_force():
+    encodings, names, centres = random_gallery()
+    rng = np.random.default_rng(1)
+    queries = np.concatenate([centres + rng.normal(0, 0.02, centres.shape),   # known faces
+                              rng.normal(0, 0.1, (5, 128))])                 # strangers
+    matcher = FaceMatcher(encodings, names, tolerance=0.3)
+    for query, got in zip(queries, matcher.match(queries)):
+        name, index, distance, margin = brute_force(encodings, names, query, 0.3)
+        assert got.name == name
+        assert got.index == index
+        assert np.isclose(got.distance, distance, atol=1e-4)
+        assert np.isclose(got.margin, margin, atol=1e-4)
+
+
+def test_single_identity_has_infinite_margin():
+    encodings, names, _ = random_gallery(identities=1)
+    [got] = FaceMatcher(encodings, names).match(encodings[:1])
+    assert got.name == "s0"
+    assert got.margin == float("inf")
+
+
+def test_empty_inputs():
+    encodings, names, _ = random_gallery()
+    assert FaceMatcher(encodings, names).match([]) == []
+    [got] = FaceMatcher([], []).match(encodings[:1])
+    assert got.name == "Unknown" and got.index == -1
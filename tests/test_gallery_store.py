@@ -0,0 +1,59 @@
+# tests/test_gallery_store.py
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+from conftest import ROOT
+from gallery_store import build_gallery, gallery_lock, load_gallery, save_gallery
+
+# one writer process: three read-modify-write rounds, each adding a row for `name`
+WRITER = """
+import sys
+sys.path.insert(0, sys.argv[1])
+import numpy as np
+from gallery_store import build_gallery, gallery_lock, load_gallery, save_gallery
+
+path, name = sys.argv[2], sys.argv[3]
+for _ in range(3):
+    with gallery_lock(path):
+        gallery = load_gallery(path, mmap=False)
+        names = [gallery.identities[label] for label in gallery.labels] + [name]
+        encodings = list(gallery.encodings) + [np.zeros(128, dtype=np.float32)]
+        save_gallery(path, build_gallery(encodings, names))
+"""
+
+
+def test_concurrent_writers_lose_no_update(tmp_path):
+    path = tmp_path / "g.gallery"
+    save_gallery(path, build_gallery([], []))
+    writers = [subprocess.Popen([sys.executable, "-c", WRITER, str(ROOT), str(path), f"s{i}"]) for i in range(6)]
+    assert all(w.wait(60) == 0 for w in writers)
+
+    gallery = load_gallery(path)
+    names = [gallery.identities[label] for label in gallery.labels]
+    assert sorted(names) == sorted(f"s{i}" for i in range(6) for _ in range(3))
+    # the current and the previous generation, no stray temp files
+    files = sorted(p.name for p in path.iterdir() if p.name not in ("meta.json", ".lock"))
+    assert len(files) <= 8 and not [f for f in files if f.endswith(".tmp")]
+
+
+def test_lock_is_reentrant_and_excludes_other_threads(tmp_path):
+    path = tmp_path / "g.gallery"
+    events = []
+
+    def other():
+        with gallery_lock(path):
+            events.append("other")
+
+    with gallery_lock(path):
+        with gallery_lock(path):  # save_gallery inside a publish
+            save_gallery(path, build_gallery(np.zeros((2, 128)), ["a", "b"]))
+        thread = threading.Thread(target=other)
+        thread.start()
+        time.sleep(0.2)
+        events.append("owner")
+    thread.join(5)
+    assert events == ["owner", "other"]
@@ -0,0 +1,87 @@
+# tests/test_init_db.py
+import sqlite3
+
+from attendance_store import connect, mark_present
+from init_db import count_duplicates, create_tables, dedupe, migrate
+
+
+def duplicate_laden(path):
+    conn = connect(path)
+    create_tables(conn)
+    conn.execute("ALTER TABLE attendance ADD COLUMN student_id INTEGER")
+    conn.execute("ALTER TABLE attendance ADD COLUMN subject TEXT")
+    # the unique index the first migration created: it never matched NULL subjects
+    conn.execute("""CREATE UNIQUE INDEX ux_attendance_student_subject_date
+                    ON attendance(student_id, subject, date) WHERE student_id IS NOT NULL""")
+    rows = [
+        (1, None, None, "2025-09-01", "09:00"),   # kept
+        (1, None, None, "2025-09-01", "09:05"),   # duplicate: NULL subject, same day
+        (1, None, None, "2025-09-01", "09:10"),   # duplicate
+        (1, "OS", None, "2025-09-01", "10:00"),   # another subject: kept
+        (1, None, None, "2025-09-02", "09:00"),   # another day: kept
+        (2, None, None, "2025-09-01", "09:00"),   # another student: kept
+        (None, None, "raju", "2025-09-01", "09:00"),  # kept
+        (None, None, "raju", "2025-09-01", "09:30"),  # duplicate by name
+    ]
+    conn.executemany("INSERT INTO attendance (student_id, subject, name, date, time, status) "
+                     "VALUES (?, ?, ?, ?, ?, 'Present')", rows)
+    conn.commit()
+    return conn
+
+
+def ids(conn):
+    return [row[0] for row in conn.execute("SELECT id FROM attendance ORDER BY id")]
+
+
+def indexes(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+
+def test_migrate_never_deletes(tmp_path):
+    conn = duplicate_laden(tmp_path / "a.sqlite3")
+    assert migrate(conn) == 3
+    assert ids(conn) == list(range(1, 9))
+    assert "ux_attendance_student_subject_day" not in indexes(conn)
+    # the old index stays until its replacement can be created
+    assert "ux_attendance_student_subject_date" in indexes(conn)
+
+
+def test_dry_run_counts_only(tmp_path):
+    conn = duplicate_laden(tmp_path / "a.sqlite3")
+    counts = dedupe(conn, dry_run=True, backup_path=tmp_path / "backup.sqlite3")
+    assert counts == {"ux_attendance_student_subject_day": 2, "ux_attendance_name_subject_day": 1}
+    assert ids(conn) == list(range(1, 9))
+    assert not (tmp_path / "backup.sqlite3").exists()
+
+
+def test_dedupe_keeps_earliest_and_backs_up(tmp_path):
+    conn = duplicate_laden(tmp_path / "a.sqlite3")
+    dedupe(conn, backup_path=tmp_path / "backup.sqlite3")
+    assert ids(conn) == [1, 4, 5, 6, 7]
+    backup = sqlite3.connect(tmp_path / "backup.sqlite3")
+    assert backup.execute("SELECT COUNT(*) FROM attendance").fetchone()[0] == 8
+    assert count_duplicates(conn) == {"ux_attendance_student_subject_day": 0, "ux_attendance_name_subject_day": 0}
+    assert {"ux_attendance_student_subject_day", "ux_attendance_name_subject_day"} <= indexes(conn)
+    assert not {"ux_attendance_student_subject_date", "ux_attendance_name_date"} & indexes(conn)
+    assert migrate(conn) == 0
+
+
+def test_unique_index_dedupes_null_subjects(tmp_path):
+    conn = duplicate_laden(tmp_path / "a.sqlite3")
+    dedupe(conn)
+    assert not mark_present(conn, "2025-09-01", "11:00", student_id=1)
+    assert not mark_present(conn, "2025-09-01", "11:00", student_id=1, subject="OS")
+    assert mark_present(conn, "2025-09-01", "11:00", student_id=1, subject="DBMS")
+    assert mark_present(conn, "2025-09-03", "11:00", student_id=1)
+    assert not mark_present(conn, "2025-09-01", "11:00", name="raju")
+    assert mark_present(conn, "2025-09-01", "11:00", name="raju", subject="OS")
+    assert not mark_present(conn, "2025-09-01", "11:30", name="raju", subject="OS")
+
+
+def test_summary_follows_dedupe(tmp_path):
+    from summary import check_summary
+
+    conn = duplicate_laden(tmp_path / "a.sqlite3")
+    migrate(conn)
+    dedupe(conn)
+    assert check_summary(conn) == []
@@ -0,0 +1,45 @@
+# tests/test_live_gallery.py
+import pytest
+
+pytest.importorskip("face_recognition")  # live_gallery loads through the recognizer module
+
+from ann_index import IVFIndex, index_path_for  # noqa: E402
+from gallery_store import build_gallery, gallery_path_for, load_gallery, read_meta, save_gallery  # noqa: E402
+from live_gallery import LiveMatcher, publish  # noqa: E402
+from prototypes import synthetic_identities  # noqa: E402
+
+
+def names_of(gallery):
+    return [gallery.identities[label] for label in gallery.labels]
+
+
+def test_enrolling_into_a_compressed_gallery_compresses_the_new_rows(tmp_path):
+    model = tmp_path / "m.pkl"
+    encodings, names = synthetic_identities(5, per_identity=3)
+    save_gallery(gallery_path_for(model), build_gallery(encodings, names), prototypes=3)
+
+    new, _ = synthetic_identities(1, per_identity=20, seed=7)
+    gallery, _ = publish(model, add={"142": list(new)})
+    assert names_of(gallery).count("142") <= 3
+    assert read_meta(gallery_path_for(model))["prototypes"] == 3
+
+
+def test_uncompressed_gallery_keeps_every_row(tmp_path):
+    model = tmp_path / "m.pkl"
+    new, _ = synthetic_identities(1, per_identity=20, seed=7)
+    gallery, _ = publish(model, add={"142": list(new)})
+    assert names_of(gallery).count("142") == 20
+    assert "prototypes" not in read_meta(gallery_path_for(model))
+
+
+def test_publish_restamps_the_index(tmp_path):
+    model = tmp_path / "m.pkl"
+    encodings, names = synthetic_identities(40, per_identity=5)
+    gallery, _ = publish(model, add={n: [e for e, m in zip(encodings, names) if m == n] for n in set(names)})
+    IVFIndex.build(gallery.encodings, nlist=8, gallery=gallery.generation).save(index_path_for(model))
+
+    gallery, index = publish(model, remove=("id3",))
+    assert index.gallery == gallery.generation == load_gallery(gallery_path_for(model)).generation
+    live = LiveMatcher(model, nprobe=2)
+    assert live.current.use_index()
+    assert "id3" not in live.identities
@@ -0,0 +1,24 @@
+# tests/test_multi_stream.py
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("face_recognition")  # multi_stream imports the recognizer
+
+from attendance_store import connect  # noqa: E402
+from init_db import create_tables, migrate  # noqa: E402
+from multi_stream import write_mark  # noqa: E402
+
+
+def test_one_name_mark_per_subject_and_day(tmp_path, capsys):
+    conn = connect(tmp_path / "a.sqlite3")
+    create_tables(conn)
+    migrate(conn)
+    now = datetime(2025, 9, 1, 9, 0)
+    write_mark(conn, ("OS", "raju", now))
+    write_mark(conn, ("OS", "raju", now))
+    write_mark(conn, ("DBMS", "raju", now))
+    rows = conn.execute("SELECT name, subject FROM attendance ORDER BY id").fetchall()
+    assert rows == [("raju", "OS"), ("raju", "DBMS")]
+    out = capsys.readouterr().out.splitlines()
+    assert out[0].startswith("✅") and out[1].startswith("ℹ️") and out[2].startswith("✅")
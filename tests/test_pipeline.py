@@ -0,0 +1,30 @@
+# tests/test_pipeline.py
+import time
+
+from pipeline import LatestQueue, RecognitionWorker
+
+
+def test_worker_survives_a_failing_frame():
+    frames = LatestQueue()
+    calls = []
+
+    def recognize(frame):
+        calls.append(frame)
+        if frame == "bad":
+            raise ValueError("corrupt frame")
+        return [((0, 1, 1, 0), frame)]
+
+    names = []
+    worker = RecognitionWorker(frames, recognize, on_name=names.append)
+    worker.start()
+    frames.put((1, time.monotonic(), "bad"))
+    deadline = time.monotonic() + 2
+    while len(calls) < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    frames.put((2, time.monotonic(), "raju"))
+    while not names and time.monotonic() < deadline:
+        time.sleep(0.01)
+    worker.stop_event.set()
+    worker.join(1)
+    assert names == ["raju"]
+    assert worker.result_seq == 2
@@ -0,0 +1,67 @@
+# tests/test_prototypes.py
+import argparse
+
+import numpy as np
+import pytest
+
+from prototypes import compress, medoids, pairwise, prototype_count, synthetic_identities
+
+
+def test_identical_encodings():
+    e = np.full(128, 0.1, dtype=np.float32)
+    kept, outliers = compress([e] * 6, ["a"] * 6, 3)
+    assert len(kept) == 1 and outliers == []
+
+
+def test_k_capped_at_distinct_points():
+    a, b = np.zeros(128), np.full(128, 0.01)
+    kept, _ = compress([a, a, b, b, a, b], ["x"] * 6, 3)
+    assert len(kept) == 2
+    assert {tuple(np.round([a, a, b, b, a, b][i][:1], 3)) for i in kept} == {(0.0,), (0.01,)}
+
+
+def test_fewer_images_than_k_keeps_all():
+    rng = np.random.default_rng(0)
+    kept, outliers = compress(rng.normal(0, 0.05, (2, 128)), ["a", "a"], 3)
+    assert kept == [0, 1] and outliers == []
+
+
+def test_single_image_identities():
+    rng = np.random.default_rng(0)
+    kept, outliers = compress(rng.normal(0, 0.05, (3, 128)), ["a", "b", "c"], 1)
+    assert kept == [0, 1, 2] and outliers == []
+
+
+def test_outlier_flagged_and_not_kept():
+    rng = np.random.default_rng(0)
+    same = rng.normal(0, 0.02, (8, 128)) + 0.1
+    stranger = rng.normal(0, 0.02, (1, 128)) - 0.1
+    encodings = np.vstack([same[:4], stranger, same[4:]])
+    kept, outliers = compress(encodings, ["a"] * 9, 3)
+    assert [row for row, _, _ in outliers] == [4]
+    assert 4 not in kept and 1 <= len(kept) <= 3
+
+
+def test_at_most_k_per_identity_in_input_order():
+    encodings, names = synthetic_identities(30, per_identity=12)
+    kept, outliers = compress(encodings, names, 3)
+    assert kept == sorted(kept)
+    counts = {}
+    for row in kept:
+        counts[names[row]] = counts.get(names[row], 0) + 1
+    assert len(counts) == 30 and max(counts.values()) <= 3
+    assert not set(kept) & {row for row, _, _ in outliers}
+
+
+def test_medoids_never_returns_duplicates():
+    points = np.repeat(np.eye(3, 128), [5, 1, 1], axis=0)
+    chosen = medoids(pairwise(points), 5)
+    assert len(chosen) == len(set(chosen)) == 3
+
+
+def test_k_below_one_rejected():
+    with pytest.raises(ValueError):
+        compress(np.zeros((3, 128)), ["a"] * 3, 0)
+    with pytest.raises(argparse.ArgumentTypeError):
+        prototype_count("0")
+    assert prototype_count("2") == 2
@@ -0,0 +1,128 @@
+# tests/test_recognition_service.py
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+pytest.importorskip("face_recognition")  # the service imports the recognizer
+
+import recognition_service  # noqa: E402
+from face_matcher import FaceMatcher  # noqa: E402
+from recognition_service import BadRequest, MicroBatcher, RecognitionService, encode_jpegs  # noqa: E402
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_item_exception_fails_only_that_item():
+    async def process(items):
+        return [ValueError(f"bad {i}") if i % 2 else i * 10 for i in items]
+
+    async def main():
+        batcher = MicroBatcher(process, max_batch=8, max_wait=0.05)
+        batcher.start()
+        return await asyncio.gather(*(batcher.submit(i) for i in range(4)), return_exceptions=True)
+
+    results = run(main())
+    assert results[0] == 0 and results[2] == 20
+    assert isinstance(results[1], ValueError) and isinstance(results[3], ValueError)
+
+
+def test_failed_batch_does_not_stop_the_batcher():
+    calls = []
+
+    async def process(items):
+        calls.append(list(items))
+        if len(calls) == 1:
+            raise RuntimeError("worker died")
+        return items
+
+    async def main():
+        batcher = MicroBatcher(process, max_batch=2, max_wait=0.01)
+        batcher.start()
+        first = await asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True)
+        second = await batcher.submit("c")
+        return first, second
+
+    first, second = run(main())
+    assert all(isinstance(r, RuntimeError) for r in first)
+    assert second == "c"
+
+
+def test_encode_jpegs_isolates_a_failing_image(monkeypatch):
+    def encode_frame(frame, scale):
+        if scale <= 0:
+            raise ValueError("scale must be positive")
+        return [(0, 1, 1, 0)], [np.zeros(128)]
+
+    monkeypatch.setattr(recognition_service, "encode_frame", encode_frame)
+    import cv2
+    ok, jpeg = cv2.imencode(".jpg", np.zeros((8, 8, 3), dtype=np.uint8))
+    results = encode_jpegs([(jpeg.tobytes(), 1.0), (b"not a jpeg", 1.0), (jpeg.tobytes(), 0.0)])
+    assert results[0][0] == [(0, 1, 1, 0)]
+    assert results[1] is None
+    assert isinstance(results[2], RuntimeError)
+
+
+async def _request(port, raw):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(raw)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    status = int(response.split(b" ", 2)[1])
+    return status, json.loads(response.split(b"\r\n\r\n", 1)[1] or b"null")
+
+
+def _post(path, body, content_type="application/json", length=None):
+    length = len(body) if length is None else length
+    return (f"POST {path} HTTP/1.1\r\nHost: x\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {length}\r\nConnection: close\r\n\r\n").encode() + body
+
+
+def test_bad_input_gets_400():
+    rng = np.random.default_rng(0)
+    encodings = rng.normal(0, 0.1, (10, 128)).astype(np.float32)
+    matcher = FaceMatcher(encodings, [f"s{i}" for i in range(10)])
+
+    async def main():
+        service = RecognitionService(matcher, pool=None)
+        server = await service.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            ok = await _request(port, _post("/recognize", json.dumps({"encodings": encodings[:2].tolist()}).encode()))
+            zero = await _request(port, _post("/recognize?scale=0", b"\xff\xd8", "image/jpeg"))
+            nan = await _request(port, _post("/recognize?scale=nan", b"\xff\xd8", "image/jpeg"))
+            length = await _request(port, _post("/recognize", b"", length="abc"))
+            return ok, zero, nan, length
+        finally:
+            server.close()
+
+    ok, zero, nan, length = run(main())
+    assert ok[0] == 200 and [f["name"] for f in ok[1]["faces"]] == ["s0", "s1"]
+    assert zero[0] == 400 and "scale" in zero[1]["error"]
+    assert nan[0] == 400
+    assert length[0] == 400
+
+
+def test_non_finite_encodings_are_bad_requests():
+    encodings = np.random.default_rng(0).normal(0, 0.1, (3, 128)).astype(np.float32)
+    matcher = FaceMatcher(encodings, ["a", "b", "c"])
+    service = RecognitionService(matcher, pool=None)
+    for bad in (float("nan"), float("inf"), 1e39):  # 1e39 overflows float32
+        probe = encodings[:2].tolist()
+        probe[1][5] = bad
+        with pytest.raises(BadRequest, match="finite"):
+            run(service.recognize(json.dumps({"encodings": probe}).encode(), "application/json"))
+
+
+def test_undecodable_image_is_a_bad_request():
+    async def main():
+        service = RecognitionService(FaceMatcher([], []), pool=None)
+        service.encoder.start()
+        return await asyncio.gather(service.encoder.submit((b"junk", 1.0)), return_exceptions=True)
+
+    [result] = run(main())
+    assert isinstance(result, BadRequest)
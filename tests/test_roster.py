@@ -0,0 +1,45 @@
+# tests/test_roster.py
+import sqlite3
+
+from roster import absentee_streaks, absentees
+
+
+def school():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript("""
+        CREATE TABLE students (id INTEGER PRIMARY KEY, name TEXT, roll_no TEXT, class TEXT);
+        CREATE TABLE attendance (id INTEGER PRIMARY KEY, student_id INTEGER, subject TEXT,
+                                 name TEXT, date TEXT, time TEXT, status TEXT);
+        INSERT INTO students VALUES (1, 'raju ', '1565', 'bsc ds'), (7, 'raju', '142', 'ml'),
+                                    (9, 'Arihant Rathod', '126', 'A');
+    """)
+    return conn
+
+
+def mark(conn, date, student_id=None, name=None):
+    conn.execute("INSERT INTO attendance (student_id, name, date, time, status) VALUES (?, ?, ?, '09:00', 'Present')",
+                 (student_id, name, date))
+
+
+def test_name_mark_credits_a_unique_name():
+    conn = school()
+    mark(conn, "2025-09-01", name="Arihant Rathod")
+    assert sorted(row[0] for row in absentees(conn, "2025-09-01")) == [1, 7]
+
+
+def test_name_mark_does_not_credit_students_sharing_the_name():
+    conn = school()
+    mark(conn, "2025-09-01", name="raju")
+    assert sorted(row[0] for row in absentees(conn, "2025-09-01")) == [1, 7, 9]
+    # a mark by student id still counts for that student only
+    mark(conn, "2025-09-01", student_id=7)
+    assert sorted(row[0] for row in absentees(conn, "2025-09-01")) == [1, 9]
+
+
+def test_streaks_use_the_same_rule():
+    conn = school()
+    for day in ("2025-09-01", "2025-09-02", "2025-09-03"):
+        mark(conn, day, name="raju")
+        mark(conn, day, name="Arihant Rathod")
+    streaks = {row[0]: row[-1] for row in absentee_streaks(conn, "2025-09-01", "2025-09-03")}
+    assert streaks == {1: 3, 7: 3}
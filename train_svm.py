@@ -1,35 +1,93 @@
 import os
-import cv2
-import face_recognition
-import pickle
+import argparse
+
+from ann_index import IVFIndex, index_path_for
+from dataset_encoder import EncodingCache, encode_files
+from dataset_manifest import open_manifest, person_images, refresh
+from gallery_store import build_gallery, gallery_lock, gallery_path_for, save_gallery
+from prototypes import compress, prototype_count
 
-DATASET_DIR = "dataset"
 MODEL_PATH = "trained_faces.pkl"
+GALLERY_PATH = gallery_path_for(MODEL_PATH)
+CACHE_PATH = "trained_faces.cache.pkl"
+
+
+def main():
+    # everything lives under main() so pool workers (spawned on Windows) can
+    # import this module without re-running the training
+    parser = argparse.ArgumentParser(description="Encode the dataset into the trained_faces.gallery directory")
+    parser.add_argument("--ann", action="store_true", help="also build an approximate nearest-neighbour index")
+    parser.add_argument("--nlist", type=int, default=None, help="number of ANN clusters (default: sqrt of gallery size)")
+    parser.add_argument("--workers", type=int, default=1, help="encoding processes (0 = one per CPU core)")
+    parser.add_argument("--chunksize", type=int, default=8, help="images handed to a worker at a time")
+    parser.add_argument("--no-cache", action="store_true", help="re-encode every image instead of reusing cached encodings")
+    parser.add_argument("--prototypes", type=prototype_count, default=None, metavar="K",
+                        help="keep at most K representative encodings per student and drop outliers "
+                             "(see prototypes.py; measure with `python prototypes.py evaluate`)")
+    args = parser.parse_args()
+
+    known_encodings = []
+    known_names = []
+    known_paths = []
+    cache = EncodingCache(CACHE_PATH)
+    if args.no_cache:
+        cache.entries.clear()
+    image_paths = []
+    image_names = []
+
+    # image list comes from the dataset manifest (see dataset_manifest.py), not a directory walk
+    print("🔍 Reading dataset manifest...")
+    conn = open_manifest()
+    for path, reason in refresh(conn):
+        print(f"⚠️ {reason} since last run: {path}")
+    # one folder per person, as before the manifest; the flat files are LBPH crops
+    rows = person_images(conn)
+    conn.close()
 
-known_encodings = []
-known_names = []
-
-print("🔍 Scanning dataset folder...")
-for person_name in os.listdir(DATASET_DIR):
-    person_folder = os.path.join(DATASET_DIR, person_name)
-    if not os.path.isdir(person_folder):
-        continue
-
-    print(f"📂 Processing {person_name}...")
-    for filename in os.listdir(person_folder):
-        if not filename.lower().endswith(('.jpg', '.png', '.jpeg')):
-            continue
-        path = os.path.join(person_folder, filename)
-        image = face_recognition.load_image_file(path)
-        encodings = face_recognition.face_encodings(image)
-        if len(encodings) > 0:
-            known_encodings.append(encodings[0])
+    for path, label in rows:
+        if not image_names or image_names[-1] != label:  # rows are ordered by label
+            print(f"📂 Processing {label}...")
+        image_paths.append(path)
+        image_names.append(label)
+
+    workers = args.workers or os.cpu_count()
+    results, reused = encode_files(image_paths, cache, workers=workers, chunksize=args.chunksize)
+    for path, person_name, (_, encoding, error) in zip(image_paths, image_names, results):
+        if error is not None:
+            print(f"⚠️ Error processing {path}: {error}")
+        elif encoding is not None:
+            known_encodings.append(encoding)
             known_names.append(person_name)
+            known_paths.append(path)
+
+    dropped = cache.prune()
+    cache.save()
+    print(f"♻️ Reused {reused} cached encodings, dropped {dropped} stale entries")
+
+    if args.prototypes and known_encodings:
+        kept, outliers = compress(known_encodings, known_names, args.prototypes)
+        for row, name, distance in outliers:
+            print(f"⚠️ Outlier image for {name}, not stored: {known_paths[row]} (distance {distance:.2f})")
+        print(f"🧩 Kept {len(kept)} of {len(known_encodings)} encodings "
+              f"(at most {args.prototypes} per student, {len(outliers)} outliers flagged)")
+        known_encodings = [known_encodings[i] for i in kept]
+        known_names = [known_names[i] for i in kept]
+
+    print("✅ Training model...")
+    # gallery and index are replaced together; `live_gallery.py enroll` waits meanwhile
+    with gallery_lock(GALLERY_PATH):
+        meta = save_gallery(GALLERY_PATH, build_gallery(known_encodings, known_names), args.prototypes)
+
+        print(f"🎓 Model trained and saved as '{GALLERY_PATH}'")
 
-print("✅ Training model...")
-data = {"encodings": known_encodings, "names": known_names}
+        if args.ann and known_encodings:
+            index = IVFIndex.build(known_encodings, nlist=args.nlist, gallery=meta["generation"])
+            index.save(index_path_for(MODEL_PATH))
+            print(f"🗂 ANN index with {index.nlist} lists saved as '{index_path_for(MODEL_PATH)}'")
+        elif index_path_for(MODEL_PATH).exists():
+            # an index from a previous run no longer describes this gallery
+            index_path_for(MODEL_PATH).unlink()
 
-with open(MODEL_PATH, "wb") as f:
-    pickle.dump(data, f)
 
-print(f"🎓 Model trained and saved as '{MODEL_PATH}'")
+if __name__ == "__main__":
+    main()